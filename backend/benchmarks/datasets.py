@@ -0,0 +1,181 @@
+"""
+Synthetic messy datasets for the benchmark suite.
+
+Every generator returns a DataFrame of strings shaped like a real upload:
+numbers with stray whitespace and outliers, text with inconsistent
+case, several date formats, null tokens and repeated rows. Data is built
+with vectorized NumPy draws from a fixed seed, so the same (kind, rows)
+always gives the same file.
+"""
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+NULL_TOKENS = np.array(['', 'NA', 'N/A', 'null', 'None', '-'])
+CITIES = np.array(['Paris', 'paris ', ' PARIS', 'Berlin', 'berlin', 'Madrid', 'Rome', 'rome ', 'Oslo', 'Lisbon'])
+WORDS = np.array(['alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel', 'india', 'juliet'])
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%m-%d-%Y', '%b %d, %Y', '%Y%m%d', '%Y-%m-%d %H:%M:%S']
+
+
+def _with_nulls(values, rng, rate):
+    """Replace a share `rate` of `values` with assorted null tokens."""
+    values = np.asarray(values, dtype=object)
+    mask = rng.random(len(values)) < rate
+    values[mask] = rng.choice(NULL_TOKENS, mask.sum())
+    return values
+
+
+def _numbers(rng, rows, scale=100.0, decimals=2):
+    """Numeric text with occasional outliers, some of it padded with whitespace."""
+    values = rng.normal(scale, scale / 4, rows)
+    spikes = rng.random(rows) < 0.01
+    values[spikes] *= 50
+    text = np.char.mod(f'%.{decimals}f', values).astype(object)
+    padded = rng.random(rows) < 0.05
+    text[padded] = ' ' + text[padded] + ' '
+    return text
+
+
+def _integers(rng, rows, high=1_000):
+    return rng.integers(0, high, rows).astype(str).astype(object)
+
+
+def _categories(rng, rows, values=CITIES):
+    return rng.choice(values, rows).astype(object)
+
+
+def _booleans(rng, rows):
+    return rng.choice(np.array(['yes', 'no', 'True', 'false', 'Y', 'N']), rows).astype(object)
+
+
+def _dates(rng, rows, formats=('%Y-%m-%d',)):
+    """Dates between 2015 and 2025, each row written in one of `formats`."""
+    stamps = pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 3650 * 86400, rows), unit='s')
+    choice = rng.integers(0, len(formats), rows)
+    text = np.empty(rows, dtype=object)
+    for i, fmt in enumerate(formats):
+        mask = choice == i
+        if fmt == '%Y-%m-%d':
+            # ISO dates through NumPy, much faster than strftime
+            text[mask] = np.datetime_as_string(stamps[mask].to_numpy(), unit='D').astype(object)
+        else:
+            text[mask] = stamps[mask].strftime(fmt).to_numpy()
+    return text
+
+
+def _free_text(rng, rows, distinct):
+    """Text drawn from `distinct` different values, e.g. user names or SKUs."""
+    ids = rng.integers(0, distinct, rows)
+    words = WORDS[ids % len(WORDS)].astype(object)
+    return words + '_' + np.char.zfill(ids.astype(str), 8).astype(object)
+
+
+def _duplicate_rows(df, rng, rate):
+    """Append copies of a share `rate` of the rows and shuffle, so duplicates are spread out."""
+    copies = df.iloc[rng.integers(0, len(df), int(len(df) * rate))]
+    out = pd.concat([df, copies], ignore_index=True)
+    return out.iloc[rng.permutation(len(out))[:len(df)]].reset_index(drop=True)
+
+
+def tall(rows, rng):
+    """A typical narrow table: a handful of mixed columns, many rows."""
+    return pd.DataFrame({
+        'id': np.arange(rows).astype(str),
+        'price': _with_nulls(_numbers(rng, rows), rng, 0.02),
+        'quantity': _with_nulls(_integers(rng, rows, 50), rng, 0.02),
+        'city': _with_nulls(_categories(rng, rows), rng, 0.05),
+        'active': _booleans(rng, rows),
+        'signup': _with_nulls(_dates(rng, rows), rng, 0.02),
+        'notes': _with_nulls(_free_text(rng, rows, 1_000), rng, 0.3),
+    })
+
+
+def wide(rows, rng, columns=200):
+    """Many columns: numeric, categorical and date columns in rotation."""
+    data = {}
+    for j in range(columns):
+        kind = j % 4
+        if kind == 0:
+            data[f'num_{j}'] = _with_nulls(_numbers(rng, rows), rng, 0.05)
+        elif kind == 1:
+            data[f'int_{j}'] = _integers(rng, rows)
+        elif kind == 2:
+            data[f'cat_{j}'] = _with_nulls(_categories(rng, rows), rng, 0.05)
+        else:
+            data[f'date_{j}'] = _dates(rng, rows)
+    return pd.DataFrame(data)
+
+
+def high_cardinality(rows, rng):
+    """Text columns where most values are distinct (ids, emails, free text)."""
+    return pd.DataFrame({
+        'user': _free_text(rng, rows, rows),
+        'email': _free_text(rng, rows, rows) + '@example.com',
+        'sku': _free_text(rng, rows, max(rows // 10, 1)),
+        'comment': _with_nulls(_free_text(rng, rows, rows // 2 + 1), rng, 0.1),
+        'amount': _numbers(rng, rows),
+    })
+
+
+def mixed_dates(rows, rng):
+    """Date columns mixing several formats within the same column."""
+    return pd.DataFrame({
+        'created': _dates(rng, rows, DATE_FORMATS),
+        'updated': _with_nulls(_dates(rng, rows, DATE_FORMATS[:3]), rng, 0.1),
+        'birthday': _dates(rng, rows, ('%d/%m/%Y', '%b %d, %Y')),
+        'amount': _numbers(rng, rows),
+        'city': _categories(rng, rows),
+    })
+
+
+def heavy_nulls(rows, rng):
+    """Most cells missing, some columns almost entirely so."""
+    return pd.DataFrame({
+        'price': _with_nulls(_numbers(rng, rows), rng, 0.4),
+        'quantity': _with_nulls(_integers(rng, rows), rng, 0.3),
+        'city': _with_nulls(_categories(rng, rows), rng, 0.45),
+        'signup': _with_nulls(_dates(rng, rows), rng, 0.35),
+        'score': _with_nulls(_numbers(rng, rows, 1.0, 4), rng, 0.8),
+        'notes': _with_nulls(_free_text(rng, rows, 100), rng, 0.95),
+    })
+
+
+def heavy_duplicates(rows, rng):
+    """About half of the rows repeat another row."""
+    base = pd.DataFrame({
+        'price': _numbers(rng, rows),
+        'quantity': _integers(rng, rows, 20),
+        'city': _categories(rng, rows),
+        'signup': _dates(rng, rows),
+    })
+    return _duplicate_rows(base, rng, 1.0)
+
+
+# Dataset kind -> generator(rows, rng) -> DataFrame
+GENERATORS = {
+    'tall': tall,
+    'wide': wide,
+    'high_cardinality': high_cardinality,
+    'mixed_dates': mixed_dates,
+    'heavy_nulls': heavy_nulls,
+    'heavy_duplicates': heavy_duplicates,
+}
+
+
+def make_dataset(kind, rows, seed=0):
+    if kind not in GENERATORS:
+        raise ValueError(f"Unknown dataset kind '{kind}', expected one of {sorted(GENERATORS)}")
+    return GENERATORS[kind](rows, np.random.default_rng(seed))
+
+
+def write_dataset(kind, rows, folder, seed=0):
+    """
+    Write the (kind, rows) dataset as CSV into `folder`, reusing the file if it
+    already exists. Returns its path.
+    """
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / f'{kind}_{rows}_{seed}.csv'
+    if not path.exists():
+        make_dataset(kind, rows, seed).to_csv(path, index=False)
+    return path
@@ -0,0 +1,261 @@
+"""
+Benchmark the cleaning stages on synthetic messy datasets.
+
+Each (dataset, size) pair is written once as CSV (see datasets.py), then the
+stages of run_cleaning_pipeline are run one by one, from load_data to
+save_cleaned_data. Wall time is the best of `--repeat` untraced runs; peak
+memory per stage comes from one extra run under the pipeline's
+MemoryTracker (tracemalloc slows code down, so it is kept out of timings).
+
+Results are written as JSON, tagged with the current commit, so two runs
+can be compared:
+
+    python backend/benchmarks/run_benchmarks.py --sizes 10000 100000
+    python backend/benchmarks/run_benchmarks.py --compare backend/benchmarks/results/<commit>.json
+
+`--parallel` also times fix_data_types run serially, on a thread pool and
+on a process pool (see TYPE_INFERENCE_WORKERS in utils/config.py); frames
+under PARALLEL_MIN_CELLS cells always run serially, so use a wide dataset:
+
+    python backend/benchmarks/run_benchmarks.py --kinds wide --sizes 5000 --parallel
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import warnings
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARK_DIR.parent / 'src'))
+
+from datasets import GENERATORS, write_dataset  # noqa: E402
+from data_loader import load_data  # noqa: E402
+from data_types import fix_data_types, identify_columns  # noqa: E402
+from data_cleaning import normalize_text_columns, remove_duplicates, handle_missing_values, handle_outliers  # noqa: E402
+from memory import optimize_memory  # noqa: E402
+from pipeline import MemoryTracker  # noqa: E402
+from reporting import save_cleaned_data  # noqa: E402
+from utils.config import OUTPUT_FOLDER  # noqa: E402
+from utils.helper import enable_copy_on_write  # noqa: E402
+
+DATA_DIR = BENCHMARK_DIR / 'data'
+RESULTS_DIR = BENCHMARK_DIR / 'results'
+DEFAULT_SIZES = [10_000, 100_000]
+
+# Absolute changes below these are noise, whatever their relative size
+MIN_CHANGE = {'seconds': 0.01, 'peak_bytes': 1024 ** 2}
+
+# Pools compared by --parallel: label -> joblib backend (None = serial)
+PARALLEL_CONFIGS = {'serial': None, 'threads': 'threads', 'processes': 'processes'}
+
+# Stages in pipeline order
+STAGES = [
+    'load_data',
+    'fix_data_types',
+    'normalize_text_columns',
+    'optimize_memory',
+    'remove_duplicates',
+    'handle_missing_values',
+    'handle_outliers',
+    'save_cleaned_data',
+]
+
+
+def run_stages(path, fmt='csv', tracker=None):
+    """
+    Run every stage on the CSV at `path`, as run_cleaning_pipeline does.
+
+    Returns:
+    - dict: stage -> {'seconds', 'rows', 'columns'} (shape after the stage)
+    """
+    results = {}
+    df = None
+
+    @contextmanager
+    def stage(name):
+        start = time.perf_counter()
+        with tracker.stage(name) if tracker is not None else nullcontext():
+            yield
+        results[name] = {'seconds': time.perf_counter() - start, 'rows': len(df), 'columns': df.shape[1]}
+
+    with stage('load_data'):
+        df = load_data(str(path))
+
+    with stage('fix_data_types'):
+        df, _ = fix_data_types(df)
+    columns_dtype = identify_columns(df)
+    with stage('normalize_text_columns'):
+        df = normalize_text_columns(df, columns_dtype['others'])
+    with stage('optimize_memory'):
+        df, _ = optimize_memory(df, columns_dtype['others'])
+    with stage('remove_duplicates'):
+        df, _ = remove_duplicates(df)
+    with stage('handle_missing_values'):
+        df, _ = handle_missing_values(df, columns_dtype['numerical'], columns_dtype['categorical'],
+                                      columns_dtype['datetime'])
+    with stage('handle_outliers'):
+        df, _ = handle_outliers(df)
+    with stage('save_cleaned_data'):
+        output = save_cleaned_data(df, f'benchmark_{Path(path).stem}', fmt=fmt)
+
+    os.remove(OUTPUT_FOLDER / output)
+    return results
+
+
+def benchmark_parallel(kind, rows, repeat=3, workers=-1, seed=0):
+    """Best time of fix_data_types on one synthetic dataset for each entry of PARALLEL_CONFIGS."""
+    df = load_data(str(write_dataset(kind, rows, DATA_DIR, seed)))
+    seconds = {}
+    for label, backend in PARALLEL_CONFIGS.items():
+        n_jobs = 1 if backend is None else workers
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fix_data_types(df, n_jobs=n_jobs, backend=backend or 'threads')
+            times.append(time.perf_counter() - start)
+        seconds[label] = min(times)
+
+    print(f"{kind:>18} {rows:>9} rows, fix_data_types: " +
+          ', '.join(f"{label} {value:.2f}s" for label, value in seconds.items()), flush=True)
+    return {'dataset': kind, 'rows': rows, 'workers': workers, 'stage': 'fix_data_types', 'seconds': seconds}
+
+
+def benchmark(kind, rows, repeat=3, fmt='csv', seed=0):
+    """Time and memory-profile every stage on one synthetic dataset."""
+    path = write_dataset(kind, rows, DATA_DIR, seed)
+    runs = [run_stages(path, fmt) for _ in range(repeat)]
+    with MemoryTracker() as tracker:
+        run_stages(path, fmt, tracker)
+
+    stages = {}
+    for name in STAGES:
+        stages[name] = {
+            'seconds': min(run[name]['seconds'] for run in runs),
+            'peak_bytes': tracker.stages[name],
+            'rows_out': runs[0][name]['rows'],
+            'columns_out': runs[0][name]['columns'],
+        }
+    result = {
+        'dataset': kind,
+        'rows': rows,
+        'columns': runs[0]['load_data']['columns'],
+        'file_bytes': os.path.getsize(path),
+        'stages': stages,
+        'total_seconds': sum(st['seconds'] for st in stages.values()),
+        'peak_bytes': max(st['peak_bytes'] for st in stages.values()),
+    }
+    print(f"{kind:>18} {rows:>9} rows: {result['total_seconds']:.2f}s, "
+          f"peak {result['peak_bytes'] / 1024 ** 2:.1f} MiB", flush=True)
+    return result
+
+
+def _git(*args):
+    try:
+        out = subprocess.run(['git', *args], cwd=BENCHMARK_DIR, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def environment():
+    commit = _git('rev-parse', '--short', 'HEAD')
+    return {
+        'commit': commit,
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')) if commit else None,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Compare two result files stage by stage. Prints one line per stage whose
+    time or peak memory changed by more than `threshold` (relative) and
+    MIN_CHANGE (absolute), and returns the increases as regressions.
+    """
+    previous = {(run['dataset'], run['rows']): run for run in baseline['runs']}
+    regressions = []
+    print(f"Comparing {baseline['environment'].get('commit')} -> {current['environment'].get('commit')}")
+
+    for run in current['runs']:
+        old = previous.get((run['dataset'], run['rows']))
+        if old is None:
+            continue
+        for name, st in run['stages'].items():
+            old_st = old['stages'].get(name)
+            if old_st is None:
+                continue
+            for metric in ('seconds', 'peak_bytes'):
+                before, after = old_st[metric], st[metric]
+                if not before:
+                    continue
+                change = after / before - 1
+                if abs(change) < threshold or abs(after - before) < MIN_CHANGE[metric]:
+                    continue
+                flag = 'REGRESSION' if change > 0 else 'improved'
+                print(f"{run['dataset']:>18} {run['rows']:>9} {name:<24} {metric:<10} "
+                      f"{before:>12.4g} -> {after:<12.4g} {change:+.0%} {flag}")
+                if change > 0:
+                    regressions.append({'dataset': run['dataset'], 'rows': run['rows'], 'stage': name,
+                                        'metric': metric, 'before': before, 'after': after})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--kinds', nargs='+', default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per dataset (best is kept)')
+    parser.add_argument('--format', default='csv', help='output format for save_cleaned_data')
+    parser.add_argument('--output', type=Path, help='result file (default: results/<commit>.json)')
+    parser.add_argument('--compare', type=Path, help='earlier result file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative change reported by --compare')
+    parser.add_argument('--parallel', action='store_true',
+                        help='also time fix_data_types serially and on thread and process pools')
+    parser.add_argument('--workers', type=int, default=-1, help='pool size for --parallel (-1 = all cores)')
+    args = parser.parse_args(argv)
+    enable_copy_on_write()
+
+    # The stages log and warn per column; keep the output to the benchmark lines
+    logging.basicConfig(level=logging.ERROR, format='%(message)s')
+    warnings.simplefilter('ignore')
+
+    results = {
+        'environment': environment(),
+        'repeat': args.repeat,
+        'output_format': args.format,
+        'runs': [benchmark(kind, rows, args.repeat, args.format) for rows in args.sizes for kind in args.kinds],
+    }
+    if args.parallel:
+        results['parallel'] = [benchmark_parallel(kind, rows, args.repeat, args.workers)
+                               for rows in args.sizes for kind in args.kinds]
+
+    output = args.output or RESULTS_DIR / f"{results['environment']['commit'] or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Clean a directory of files from the command line with a fitted recipe.
+
+`fit` runs the cleaning stages once on a representative file and saves
+their decisions (types and datetime formats, dropped columns, fill values,
+outlier bounds) as a JSON recipe; `apply` cleans every file of a directory
+with it in transform-only mode, one file per worker process:
+
+    python backend/src/batch.py fit sample.csv recipe.json
+    python backend/src/batch.py apply recipe.json incoming/ cleaned/ --workers 8 --format parquet
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from utils.config import OUTLIER_METHOD
+from utils.helper import allowed_file, file_extension, enable_copy_on_write
+from data_loader import load_data
+from pipeline import IN_MEMORY_PIPELINE
+from recipe import Recipe
+from reporting import OUTPUT_FORMATS, with_format
+
+
+def _clean_file(path, params, output_dir, fmt):
+    """Clean one file with the recipe's stage parameters; runs in a worker process."""
+    start = time.perf_counter()
+    stem = path.name[:len(path.name) - len(file_extension(path.name))]
+    context = IN_MEMORY_PIPELINE.run({'filepath': str(path), 'cleaned_name': with_format(stem, fmt),
+                                      'output_dir': output_dir}, ['cleaned_file'], params=params)
+    return context['cleaned_file'], time.perf_counter() - start
+
+
+def fit(args):
+    recipe = Recipe.fit(load_data(args.sample, args.sheet), col_drop_thresh=args.col_drop_thresh,
+                        outlier_method=args.outlier_method)
+    recipe.save(args.recipe)
+    print(f"Recipe saved to {args.recipe}: {len(recipe.conversions)} conversions, {len(recipe.drop)} dropped "
+          f"columns, {len(recipe.fill_values)} fill values, {len(recipe.bounds)} outlier bounds")
+    return 0
+
+
+def apply(args):
+    params = Recipe.load(args.recipe).stage_params()
+    files = sorted(path for path in Path(args.input_dir).iterdir() if path.is_file() and allowed_file(path.name))
+    if not files:
+        print(f"No supported files in {args.input_dir}", file=sys.stderr)
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    failed = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=enable_copy_on_write) as pool:
+        futures = {pool.submit(_clean_file, path, params, args.output_dir, args.format): path for path in files}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                cleaned_file, seconds = future.result()
+                print(f"{path.name} -> {cleaned_file} ({seconds:.2f}s)")
+            except Exception as e:
+                failed += 1
+                print(f"{path.name} failed: {e}", file=sys.stderr)
+
+    print(f"Cleaned {len(files) - failed} of {len(files)} files in {time.perf_counter() - start:.2f}s")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--verbose', action='store_true', help='log every pipeline stage')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    fit_parser = commands.add_parser('fit', help='fit a recipe on a sample file')
+    fit_parser.add_argument('sample', help='file to fit the recipe on')
+    fit_parser.add_argument('recipe', help='JSON file to write the recipe to')
+    fit_parser.add_argument('--sheet', default=None, help='worksheet of an Excel sample')
+    fit_parser.add_argument('--col-drop-thresh', type=float, default=0.5,
+                            help='missing ratio from which columns are dropped')
+    fit_parser.add_argument('--outlier-method', default=OUTLIER_METHOD,
+                            help="'iqr', 'zscore', 'mad' or 'percentile'")
+    fit_parser.set_defaults(func=fit)
+
+    apply_parser = commands.add_parser('apply', help='clean a directory of files with a recipe')
+    apply_parser.add_argument('recipe', help='JSON recipe written by fit')
+    apply_parser.add_argument('input_dir', help='directory of files to clean')
+    apply_parser.add_argument('output_dir', help='directory to write the cleaned files to')
+    apply_parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    apply_parser.add_argument('--format', default='csv', choices=sorted(OUTPUT_FORMATS), help='output format')
+    apply_parser.set_defaults(func=apply)
+
+    args = parser.parse_args(argv)
+    enable_copy_on_write()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import os
+import json
+import shutil
+import logging
+import threading
+from pathlib import Path
+
+from utils.config import CACHE_MAX_BYTES, CACHE_VERSION
+
+
+class ResultCache:
+    """
+    Content-addressed on-disk cache of pipeline results, keyed by the SHA-256
+    of the uploaded bytes. Each entry is a directory holding the result
+    payload (overview, log_report, ...) as meta.json and copies of the output
+    artifacts. Entries are evicted least-recently-used first once the cache
+    grows past `max_bytes`.
+    """
+
+    def __init__(self, root, max_bytes=CACHE_MAX_BYTES, version=CACHE_VERSION):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _entry(self, key):
+        return self.root / key
+
+    def get(self, key, dest_dir, artifact_names):
+        """
+        Look up `key`. On a hit, the cached artifacts are restored into
+        `dest_dir` under the names given in `artifact_names` (payload field ->
+        file name) and the payload is returned with those names filled in.
+
+        Returns:
+        - dict or None: result payload, None on a miss
+        """
+        with self._lock:
+            meta_path = self._entry(key) / 'meta.json'
+            try:
+                meta = json.loads(meta_path.read_text())
+            except (OSError, ValueError):
+                meta = None
+
+            if meta is None or meta.get('version') != self.version:
+                self.misses += 1
+                logging.info(f"[cache] Miss for {key[:12]}")
+                return None
+
+            payload = meta['payload']
+            for field, cached_name in meta['artifacts'].items():
+                target = Path(dest_dir) / artifact_names.get(field, cached_name)
+                shutil.copyfile(self._entry(key) / cached_name, target)
+                payload[field] = target.name
+
+            # Touch the entry so eviction sees it as recently used
+            os.utime(meta_path)
+            self.hits += 1
+            logging.info(f"[cache] Hit for {key[:12]}")
+            return payload
+
+    def put(self, key, payload, artifacts):
+        """
+        Store `payload` and the files in `artifacts` (payload field -> path)
+        under `key`, then evict old entries if the cache is over its size limit.
+        """
+        with self._lock:
+            entry = self._entry(key)
+            tmp = self.root / f".{key}.tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+
+            cached_names = {}
+            for field, path in artifacts.items():
+                path = Path(path)
+                if path.exists():
+                    shutil.copyfile(path, tmp / path.name)
+                    cached_names[field] = path.name
+
+            meta = {'version': self.version, 'payload': payload, 'artifacts': cached_names}
+            (tmp / 'meta.json').write_text(json.dumps(meta, default=str))
+
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)
+            logging.info(f"[cache] Stored {key[:12]}")
+            self._evict()
+
+    def stats(self):
+        with self._lock:
+            entries = self._entries()
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(entries),
+                'bytes': sum(size for _, _, size in entries),
+                'max_bytes': self.max_bytes,
+            }
+
+    def _entries(self):
+        """(path, last_used, size) of every complete entry."""
+        entries = []
+        for entry in self.root.iterdir():
+            meta_path = entry / 'meta.json'
+            if entry.name.startswith('.') or not meta_path.exists():
+                continue
+            size = sum(f.stat().st_size for f in entry.iterdir())
+            entries.append((entry, meta_path.stat().st_mtime, size))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        while entries and total > self.max_bytes:
+            entry, _, size = entries.pop(0)
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            logging.info(f"[cache] Evicted {entry.name[:12]} ({size} bytes)")
+
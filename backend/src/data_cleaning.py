@@ -2,17 +2,60 @@ import pandas as pd
 import numpy as np
 import logging
 
-def normalize_text_columns(df, other_cols:list):
+from utils.helper import working_copy
+from utils.config import OUTLIER_METHOD, STRING_CATEGORY_RATIO
+from parallel import map_columns
+from dedup import RowHashIndex
+from outliers import clip_outliers, numeric_columns
+from memory import TEXT_DTYPE
+
+def _factorized_text(s, transform):
+    """
+    Apply a vectorized string transform to the distinct values of `s` only,
+    so its cost scales with cardinality rather than row count.
+
+    Returns:
+    - codes (np.ndarray): position of each row's result in `values`, -1 where missing
+    - values (pd.Index): sorted distinct results; values that transform to the
+      same string (' NY', 'ny') share one code
+    """
+    codes, uniques = pd.factorize(s)
+    transformed = transform(pd.Series(uniques, dtype=object).astype(str))
+    result_codes, values = pd.factorize(transformed, sort=True)
+    codes = np.where(codes >= 0, result_codes.take(codes, mode='clip') if len(result_codes) else -1, -1)
+    return codes, values
+
+def _strip_lower(values):
+    return values.str.strip().str.lower()
+
+def normalize_text(s):
+    """Stripped, lower-cased text of `s` as an object column, nulls kept (used chunk by chunk in streaming mode)."""
+    codes, values = _factorized_text(s, _strip_lower)
+    return pd.Series(np.append(values.to_numpy(dtype=object), np.nan).take(codes), index=s.index, name=s.name)
+
+def _normalize_column(col, s, category_ratio):
+    codes, values = _factorized_text(s, _strip_lower)
+    if len(s) and len(values) / len(s) < category_ratio:
+        return pd.Series(pd.Categorical.from_codes(codes, categories=values), index=s.index, name=s.name)
+    text = np.append(values.to_numpy(dtype=object), np.nan).take(codes)
+    return pd.Series(text, index=s.index, name=s.name, dtype=TEXT_DTYPE or object)
+
+def normalize_text_columns(df, other_cols:list, category_ratio=STRING_CATEGORY_RATIO):
     """
     Normalize all text columns in the DataFrame:
     - Convert to string
     - Strip leading/trailing whitespace
     - Convert to lowercase
+
+    The transforms run once per distinct value and are mapped back through
+    integer codes. Columns with fewer than `category_ratio` distinct results
+    come out as 'category', the others as Arrow strings when pyarrow is
+    available (the encoding optimize_memory would choose).
     """
-    df = df.copy()
+    df = working_copy(df)
 
-    for col in other_cols:
-        df[col] = df[col].where(df[col].isna(), df[col].astype(str).str.strip().str.lower())
+    for col, normalized in zip(other_cols, map_columns(_normalize_column, df, other_cols, category_ratio)):
+        df[col] = normalized
 
     return df
 
@@ -21,6 +64,7 @@ def remove_duplicates(
     subset: list = None,
     keep: str = 'first',
     timestamp_col: str = None,
+    row_index: RowHashIndex = None,
 ) -> pd.DataFrame:
     """
     Remove duplicate rows from the DataFrame after normalizing text columns.
@@ -30,26 +74,39 @@ def remove_duplicates(
     - subset (list): Optional. Columns to check for duplicates. If None, use all columns.
     - keep (str): 'first', 'last', 'latest', or False. Which duplicate to keep.
     - timestamp_col (str): Required if keep='latest'. Column used to decide latest row.
-    - log (bool): Whether to print a log summary.
+    - row_index (RowHashIndex): Optional. Reuses its cached column hashes and
+      also drops rows seen in earlier batches; kept aligned with the result.
 
     Returns:
     - pd.DataFrame: Deduplicated DataFrame.
     - Log: list of dict
     """
-    df = df.copy()
+    df = working_copy(df)
     log = []
+    if row_index is None:
+        row_index = RowHashIndex()
+
+    order = None
     if keep == 'latest':
         if not timestamp_col:
             raise ValueError("You must provide 'timestamp_col' when keep='latest'")
         if timestamp_col not in df.columns:
             raise ValueError(f"'{timestamp_col}' not found in DataFrame columns")
 
-        # Sort so latest comes first
-        df = df.sort_values(by=timestamp_col, ascending=False)
+        # Rank rows latest first (same order sort_values gives)
+        order = df[timestamp_col].reset_index(drop=True).sort_values(ascending=False).index.to_numpy()
         keep = 'first'
 
     original_count = len(df)
-    df = df.drop_duplicates(subset=subset, keep=keep)
+    duplicated = row_index.duplicated(df, subset=subset, keep=keep, order=order)
+    if order is not None:
+        positions = order[~duplicated]
+        df = df.iloc[positions]
+        row_index.take(positions)
+    elif duplicated.any():
+        positions = np.flatnonzero(~duplicated)
+        df = df.iloc[positions]
+        row_index.take(positions)
     new_count = len(df)
     duplicates_removed = original_count - new_count
 
@@ -66,26 +123,139 @@ def remove_duplicates(
 
     return df, log
 
-def handle_missing_values(df, numerical_cols, categorical_cols, datetime_cols, col_drop_thresh=0.5):
+def _known_complete(profile, col):
+    """True if a DataProfile proves the column has no missing or blank values."""
+    return profile is not None and col in profile and profile[col].null_count == 0 and profile[col].blank_count == 0
+
+def _blanks_to_nan(col, s):
+    """
+    Turn empty/whitespace strings into NaN; returns (new column or None, missing ratio).
+    Blank values are found among the distinct values (or categories) only.
+    """
+    cleaned = None
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        categories = s.cat.categories
+        blank = categories[pd.Series(categories, dtype=object).astype(str).str.strip().eq('').to_numpy()]
+        if len(blank):
+            empty_count = int(s.isin(blank).sum())
+            logging.info(f"Column '{col}': Converted {empty_count} empty strings to NaN")
+            cleaned = s = s.cat.remove_categories(blank)
+    elif s.dtype == 'object' or pd.api.types.is_string_dtype(s):
+        codes, uniques = pd.factorize(s)
+        blank = np.flatnonzero(pd.Series(uniques, dtype=object).str.strip().eq('').to_numpy())
+        if len(blank):
+            is_blank = np.isin(codes, blank)
+            logging.info(f"Column '{col}': Converted {int(is_blank.sum())} empty strings to NaN")
+            cleaned = s = s.mask(is_blank)
+
+    return cleaned, s.isna().mean()
+
+def _fill_fitted(col, s, kind, value, missing_count):
+    """Impute with a value fitted on another dataset (see recipe.Recipe)."""
+    if kind == 'datetime':
+        value = pd.Timestamp(value)
+    elif isinstance(s.dtype, pd.CategoricalDtype) and value not in s.cat.categories:
+        s = s.cat.add_categories([value])
+    logging.info(f"Imputed {missing_count} missing values in {kind} column '{col}' with fitted value = {value}")
+    return s.fillna(value), {
+        'column': col,
+        'action': 'imputed',
+        'method': 'fitted',
+        'value_used': value if kind != 'datetime' else str(value),
+        'missing_count': int(missing_count)
+    }
+
+def _impute_column(col, s, kinds, fill_values=None):
+    """
+    Impute one column according to its kind ('numerical', 'categorical' or 'datetime'),
+    with its value in `fill_values` if there is one.
+    Returns (imputed column, log entry), or (None, None) if nothing is missing.
+    """
+    missing_count = s.isna().sum()
+    if missing_count == 0:
+        return None, None
+
+    kind = kinds[col]
+    if fill_values and col in fill_values:
+        return _fill_fitted(col, s, kind, fill_values[col], missing_count)
+    if kind == 'numerical':
+        median_value = float(s.median())
+        logging.info(f"Imputed {missing_count} missing values in numeric column '{col}' with median = {median_value}")
+        return s.fillna(median_value), {
+            'column': col,
+            'action': 'imputed',
+            'method': 'median',
+            'value_used': median_value,
+            'missing_count': int(missing_count)
+        }
+
+    if kind == 'categorical':
+        try:
+            mode_value = s.mode()[0]
+        except IndexError:
+            mode_value = 'Unknown'
+        logging.info(f"Imputed {missing_count} missing values in categorical column '{col}' with mode = '{mode_value}'")
+        return s.fillna(mode_value), {
+            'column': col,
+            'action': 'imputed',
+            'method': 'mode',
+            'value_used': mode_value,
+            'missing_count': int(missing_count)
+        }
+
+    try:
+        median_date = s.dropna().median()
+        imputed = s.fillna(median_date)
+        method = 'median'
+        value_used = median_date
+    except Exception:
+        default_date = pd.to_datetime("1970-01-01")
+        imputed = s.fillna(default_date)
+        method = 'default_date'
+        value_used = default_date
+
+    logging.info(f"Imputed {missing_count} missing values in datetime column '{col}' with {method} = {value_used}")
+    return imputed, {
+        'column': col,
+        'action': 'imputed',
+        'method': method,
+        'value_used': str(value_used),
+        'missing_count': int(missing_count)
+    }
+
+def handle_missing_values(df, numerical_cols, categorical_cols, datetime_cols, col_drop_thresh=0.5, profile=None,
+                          drop=None, fill_values=None):
     """
     - Converting empty strings and whitespace to NaN
     - Dropping columns with too many missing values
     - Imputing numeric columns with median
     - Imputing categorical columns with mode or 'Unknown'
+
+    Columns that a DataProfile of the raw frame shows to be complete are
+    skipped without scanning (deduplication and text normalization cannot
+    introduce missing values). Per-column work runs through parallel.map_columns.
+
+    Decisions fitted on another dataset (see recipe.Recipe) replace the
+    inferred ones: `drop` lists the columns to drop instead of those over
+    `col_drop_thresh`, and `fill_values` (column -> value) the values to
+    impute instead of medians and modes.
     """
-    df = df.copy()
+    df = working_copy(df)
     log = []
 
-    for col in df.columns:
-        if df[col].dtype == 'object' or pd.api.types.is_string_dtype(df[col]):
-            empty_count = df[col].str.strip().eq('').sum()
-            if empty_count > 0:
-                logging.info(f"Column '{col}': Converted {empty_count} empty strings to NaN")
-            df[col] = df[col].replace(r'^\s*$', np.nan, regex=True)
+    incomplete = [col for col in df.columns if not _known_complete(profile, col)]
+    missing_ratios = {}
+    for col, (cleaned, missing_ratio) in zip(incomplete, map_columns(_blanks_to_nan, df, incomplete)):
+        if cleaned is not None:
+            df[col] = cleaned
+        missing_ratios[col] = missing_ratio
 
     cols_to_drop = []
-    for col in df.columns:
-        missing_ratio = df[col].isna().mean()
+    if drop is not None:
+        cols_to_drop = [col for col in drop if col in df.columns]
+        log.extend({'column': col, 'action': 'dropped', 'reason': 'dropped when fitted'} for col in cols_to_drop)
+    for col in incomplete if drop is None else ():
+        missing_ratio = missing_ratios[col]
         if missing_ratio >= col_drop_thresh:
             cols_to_drop.append(col)
             logging.warning(f"Dropping column '{col}' with {missing_ratio:.2%} missing values")
@@ -101,97 +271,49 @@ def handle_missing_values(df, numerical_cols, categorical_cols, datetime_cols, c
     categorical_cols = [col for col in categorical_cols if col not in cols_to_drop]
     datetime_cols = [col for col in datetime_cols if col in df.columns]
 
-    for col in numerical_cols:
-        missing_count = df[col].isna().sum()
-        if missing_count > 0:
-            median_value = df[col].median()
-            df[col].fillna(median_value, inplace=True)
-            logging.info(f"Imputed {missing_count} missing values in numeric column '{col}' with median = {median_value}")
-            log.append({
-                'column': col,
-                'action': 'imputed',
-                'method': 'median',
-                'value_used': median_value,
-                'missing_count': int(missing_count)
-            })
+    incomplete = [col for col in incomplete if col in df.columns]
+    to_impute = (
+        [(col, 'numerical') for col in numerical_cols if col in incomplete]
+        + [(col, 'categorical') for col in categorical_cols if col in incomplete]
+        + [(col, 'datetime') for col in datetime_cols if col in incomplete]
+    )
+    kinds = dict(to_impute)
+    results = map_columns(_impute_column, df, [col for col, _ in to_impute], kinds, fill_values)
 
-    for col in categorical_cols:
-        missing_count = df[col].isna().sum()
-        if missing_count > 0:
-            try:
-                mode_value = df[col].mode()[0]
-            except IndexError:
-                mode_value = 'Unknown'
-            df[col].fillna(mode_value, inplace=True)
-            logging.info(f"Imputed {missing_count} missing values in categorical column '{col}' with mode = '{mode_value}'")
-            log.append({
-                'column': col,
-                'action': 'imputed',
-                'method': 'mode',
-                'value_used': mode_value,
-                'missing_count': int(missing_count)
-            })
-            
-    for col in datetime_cols:
-        missing_count = df[col].isna().sum()
-        if missing_count > 0:
-            try:
-                median_date = df[col].dropna().median()
-                df[col].fillna(median_date, inplace=True)
-                method = 'median'
-                value_used = median_date
-            except Exception:
-                default_date = pd.to_datetime("1970-01-01")
-                df[col].fillna(default_date, inplace=True)
-                method = 'default_date'
-                value_used = default_date
-
-            logging.info(f"Imputed {missing_count} missing values in datetime column '{col}' with {method} = {value_used}")
-            log.append({
-                'column': col,
-                'action': 'imputed',
-                'method': method,
-                'value_used': str(value_used),
-                'missing_count': int(missing_count)
-            })
+    for (col, _), (imputed, entry) in zip(to_impute, results):
+        if imputed is not None:
+            df[col] = imputed
+            log.append(entry)
     
-    for col in df.columns:
-        if df[col].dtype == 'object':
-            df[col].fillna('empty', inplace=True)
+    for col in incomplete:
+        if df[col].dtype == 'object' or isinstance(df[col].dtype, pd.StringDtype):
+            df[col] = df[col].fillna('empty')
+        elif col not in categorical_cols and isinstance(df[col].dtype, pd.CategoricalDtype) and df[col].isna().any():
+            # Text dictionary-encoded by optimize_memory
+            df[col] = df[col].cat.add_categories(['empty']).fillna('empty')
     
     return df, log
 
-def handle_outliers(df):
-    df = df.copy()
-    log = []
-
-    numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns
-
-    for col in numeric_cols:
-        q1 = df[col].quantile(0.25)
-        q3 = df[col].quantile(0.75)
-        iqr = q3 - q1
-        lower = q1 - 1.5 * iqr
-        upper = q3 + 1.5 * iqr
+def handle_outliers(df, method=OUTLIER_METHOD, bounds=None, **params):
+    """
+    Clip outliers in every numeric column (any int/float width, nullable
+    types included; booleans excluded) using the `method` detector
+    ('iqr', 'zscore', 'mad' or 'percentile', see outliers.py).
 
-        # Detect outliers
-        outliers_below = (df[col] < lower).sum()
-        outliers_above = (df[col] > upper).sum()
-        total_outliers = outliers_below + outliers_above
+    `bounds` (column -> [lower, upper], e.g. from a fitted recipe.Recipe)
+    skips detection: only those columns are clipped, to those bounds.
 
-        # Log if there are outliers
-        if total_outliers > 0:
-            log.append({
-                'column': col,
-                'outliers_below': int(outliers_below),
-                'outliers_above': int(outliers_above),
-                'total_outliers': int(total_outliers),
-                'lower_bound': lower,
-                'upper_bound': upper,
-                'action': f'Clipped to [{lower}, {upper}]'
-            })
+    Returns:
+    - pd.DataFrame: DataFrame with outliers clipped
+    - Log: list of dict
+    """
+    df = working_copy(df)
 
-        # Clip the values
-        df[col] = df[col].clip(lower, upper)
+    columns = numeric_columns(df)
+    if bounds is not None:
+        columns = [col for col in columns if col in bounds]
+    clipped, log = clip_outliers(df, columns, method, bounds=bounds, **params)
+    for col in clipped.columns:
+        df[col] = clipped[col]
 
     return df, log
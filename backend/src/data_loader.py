@@ -1,23 +1,444 @@
+import io
 import os
+import bz2
+import gzip
+import time
+import uuid
+import hashlib
+import numpy as np
 import pandas as pd
 import logging
+from contextlib import nullcontext
+from pathlib import Path
 
-def load_data(file_path):
-    ext = os.path.splitext(file_path)[-1].lower()
+from utils.config import (
+    CHUNK_SIZE, UPLOAD_CHUNK_SIZE, EXCEL_CACHE_FOLDER, EXCEL_CACHE_MAX_BYTES, MAX_DECOMPRESSED_BYTES,
+    PREVIEW_ROWS, PREVIEW_TIME_BUDGET_SECONDS
+)
+from utils.helper import file_extension, split_extension
+
+try:
+    import python_calamine  # noqa: F401  (enables pandas' fast 'calamine' Excel engine)
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+try:
+    import pyarrow  # noqa: F401  (needed for the Feather sheet cache)
+    FEATHER_AVAILABLE = True
+except ImportError:
+    FEATHER_AVAILABLE = False
+
+try:
+    import zstandard
+except ImportError:  # .zst uploads are rejected with a clear error
+    zstandard = None
+
+class DecompressedSizeExceeded(ValueError):
+    """Raised when a compressed file expands beyond MAX_DECOMPRESSED_BYTES."""
+
+class _SizeLimitedReader(io.RawIOBase):
+    """Raw reader over a decompressing stream that stops once more than `max_bytes` came out of it."""
+
+    def __init__(self, stream, max_bytes, closing=()):
+        self._stream = stream
+        self._closing = (stream, *closing)
+        self.max_bytes = max_bytes
+        self.size = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        # read1: what is already decompressed comes back even if the stream then turns out cut short
+        data = self._stream.read1(len(buffer))
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise DecompressedSizeExceeded(
+                f"Decompressed data exceeds the {self.max_bytes // (1024 * 1024)} MB limit")
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            for stream in self._closing:
+                stream.close()
+        super().close()
+
+class _CompleteLinesReader(io.RawIOBase):
+    """
+    Raw reader over the beginning of a text file (e.g. the first megabytes a
+    client sent for a preview): its last line, probably cut, is left out,
+    and a compressed stream that ends early reads as the end of the file.
+    """
+
+    def __init__(self, stream, chunk_size=UPLOAD_CHUNK_SIZE):
+        self._stream = stream
+        self._pending = bytearray()
+        self._eof = False
+        self.chunk_size = chunk_size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._eof and b'\n' not in self._pending:
+            try:
+                chunk = self._stream.read1(self.chunk_size)
+            except (EOFError, OSError) + ((zstandard.ZstdError,) if zstandard is not None else ()):
+                chunk = b''
+            if chunk:
+                self._pending.extend(chunk)
+            else:
+                self._eof = True
+        size = min(len(buffer), self._pending.rfind(b'\n') + 1)
+        buffer[:size] = self._pending[:size]
+        del self._pending[:size]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._stream.close()
+        super().close()
+
+def open_decompressed(source, compression, max_bytes=MAX_DECOMPRESSED_BYTES, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Binary file object yielding the decompressed bytes of `source` (a path or
+    a binary file object, e.g. an upload still being received). Data is
+    decompressed as it is read, so nothing is written to disk, and reading
+    fails with DecompressedSizeExceeded past `max_bytes`, so a small upload
+    cannot expand into an arbitrarily large frame.
+
+    Parameters:
+    - compression (str): 'gzip', 'bz2' or 'zstd'
+    """
+    owned = open(source, 'rb') if isinstance(source, (str, os.PathLike)) else None
+    raw = owned or source
+    if compression == 'gzip':
+        stream = gzip.GzipFile(fileobj=raw, mode='rb')
+    elif compression == 'bz2':
+        stream = bz2.BZ2File(raw, mode='rb')
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd-compressed files need the 'zstandard' package")
+        stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+    else:
+        raise ValueError(f"Unsupported compression: {compression}")
+    closing = (owned,) if owned is not None else ()
+    return io.BufferedReader(_SizeLimitedReader(stream, max_bytes, closing), buffer_size=chunk_size)
+
+def _extension(file_path, file_ext=None):
+    """
+    Lower-case extension of `file_path` with any compression suffix
+    ('.csv', '.csv.gz', ...), or `file_ext` for in-memory uploads.
+    """
+    return (file_ext or file_extension(str(file_path))).lower()
+
+def _rewind(source):
+    """Seek file-like sources back to the start before another read; paths pass through."""
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return source
+
+def _describe(source):
+    return source if isinstance(source, (str, os.PathLike)) else 'uploaded stream'
+
+def excel_sheet_names(file_path, file_ext=None):
+    """Sheet names of a workbook (a path or a binary file object), in workbook order."""
+    if CALAMINE_AVAILABLE:
+        if hasattr(file_path, 'read'):
+            return python_calamine.CalamineWorkbook.from_filelike(_rewind(file_path)).sheet_names
+        return python_calamine.CalamineWorkbook.from_path(str(file_path)).sheet_names
+    if openpyxl is not None and _extension(file_path, file_ext) == '.xlsx':
+        workbook = openpyxl.load_workbook(_rewind(file_path), read_only=True)
+        try:
+            return list(workbook.sheetnames)
+        finally:
+            workbook.close()
+    with pd.ExcelFile(_rewind(file_path)) as workbook:
+        return list(workbook.sheet_names)
+
+def _resolve_sheet(names, sheet):
+    """Sheet name for `sheet` (a name, a position, or None for the first sheet)."""
+    if sheet is None or sheet == '':
+        return names[0]
+    if sheet in names:
+        return sheet
+    if isinstance(sheet, int) or (isinstance(sheet, str) and sheet.isdigit()):
+        position = int(sheet)
+        if position < len(names):
+            return names[position]
+    raise ValueError(f"Sheet {sheet!r} not found, workbook has {names}")
+
+def _unique_headers(header):
+    """Column names like pandas gives them: 'Unnamed: i' for blanks, '.n' suffixes for repeats."""
+    names, seen = [], {}
+    for i, value in enumerate(header):
+        if value is None:
+            name = f"Unnamed: {i}"
+        else:
+            name = value if isinstance(value, (int, float)) else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+def _read_sheet_rows(file_path, sheet_name):
+    """Fallback .xlsx reader: openpyxl read-only mode, streaming rows instead of loading the whole tree."""
+    workbook = openpyxl.load_workbook(_rewind(file_path), read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name]
+        sheet.reset_dimensions()    # don't trust the stored sheet size, read every row
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        records = list(rows)
+    finally:
+        workbook.close()
+
+    # Read-only mode reports formatted-but-empty rows at the end of a sheet
+    while records and all(value is None for value in records[-1]):
+        records.pop()
+    width = len(header)
+    while width and header[width - 1] is None and all(len(r) < width or r[width - 1] is None for r in records):
+        width -= 1
+    df = pd.DataFrame.from_records([r[:width] for r in records], columns=_unique_headers(header[:width]))
+
+    # Empty cells as NaN (not None), and all-empty columns as float, as pd.read_excel gives them
+    text_cols = df.select_dtypes('object').columns
+    df[text_cols] = df[text_cols].where(df[text_cols].notna(), np.nan).infer_objects()
+    return df
+
+def _read_excel(file_path, sheet_name, file_ext=None):
+    if CALAMINE_AVAILABLE:
+        return pd.read_excel(_rewind(file_path), sheet_name=sheet_name, engine='calamine')
+    if openpyxl is not None and _extension(file_path, file_ext) == '.xlsx':
+        return _read_sheet_rows(file_path, sheet_name)
+    return pd.read_excel(_rewind(file_path), sheet_name=sheet_name)
+
+def _file_digest(file_path, chunk_size=UPLOAD_CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with nullcontext(_rewind(file_path)) if hasattr(file_path, 'read') else open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _prune_excel_cache(folder, max_bytes):
+    files = sorted(Path(folder).glob('*.feather'), key=lambda f: f.stat().st_mtime)
+    total = sum(f.stat().st_size for f in files)
+    while files and total > max_bytes:
+        oldest = files.pop(0)
+        total -= oldest.stat().st_size
+        oldest.unlink(missing_ok=True)
+
+def load_excel(file_path, sheet=None, cache_folder=EXCEL_CACHE_FOLDER, file_ext=None, digest=None):
+    """
+    Load one sheet of a workbook with the fastest reader available:
+    - the calamine engine (Rust, reads .xlsx and .xls) when python-calamine is installed
+    - otherwise, for .xlsx, openpyxl in read-only mode, iterating over rows
+    - otherwise pd.read_excel's default engine
+
+    The parsed sheet is stored as Feather in `cache_folder`, keyed by the
+    workbook's SHA-256 and the sheet's position, so re-running the same
+    workbook never parses the XML again. Sheets Arrow cannot store (e.g.
+    columns mixing numbers and text) are simply not cached.
+
+    Parameters:
+    - file_path: Path of the workbook, or a binary file object holding it
+      (then `file_ext` gives its format).
+    - sheet (str or int): Sheet name or position; defaults to the first sheet.
+    - digest (str): SHA-256 of the workbook when already known, e.g. computed
+      while it was uploaded.
+    """
+    names = excel_sheet_names(file_path, file_ext)
+    sheet_name = _resolve_sheet(names, sheet)
+
+    cache_path = None
+    if FEATHER_AVAILABLE and cache_folder is not None:
+        digest = digest or _file_digest(file_path)
+        cache_path = Path(cache_folder) / f"{digest}-{names.index(sheet_name)}.feather"
+        if cache_path.exists():
+            os.utime(cache_path)
+            df = pd.read_feather(cache_path)
+            logging.info(f"Loaded sheet '{sheet_name}' of {_describe(file_path)} from cache {cache_path.name}")
+            return df
+
+    df = _read_excel(file_path, sheet_name, file_ext)
+    logging.info(f"Parsed sheet '{sheet_name}' of {_describe(file_path)} (sheets: {names})")
+
+    if cache_path is not None:
+        # Unique per writer: concurrent jobs may convert the same workbook
+        tmp = cache_path.with_suffix(f'.{uuid.uuid4().hex}.tmp')
+        try:
+            os.makedirs(cache_folder, exist_ok=True)
+            df.to_feather(tmp)
+            os.replace(tmp, cache_path)
+            _prune_excel_cache(cache_folder, EXCEL_CACHE_MAX_BYTES)
+        except (OSError, ValueError, TypeError, pyarrow.ArrowException) as e:
+            if tmp.exists():
+                tmp.unlink()
+            logging.info(f"Sheet '{sheet_name}' not cached as Feather: {e}")
+    return df
+
+def _read_text(file_path, fmt, compression):
+    """Read a CSV or JSON Lines file, decompressing it on the fly if needed."""
+    source = open_decompressed(file_path, compression) if compression else file_path
+    try:
+        if fmt == '.csv':
+            return pd.read_csv(source)
+        # Values are typed by JSON itself; date-like text is left to fix_data_types as for CSV
+        return pd.read_json(source, lines=True, convert_dates=False)
+    finally:
+        if compression:
+            source.close()
+
+def load_data(file_path, sheet=None, file_ext=None, digest=None, excel_cache_folder=EXCEL_CACHE_FOLDER):
+    """
+    Load a CSV, JSON Lines, Parquet or Excel file into a DataFrame. CSV and
+    JSON Lines may be gzip, bz2 or zstd compressed ('.csv.gz', '.jsonl.zst',
+    ...) and are decompressed while they are parsed. For workbooks, `sheet`
+    selects the sheet by name or position (default: the first one).
+
+    `file_path` may also be a binary file object, e.g. an upload still being
+    received: `file_ext` then gives the format, and `digest` the SHA-256 of
+    a workbook for its sheet cache, kept in `excel_cache_folder` (None for
+    no cache, see load_excel).
+    """
+    ext = _extension(file_path, file_ext)
+    fmt, compression = split_extension(ext)
 
     try:
-        if ext == '.csv':
-            df = pd.read_csv(file_path)
-            logging.info(f"Loaded CSV file: {file_path} with shape {df.shape}")
+        if fmt in ('.csv', '.jsonl'):
+            df = _read_text(file_path, fmt, compression)
+            logging.info(f"Loaded {ext} file: {_describe(file_path)} with shape {df.shape}")
+        elif ext == '.parquet':
+            df = pd.read_parquet(file_path)
+            logging.info(f"Loaded Parquet file: {_describe(file_path)} with shape {df.shape}")
         elif ext in ['.xls', '.xlsx']:
-            df = pd.read_excel(file_path)
-            logging.info(f"Loaded Excel file: {file_path} with shape {df.shape}")
+            df = load_excel(file_path, sheet, cache_folder=excel_cache_folder, file_ext=ext, digest=digest)
+            logging.info(f"Loaded Excel file: {_describe(file_path)} with shape {df.shape}")
         else:
             msg = f"Unsupported file extension: {ext}"
             logging.error(msg)
             raise ValueError(msg)
     except Exception as e:
-        logging.error(f"Error loading file {file_path}: {e}")
+        logging.error(f"Error loading file {_describe(file_path)}: {e}")
+        raise ValueError(f"Error loading file: {e}")
+
+    return df
+
+def load_data_in_chunks(file_path, chunksize=CHUNK_SIZE, **read_kwargs):
+    """
+    Yield a CSV file (optionally gzip, bz2 or zstd compressed) as a sequence
+    of DataFrames of at most `chunksize` rows, so that only one chunk is held
+    in memory at a time. Extra keyword arguments are forwarded to pd.read_csv.
+    """
+    ext = _extension(file_path)
+    fmt, compression = split_extension(ext)
+    if fmt != '.csv':
+        msg = f"Chunked loading is only supported for CSV files, got: {ext}"
+        logging.error(msg)
+        raise ValueError(msg)
+
+    try:
+        source = open_decompressed(file_path, compression) if compression else file_path
+        try:
+            with pd.read_csv(source, chunksize=chunksize, **read_kwargs) as reader:
+                for chunk in reader:
+                    yield chunk
+        finally:
+            if compression:
+                source.close()
+    except Exception as e:
+        logging.error(f"Error loading file {file_path} in chunks: {e}")
+        raise ValueError(f"Error loading file: {e}")
+
+def _iter_batches(source, fmt, sheet, batch_rows, nrows):
+    """DataFrames of at most `batch_rows` rows read from the start of `source`, `nrows` in all (None = every row)."""
+    if fmt == '.csv':
+        with pd.read_csv(source, chunksize=batch_rows, nrows=nrows) as reader:
+            yield from reader
+    elif fmt == '.jsonl':
+        with pd.read_json(source, lines=True, convert_dates=False, chunksize=batch_rows, nrows=nrows) as reader:
+            yield from reader
+    elif fmt == '.parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=batch_rows):
+            yield batch.to_pandas()
+    elif fmt in ('.xls', '.xlsx'):
+        sheet_name = _resolve_sheet(excel_sheet_names(source, fmt), sheet)
+        yield pd.read_excel(_rewind(source), sheet_name=sheet_name, nrows=nrows,
+                            engine='calamine' if CALAMINE_AVAILABLE else None)
+    else:
+        raise ValueError(f"Unsupported file extension: {fmt}")
+
+def load_sample(file_path, rows=PREVIEW_ROWS, method='head', time_budget=PREVIEW_TIME_BUDGET_SECONDS, sheet=None,
+                file_ext=None, truncated=False):
+    """
+    Load a bounded sample of a file, in time independent of its size:
+    - method='head': its first `rows` rows, the only ones parsed (plus one,
+      to tell whether the file goes on)
+    - method='sample': a uniform random sample of `rows` rows (bottom-k of
+      random keys, kept in file order) over the rows read until the end of
+      the file or `time_budget` seconds, whichever comes first
+
+    `truncated` marks a CSV or JSON Lines file object holding only the
+    beginning of the file, e.g. the first megabytes of an upload: its cut
+    last line is dropped. Workbooks are read with `nrows` in head mode.
+
+    Returns:
+    - pd.DataFrame: the sample
+    - dict: 'method', 'rows' (in the sample), 'rows_read' and 'complete'
+      (whether every row of the file was read)
+    """
+    if method not in ('head', 'sample'):
+        raise ValueError(f"Unknown sampling method '{method}', expected 'head' or 'sample'")
+    ext = _extension(file_path, file_ext)
+    fmt, compression = split_extension(ext)
+    deadline = time.perf_counter() + time_budget
+    rng = np.random.default_rng(0)
+
+    source = open_decompressed(file_path, compression) if compression else file_path
+    if truncated and fmt in ('.csv', '.jsonl'):
+        source = io.BufferedReader(_CompleteLinesReader(source))
+    # Random samples are drawn from larger batches, for fewer concatenations
+    batch_rows = rows + 1 if method == 'head' else max(rows, CHUNK_SIZE // 10)
+    sample, keys, rows_read, complete = None, None, 0, not truncated
+    try:
+        for batch in _iter_batches(source, fmt, sheet, batch_rows, rows + 1 if method == 'head' else None):
+            rows_read += len(batch)
+            if method == 'head':
+                sample = batch if sample is None else pd.concat([sample, batch])
+                if rows_read > rows:
+                    # A row past the sample: the file has more than `rows` rows
+                    sample, rows_read, complete = sample.iloc[:rows], rows, False
+                    break
+                continue
+            # Bottom-k sampling: the rows with the `rows` smallest random keys so far
+            batch_keys = rng.random(len(batch))
+            if sample is not None:
+                batch, batch_keys = pd.concat([sample, batch]), np.concatenate([keys, batch_keys])
+            keep = np.sort(np.argsort(batch_keys, kind='stable')[:rows])
+            sample, keys = batch.iloc[keep], batch_keys[keep]
+            if time.perf_counter() > deadline:
+                complete = False
+                break
+    except Exception as e:
+        logging.error(f"Error sampling file {_describe(file_path)}: {e}")
         raise ValueError(f"Error loading file: {e}")
+    finally:
+        if source is not file_path:
+            source.close()
 
-    return df
\ No newline at end of file
+    sample = sample.reset_index(drop=True) if sample is not None else pd.DataFrame()
+    logging.info(f"Sampled {len(sample)} of {rows_read} rows read from {_describe(file_path)} ({method})")
+    return sample, {'method': method, 'rows': len(sample), 'rows_read': rows_read, 'complete': complete}
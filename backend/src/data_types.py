@@ -1,103 +1,230 @@
 import pandas as pd
+import numpy as np
 import logging
 
-def fix_data_types(df):
+from utils.config import TYPE_INFERENCE_SAMPLE_SIZE, TYPE_INFERENCE_WORKERS, TYPE_INFERENCE_BACKEND
+from utils.helper import working_copy
+from parallel import map_columns
+from datetime_inference import infer_datetime_formats, infer_epoch_unit, parse_datetimes, EPOCH_RANGES
+
+BOOL_MAP = {
+    'true': True, 'yes': True, '1': True,
+    'false': False, 'no': False, '0': False
+}
+
+def _sample_values(s, sample_size, seed=0):
+    """Bounded random sample of the non-null values of a column."""
+    positions = np.flatnonzero(s.notna().to_numpy())
+    if len(positions) > sample_size:
+        positions = np.random.default_rng(seed).choice(positions, size=sample_size, replace=False)
+    return s.iloc[positions]
+
+def _parses(values, parser, **kwargs):
+    try:
+        parser(values, errors='raise', **kwargs)
+        return True
+    except (ValueError, TypeError, OverflowError):
+        return False
+
+def _fix_column(col, s, profile=None, sample_size=TYPE_INFERENCE_SAMPLE_SIZE):
     """
-    Fixes common data type issues in the DataFrame:
-    - Converts numeric-looking strings to numeric
-    - Parses datetime strings to datetime64
-    - Converts categorical-like columns to 'category'
-    - Standardizes boolean columns
-    - Strips whitespace from strings and column names
-    - Logs all changes
+    Decide and apply the type conversion of a single column.
+
+    Returns:
+    - pd.Series or None: converted column, None if it is left unchanged
+    - dict or None: log entry
     """
-    df = df.copy()
-    log = []
+    original_dtype = s.dtype
+    col_profile = profile[col] if profile is not None and col in profile else None
 
-    for col in df.columns:
-        original_dtype = df[col].dtype
+    if pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s):
+
+        if col_profile is not None:
+            bool_like = col_profile.bool_like
+        else:
+            bool_like = set(s.dropna().str.lower().unique()).issubset(BOOL_MAP)
+        if bool_like:
+            logging.info(f"Column '{col}' converted from {original_dtype} to boolean")
+            return s.str.lower().map(BOOL_MAP), {
+                'column': col,
+                'from': str(original_dtype),
+                'to': 'bool',
+                'action': 'converted to boolean'
+            }
 
-        if pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col]):
+        sample = _sample_values(s, sample_size)
 
-            lower_vals = df[col].dropna().str.lower().unique()
-            if set(lower_vals).issubset({'true', 'false', 'yes', 'no', '0', '1'}):
-                df[col] = df[col].str.lower().map({
-                    'true': True, 'yes': True, '1': True,
-                    'false': False, 'no': False, '0': False
-                })
-                log.append({
-                    'column': col,
-                    'from': str(original_dtype),
-                    'to': 'bool',
-                    'action': 'converted to boolean'
-                })
-                logging.info(f"Column '{col}' converted from {original_dtype} to boolean")
-                continue
-            
+        # A single unparseable value makes the full-column conversion
+        # fail, so the sample alone is enough to reject a column
+        if _parses(sample, pd.to_numeric):
             try:
-                print
-                converted = pd.to_numeric(df[col], errors='raise')
-                df[col] = converted
-                log.append({
+                converted = pd.to_numeric(s, errors='raise')
+                logging.info(f"Column '{col}' converted from {original_dtype} to numeric")
+                return converted, {
                     'column': col,
                     'from': str(original_dtype),
                     'to': 'numeric',
                     'action': 'converted from string to numeric'
-                })
-                logging.info(f"Column '{col}' converted from {original_dtype} to numeric")
-                continue
-            except:
+                }
+            except (ValueError, TypeError):
                 pass
 
-            try:
-                # First, try parsing with a known format (fast and consistent)
-                converted = pd.to_datetime(df[col], errors='raise', format='%Y-%m-%d')
-                df[col] = converted
-                log.append({
+        # Formats are decided on the sample; non-date text is rejected there
+        formats = infer_datetime_formats(sample, col)
+        converted = parse_datetimes(s, formats) if formats is not None else None
+        if converted is not None and converted.notna().any():
+            if converted.notna().sum() == s.count():
+                logging.info(f"Column '{col}' converted from {original_dtype} to datetime")
+                return converted, {
                     'column': col,
                     'from': str(original_dtype),
                     'to': 'datetime',
                     'action': 'converted from string to datetime'
-                })
-                logging.info(f"Column '{col}' converted from {original_dtype} to datetime")
-                continue
-            except Exception:
-                # Fall back to flexible parsing with 'coerce'
-                converted = pd.to_datetime(df[col], errors='coerce')
-                if converted.notna().sum() > 0:
-                    df[col] = converted
-                    log.append({
-                        'column': col,
-                        'from': str(original_dtype),
-                        'to': 'datetime (partial)',
-                        'action': 'some values converted to datetime; invalids coerced to NaT'
-                    })
-                    logging.warning(f"Column '{col}' had invalid datetime values. Converted valid ones; rest set as NaT.")
-                    continue
-
-            unique_count = df[col].nunique(dropna=True)
-            total_count = len(df[col])
-            if unique_count / total_count < 0.1:
-                df[col] = df[col].astype('category')
-                log.append({
-                    'column': col,
-                    'from': str(original_dtype),
-                    'to': 'category',
-                    'action': f'converted to category ({unique_count} unique values)'
-                })
-                logging.info(f"Column '{col}' converted from {original_dtype} to category with {unique_count} unique values")
-        elif pd.api.types.is_numeric_dtype(df[col]):
-            unique_vals = df[col].dropna().unique()
-            if set(unique_vals).issubset({0, 1}):
-                df[col] = df[col].astype(bool)
-                log.append({
-                    'column': col,
-                    'from': str(original_dtype),
-                    'to': 'bool',
-                    'action': 'converted numeric 0/1 to boolean'
-                })
-                logging.info(f"Column '{col}' converted from {original_dtype} to boolean")
-                continue
+                }
+            logging.warning(f"Column '{col}' had invalid datetime values. Converted valid ones; rest set as NaT.")
+            return converted, {
+                'column': col,
+                'from': str(original_dtype),
+                'to': 'datetime (partial)',
+                'action': 'some values converted to datetime; invalids coerced to NaT'
+            }
+
+        if col_profile is not None:
+            unique_count = col_profile.distinct
+        else:
+            unique_count = s.nunique(dropna=True)
+        total_count = len(s)
+        if unique_count / total_count < 0.1:
+            logging.info(f"Column '{col}' converted from {original_dtype} to category with {unique_count} unique values")
+            return s.astype('category'), {
+                'column': col,
+                'from': str(original_dtype),
+                'to': 'category',
+                'action': f'converted to category ({unique_count} unique values)'
+            }
+    elif pd.api.types.is_numeric_dtype(s):
+        if col_profile is not None:
+            bool_like = col_profile.bool_like
+        else:
+            bool_like = set(s.dropna().unique()).issubset({0, 1})
+        if bool_like:
+            logging.info(f"Column '{col}' converted from {original_dtype} to boolean")
+            return s.astype(bool), {
+                'column': col,
+                'from': str(original_dtype),
+                'to': 'bool',
+                'action': 'converted numeric 0/1 to boolean'
+            }
+
+        unit = infer_epoch_unit(col, s)
+        if unit is not None:
+            logging.info(f"Column '{col}' converted from {original_dtype} ({unit}) to datetime")
+            return parse_datetimes(s, (unit,)), {
+                'column': col,
+                'from': str(original_dtype),
+                'to': 'datetime',
+                'action': f"converted from {'milliseconds' if unit == 'epoch_ms' else 'seconds'} since epoch to datetime"
+            }
+
+    return None, None
+
+def column_conversion(col, s, entry, sample_size=TYPE_INFERENCE_SAMPLE_SIZE):
+    """
+    The conversion `_fix_column` applied to the raw column `s` (`entry` is
+    its log entry), as `fix_data_types(conversions=...)` takes it: {'to':
+    'bool' | 'numeric' | 'datetime' | 'category'}, plus the 'formats' of
+    datetime columns (found again from the same sample, or the format cache).
+    """
+    to = entry['to'].split(' ')[0]
+    conversion = {'to': to}
+    if to == 'datetime':
+        if pd.api.types.is_numeric_dtype(s):
+            formats = (infer_epoch_unit(col, s),)
+        else:
+            formats = infer_datetime_formats(_sample_values(s, sample_size), col)
+        conversion['formats'] = list(formats)
+    return conversion
+
+def _convert_column(col, s, conversions):
+    """
+    Apply a fitted conversion (see column_conversion) without inference;
+    values that don't convert become missing.
+
+    Returns the same as _fix_column.
+    """
+    to = conversions[col]['to']
+    if to == 'bool':
+        if pd.api.types.is_bool_dtype(s):
+            return None, None
+        converted = s.astype(bool) if pd.api.types.is_numeric_dtype(s) else s.astype(str).str.lower().map(BOOL_MAP)
+    elif to == 'numeric':
+        if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            return None, None
+        converted = pd.to_numeric(s, errors='coerce')
+    elif to == 'datetime':
+        if pd.api.types.is_datetime64_any_dtype(s):
+            return None, None
+        formats = tuple(conversions[col]['formats'])
+        if formats[0] not in EPOCH_RANGES and not (pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s)):
+            s = s.astype(str).where(s.notna())
+        converted = parse_datetimes(s, formats)
+    elif to == 'category':
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            return None, None
+        converted = s.astype('category')
+    else:
+        raise ValueError(f"Unknown conversion '{to}' for column '{col}'")
+
+    return converted, {
+        'column': col,
+        'from': str(s.dtype),
+        'to': to,
+        'action': f'converted to {to} (fitted)'
+    }
+
+def fix_data_types(df, profile=None, sample_size=TYPE_INFERENCE_SAMPLE_SIZE, conversions=None,
+                   n_jobs=TYPE_INFERENCE_WORKERS, backend=TYPE_INFERENCE_BACKEND):
+    """
+    Fixes common data type issues in the DataFrame:
+    - Converts numeric-looking strings to numeric
+    - Parses datetime strings to datetime64
+    - Converts categorical-like columns to 'category'
+    - Standardizes boolean columns
+    - Strips whitespace from strings and column names
+    - Logs all changes
+
+    The target type of each text column is decided on a random sample of at
+    most `sample_size` values; the full column is then converted once, with
+    the explicit datetime formats found by datetime_inference (which also
+    turns integer epoch columns named like timestamps into datetimes).
+
+    If a DataProfile of `df` is given, boolean detection and unique counts are
+    read from it, and every converted column is discarded from the profile.
+    Columns are sharded across `n_jobs` workers of `backend` (see
+    parallel.map_columns); serial by default, since inference is GIL-bound.
+
+    `conversions` (column -> conversion, see column_conversion), e.g. from a
+    fitted recipe.Recipe, skips inference: only those columns are converted,
+    the way they were when the recipe was fitted.
+    """
+    df = working_copy(df)
+    log = []
+
+    if conversions is not None:
+        columns = [col for col in df.columns if col in conversions]
+        results = map_columns(_convert_column, df, columns, conversions, n_jobs=n_jobs, backend=backend)
+    else:
+        columns = list(df.columns)
+        results = map_columns(_fix_column, df, columns, profile, sample_size, n_jobs=n_jobs, backend=backend)
+
+    for col, (converted, entry) in zip(columns, results):
+        if converted is not None:
+            df[col] = converted
+            log.append(entry)
+
+    if profile is not None:
+        for entry in log:
+            profile.discard(entry['column'])
 
     return df, log
 
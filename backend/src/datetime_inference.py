@@ -0,0 +1,199 @@
+import re
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.config import DATETIME_MIN_SHARE, DATETIME_MAX_FORMATS, DATETIME_FORMAT_CACHE_SIZE
+
+# Formats tried on a sample, in order of preference: 'ISO8601' covers dates,
+# times, fractional seconds and UTC offsets; day-first comes before month-first
+CANDIDATE_FORMATS = [
+    'ISO8601',
+    '%Y/%m/%d', '%Y/%m/%d %H:%M:%S',
+    '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%m-%d-%Y', '%d.%m.%Y',
+    '%d/%m/%Y %H:%M', '%m/%d/%Y %H:%M', '%d/%m/%Y %H:%M:%S', '%m/%d/%Y %H:%M:%S',
+    '%d %b %Y', '%b %d %Y', '%b %d, %Y', '%d %B %Y', '%B %d %Y', '%B %d, %Y',
+]
+
+# Integer timestamps accepted as epoch seconds / milliseconds: 1990-01-01 to 2100-01-01
+EPOCH_RANGES = {
+    'epoch_s': (631_152_000, 4_102_444_800),
+    'epoch_ms': (631_152_000_000, 4_102_444_800_000),
+}
+
+# Name tokens of integer columns that may hold epoch timestamps ('created_at', 'eventTime', 'ts', ...)
+TIMESTAMP_TOKENS = {'ts', 'time', 'timestamp', 'epoch', 'date', 'datetime'}
+
+
+class FormatCache:
+    """
+    Winning datetime formats by column name, so files sharing a schema skip
+    the candidate search. The least recently used names are dropped beyond
+    `max_size`; thread-safe, as columns are typed in parallel.
+    """
+
+    def __init__(self, max_size=DATETIME_FORMAT_CACHE_SIZE):
+        self.max_size = max_size
+        self._formats = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, col):
+        with self._lock:
+            formats = self._formats.get(col)
+            if formats is not None:
+                self._formats.move_to_end(col)
+            return formats
+
+    def put(self, col, formats):
+        with self._lock:
+            self._formats[col] = formats
+            self._formats.move_to_end(col)
+            while len(self._formats) > self.max_size:
+                self._formats.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._formats.clear()
+
+
+FORMAT_CACHE = FormatCache()
+
+
+def _parse(values, fmt):
+    """Parse with one format, NaT where it doesn't match. Offsets are converted to naive UTC."""
+    if fmt in EPOCH_RANGES:
+        return pd.to_datetime(pd.to_numeric(values, errors='coerce'), unit=fmt[len('epoch_'):], errors='coerce')
+    if fmt == 'ISO8601':
+        return pd.to_datetime(values, format=fmt, errors='coerce', utc=True).dt.tz_convert(None)
+    return pd.to_datetime(values, format=fmt, errors='coerce')
+
+
+def _parse_formats(values, formats):
+    result = _parse(values, formats[0])
+    for fmt in formats[1:]:
+        missing = result.isna() & values.notna()
+        if not missing.any():
+            break
+        # where() rather than setitem: the ISO8601 result comes from a .dt accessor
+        result = result.where(~missing, _parse(values[missing], fmt))
+    return result
+
+
+def parse_datetimes(values, formats):
+    """
+    Parse a column with the formats found by infer_datetime_formats, each
+    one only applied to the values the previous ones left unparsed.
+    Unparseable values become NaT.
+
+    Columns with repeated values (dates without a time, ...) are factorized
+    first, so each distinct value is parsed once.
+    """
+    codes, uniques = pd.factorize(values)
+    if len(uniques) > len(values) // 2:
+        return _parse_formats(values, formats)
+
+    parsed = _parse_formats(pd.Series(uniques, dtype=values.dtype), formats).to_numpy()
+    # Missing values have code -1, which takes the NaT appended at the end
+    parsed = np.append(parsed, np.datetime64('NaT', 'ns'))
+    return pd.Series(parsed.take(codes), index=values.index, name=values.name)
+
+
+def _search_formats(sample, min_share, max_formats):
+    text = sample.astype(str)
+    # Every candidate has digits: text without any is rejected without parsing
+    if text.str.contains(r'\d', regex=True).mean() < min_share:
+        return None
+
+    formats, remaining = [], text
+    while len(formats) < max_formats and not remaining.empty:
+        best, best_parsed = None, None
+        for fmt in CANDIDATE_FORMATS:
+            if fmt in formats:
+                continue
+            parsed = _parse(remaining, fmt).notna()
+            if best is None or parsed.sum() > best_parsed.sum():
+                best, best_parsed = fmt, parsed
+            if parsed.all():
+                break
+        if not best_parsed.any():
+            break
+        formats.append(best)
+        remaining = remaining[~best_parsed.to_numpy()]
+
+    if formats and 1 - len(remaining) / len(text) >= min_share:
+        return tuple(formats)
+
+    # No explicit format explains the sample: per-element parsing, still judged on the sample only
+    if _parse(text, 'mixed').notna().mean() >= min_share:
+        return ('mixed',)
+    return None
+
+
+def infer_datetime_formats(sample, col=None, min_share=DATETIME_MIN_SHARE, max_formats=DATETIME_MAX_FORMATS,
+                           cache=FORMAT_CACHE):
+    """
+    Guess the datetime formats of a text column from a sample of its values.
+
+    The candidate formats covering most of the sample win, up to
+    `max_formats` of them for columns mixing several formats. The column is
+    a datetime column if at least `min_share` of the sample parses;
+    otherwise it is rejected without ever parsing the full column.
+    Flexible per-element parsing ('mixed') is only chosen when no explicit
+    format explains the sample.
+
+    When `col` is given, the winning formats are remembered under that name
+    and tried first on the next sample of a column with the same name. They
+    are kept only if they parse the whole sample or at least as much of it
+    as a fresh search would, so a column is never typed worse because of an
+    earlier upload.
+
+    Returns:
+    - tuple or None: formats for parse_datetimes, None if not a datetime column
+    """
+    sample = sample.dropna()
+    if sample.empty:
+        return None
+
+    cached = cache.get(col) if cache is not None and col is not None else None
+    cached_share = 0.0
+    if cached is not None:
+        cached_share = parse_datetimes(sample.astype(str), cached).notna().mean()
+        if cached_share == 1:
+            return cached
+
+    formats = _search_formats(sample, min_share, max_formats)
+    if cached_share >= min_share:
+        if formats is None or cached_share >= parse_datetimes(sample.astype(str), formats).notna().mean():
+            return cached
+    if formats is not None and cache is not None and col is not None:
+        cache.put(col, formats)
+        logging.info(f"[datetime_inference] Column '{col}' parsed with {list(formats)}")
+    return formats
+
+
+def _name_tokens(col):
+    snake = re.sub(r'(?<=[a-z0-9])(?=[A-Z])', '_', str(col)).lower()
+    return [token for token in re.split(r'[^a-z0-9]+', snake) if token]
+
+
+def infer_epoch_unit(col, s):
+    """
+    'epoch_s' or 'epoch_ms' for an integer column named like a timestamp
+    ('created_at', 'eventTime', 'ts', ...) whose values all fall in
+    EPOCH_RANGES for that unit, else None.
+    """
+    tokens = _name_tokens(col)
+    if not (TIMESTAMP_TOKENS.intersection(tokens) or tokens[-1:] == ['at']):
+        return None
+    values = s.dropna()
+    if values.empty or pd.api.types.is_bool_dtype(values) or not (values % 1 == 0).all():
+        return None
+
+    low, high = values.min(), values.max()
+    for unit, (start, end) in EPOCH_RANGES.items():
+        if start <= low and high <= end:
+            return unit
+    return None
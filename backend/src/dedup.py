@@ -0,0 +1,99 @@
+import logging
+import numpy as np
+import pandas as pd
+
+# FNV-1a style constants used to fold per-column hashes into one row hash
+_HASH_SEED = np.uint64(0xcbf29ce484222325)
+_HASH_PRIME = np.uint64(0x100000001b3)
+
+
+class RowHashIndex:
+    """
+    Row fingerprints built from vectorized 64-bit column hashes.
+
+    Each column is hashed once (pd.util.hash_pandas_object) and cached, so the
+    overview duplicate count and remove_duplicates share the work, and a
+    `subset` only combines the columns it needs. Stages that rewrite a column
+    call `discard(col)` so it is rehashed on next use; `take(positions)` keeps
+    the cache aligned after rows are dropped.
+
+    Row hashes passed to `remember` are kept in a sorted "seen" array, which
+    can be saved and loaded so later batches are deduplicated against earlier
+    ones without reloading them. Two different rows sharing a 64-bit hash is
+    possible but negligible at the dataset sizes handled here.
+    """
+
+    def __init__(self, seen=None, key_columns=None):
+        self._columns = {}
+        self.seen = np.empty(0, dtype='uint64') if seen is None else np.asarray(seen, dtype='uint64')
+        self.key_columns = key_columns
+
+    def column_hashes(self, df, col):
+        hashes = self._columns.get(col)
+        if hashes is None or len(hashes) != len(df):
+            hashes = pd.util.hash_pandas_object(df[col], index=False).to_numpy()
+            self._columns[col] = hashes
+        return hashes
+
+    def row_hashes(self, df, subset=None):
+        columns = list(subset) if subset else list(df.columns)
+        hashes = np.full(len(df), _HASH_SEED, dtype='uint64')
+        for col in columns:
+            hashes ^= self.column_hashes(df, col)
+            hashes *= _HASH_PRIME
+        return hashes
+
+    def duplicated(self, df, subset=None, keep='first', order=None):
+        """
+        Boolean mask of duplicate rows, like DataFrame.duplicated, that also
+        flags rows already seen in earlier batches.
+
+        Parameters:
+        - keep (str): 'first', 'last' or False, as in DataFrame.duplicated.
+        - order (array): Optional row positions giving the order in which
+          duplicates are ranked (e.g. latest timestamp first); the mask is
+          returned in that order.
+        """
+        self._check_key(df, subset)
+        hashes = self.row_hashes(df, subset)
+        if order is not None:
+            hashes = hashes[order]
+
+        mask = pd.Series(hashes).duplicated(keep=keep).to_numpy()
+        if len(self.seen):
+            # Not in place: under copy-on-write the mask above is a read-only view
+            mask = mask | np.isin(hashes, self.seen)
+        return mask
+
+    def remember(self, df, subset=None):
+        """Add the rows of `df` to the seen set used by later batches."""
+        self._check_key(df, subset)
+        self.key_columns = list(subset) if subset else list(df.columns)
+        self.seen = np.union1d(self.seen, self.row_hashes(df, subset))
+
+    def discard(self, col):
+        self._columns.pop(col, None)
+
+    def clear(self):
+        """Forget the cached column hashes (e.g. before the next batch); keeps `seen`."""
+        self._columns.clear()
+
+    def take(self, positions):
+        """Keep the cached column hashes aligned with `df.iloc[positions]`."""
+        for col, hashes in self._columns.items():
+            self._columns[col] = hashes[positions]
+
+    def save(self, path):
+        np.savez(path, seen=self.seen, key_columns=np.asarray(self.key_columns or [], dtype=str))
+        logging.info(f"[RowHashIndex] Saved {len(self.seen)} row hashes to {path}")
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            key_columns = data['key_columns'].tolist() or None
+            return cls(seen=data['seen'], key_columns=key_columns)
+
+    def _check_key(self, df, subset):
+        columns = list(subset) if subset else list(df.columns)
+        if len(self.seen) and self.key_columns is not None and columns != self.key_columns:
+            raise ValueError(f"Row hashes were built from columns {self.key_columns}, got {columns}")
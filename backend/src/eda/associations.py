@@ -0,0 +1,250 @@
+import logging
+import numpy as np
+import pandas as pd
+
+from utils.config import ASSOC_MAX_LEVELS, ASSOC_TOP_K, ASSOC_BATCH_CELLS
+
+
+class CovarianceAccumulator:
+    """
+    Pairwise-complete covariance of numeric columns, accumulated chunk by chunk.
+
+    Each chunk's per-pair count, means, sums of squares and co-moments are
+    computed with a few matrix products over the masked (NaN -> 0) chunk,
+    then merged into the running totals with Chan et al.'s parallel
+    Welford update, so results match a single pass over all rows.
+    State is five k x k matrices for k columns.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = np.zeros((k, k))
+        self.mean = np.zeros((k, k))   # mean[i, j]: mean of column i over rows where i and j are present
+        self.m2 = np.zeros((k, k))     # m2[i, j]: sum of squared deviations of column i over those rows
+        self.comoment = np.zeros((k, k))
+
+    def update(self, X):
+        """Add a chunk given as a float matrix (rows x columns, NaN = missing)."""
+        if X.shape[0] == 0 or X.shape[1] == 0:
+            return
+
+        mask = ~np.isnan(X)
+        with np.errstate(invalid='ignore'):
+            shift = np.nan_to_num(np.nanmean(X, axis=0))
+        Z = np.where(mask, X - shift, 0.0)
+        M = mask.astype('float64')
+
+        n = M.T @ M
+        sums = Z.T @ M
+        mean = np.divide(sums, n, out=np.zeros_like(sums), where=n > 0)
+        m2 = (Z ** 2).T @ M - sums * mean
+        comoment = Z.T @ Z - sums * mean.T
+        mean += shift[:, None]
+
+        # Chan's merge of (n, mean, m2, comoment) into the running totals
+        total = self.n + n
+        fraction = np.divide(n, total, out=np.zeros_like(total), where=total > 0)
+        weight = self.n * fraction
+        delta = mean - self.mean
+        self.mean += delta * fraction
+        self.m2 += m2 + delta ** 2 * weight
+        self.comoment += comoment + delta * delta.T * weight
+        self.n = total
+
+    def correlation(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.comoment / np.sqrt(self.m2 * self.m2.T)
+        corr[self.n < 2] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+
+class ContingencyAccumulator:
+    """
+    Sparse contingency tables for every pair of categorical columns,
+    accumulated chunk by chunk.
+
+    Each column's values are mapped to level ids (columns with more than
+    `max_levels` distinct values are dropped as too high-cardinality). Cells
+    are counted with one bincount per column against all columns to its
+    right, and only non-zero cells are kept, as sorted int64 keys
+    ((a * n_columns + b) * max_levels + level_a) * max_levels + level_b
+    with their counts.
+    """
+
+    def __init__(self, columns, max_levels=ASSOC_MAX_LEVELS, batch_cells=ASSOC_BATCH_CELLS):
+        self.columns = list(columns)
+        self.max_levels = max_levels
+        self.batch_cells = batch_cells
+        self.levels = [{} for _ in self.columns]
+        self.dropped = set()
+        self.keys = np.empty(0, dtype='int64')
+        self.counts = np.empty(0, dtype='int64')
+
+    def _codes(self, chunk):
+        """Level ids per cell (rows x columns), -1 where missing or dropped."""
+        codes = np.full((len(chunk), len(self.columns)), -1, dtype='int32')
+        for j, col in enumerate(self.columns):
+            if j in self.dropped:
+                continue
+            local, uniques = pd.factorize(chunk[col], use_na_sentinel=True)
+            levels = self.levels[j]
+            if len(uniques) <= self.max_levels:
+                for value in uniques:
+                    levels.setdefault(value, len(levels))
+            if len(uniques) > self.max_levels or len(levels) > self.max_levels:
+                self.dropped.add(j)
+                logging.info(f"[associations] Skipping '{col}': more than {self.max_levels} levels")
+                continue
+            mapping = np.array([levels[value] for value in uniques], dtype='int32')
+            codes[:, j] = np.where(local >= 0, mapping[local] if len(mapping) else -1, -1)
+        return codes
+
+    def update(self, chunk):
+        codes = self._codes(chunk)
+        n_cols = codes.shape[1]
+        if n_cols < 2 or len(codes) == 0:
+            return
+
+        n_levels = np.array([len(levels) for levels in self.levels], dtype='int32')
+        rows = max(1, self.batch_cells // n_cols)
+        new_keys, new_counts = [], []
+
+        for a in range(n_cols - 1):
+            if a in self.dropped or n_levels[a] == 0:
+                continue
+            width = n_cols - a - 1
+            la_count, lb_count = n_levels[a], max(1, n_levels[a + 1:].max())
+            offsets = np.arange(width, dtype='int32')
+            cells = np.zeros(width * la_count * lb_count, dtype='int64')
+
+            # Dense counts of the (a, b) tables for every b > a, built in row batches
+            for start in range(0, len(codes), rows):
+                left = codes[start:start + rows, a]
+                present = left >= 0
+                right = codes[start:start + rows, a + 1:][present]
+                keys = (offsets * la_count + left[present, None]) * lb_count + right
+                cells += np.bincount(keys[right >= 0], minlength=len(cells))
+
+            nonzero = np.flatnonzero(cells)
+            offset, la, lb = np.unravel_index(nonzero, (width, la_count, lb_count))
+            pair = a * n_cols + (a + 1 + offset)
+            new_keys.append((pair * self.max_levels + la) * self.max_levels + lb)
+            new_counts.append(cells[nonzero])
+
+        if new_keys:
+            self._merge(np.concatenate(new_keys), np.concatenate(new_counts))
+
+    def _merge(self, keys, counts):
+        keys = np.concatenate([self.keys, keys])
+        counts = np.concatenate([self.counts, counts])
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=counts).astype('int64')
+
+    def cramers_v(self):
+        """
+        Cramér's V of every pair with a non-empty table.
+
+        Returns:
+        - (a, b, v): column index arrays (a < b) and their V
+        """
+        n_cols = len(self.columns)
+        pair, cell = np.divmod(self.keys, self.max_levels ** 2)
+        la, lb = np.divmod(cell, self.max_levels)
+        a, b = np.divmod(pair, n_cols)
+        keep = ~(np.isin(a, list(self.dropped)) | np.isin(b, list(self.dropped)))
+        pair, la, lb, t = pair[keep], la[keep], lb[keep], self.counts[keep].astype('float64')
+        if len(t) == 0:
+            return np.empty(0, dtype='int64'), np.empty(0, dtype='int64'), np.empty(0)
+
+        # Row/column margins of each pair's table, from its own cells
+        row_ids, row_inv = np.unique(pair * self.max_levels + la, return_inverse=True)
+        col_ids, col_inv = np.unique(pair * self.max_levels + lb, return_inverse=True)
+        r = np.bincount(row_inv, weights=t)[row_inv]
+        c = np.bincount(col_inv, weights=t)[col_inv]
+
+        pairs, pair_inv = np.unique(pair, return_inverse=True)
+        phi2 = np.bincount(pair_inv, weights=t ** 2 / (r * c)) - 1.0
+        # Levels observed in each pair's table
+        n_rows = np.bincount(np.searchsorted(pairs, row_ids // self.max_levels), minlength=len(pairs))
+        n_cols_seen = np.bincount(np.searchsorted(pairs, col_ids // self.max_levels), minlength=len(pairs))
+        k = np.minimum(n_rows, n_cols_seen) - 1
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            v = np.sqrt(np.clip(phi2, 0.0, None) / k)
+        v[k < 1] = np.nan
+        pair_a, pair_b = np.divmod(pairs, n_cols)
+        return pair_a, pair_b, np.clip(v, 0.0, 1.0)
+
+
+class AssociationAccumulator:
+    """
+    Numeric (Pearson) and categorical (Cramér's V) associations, accumulated
+    over one or many chunks. Columns are taken from the first chunk unless
+    given: non-boolean numeric columns, and categorical/boolean columns.
+    """
+
+    def __init__(self, num_cols=None, cat_cols=None, max_levels=ASSOC_MAX_LEVELS):
+        self.num_cols = num_cols
+        self.cat_cols = cat_cols
+        self.max_levels = max_levels
+        self._numeric = None
+        self._categorical = None
+
+    def update(self, chunk):
+        if self._numeric is None:
+            if self.num_cols is None:
+                self.num_cols = [col for col in chunk.columns if pd.api.types.is_numeric_dtype(chunk[col])
+                                 and not pd.api.types.is_bool_dtype(chunk[col])]
+            if self.cat_cols is None:
+                self.cat_cols = [col for col in chunk.columns if pd.api.types.is_bool_dtype(chunk[col])
+                                 or isinstance(chunk[col].dtype, pd.CategoricalDtype)]
+            self._numeric = CovarianceAccumulator(self.num_cols)
+            self._categorical = ContingencyAccumulator(self.cat_cols, max_levels=self.max_levels)
+
+        if self.num_cols:
+            self._numeric.update(np.column_stack(
+                [chunk[col].to_numpy(dtype='float64', na_value=np.nan) for col in self.num_cols]))
+        if len(self.cat_cols) > 1:
+            self._categorical.update(chunk)
+
+    def correlation(self):
+        """Pearson correlation matrix of the numeric columns."""
+        if self._numeric is None:
+            return np.empty((0, 0))
+        return self._numeric.correlation()
+
+    def top(self, k=ASSOC_TOP_K):
+        """
+        The `k` strongest associations, as dicts with 'columns', 'method'
+        ('pearson' or 'cramers_v') and 'value', strongest first. Candidates
+        are ranked with argpartition, so no list of all pairs is built.
+        """
+        if self._numeric is None:
+            return []
+
+        corr = self.correlation()
+        i, j = np.triu_indices(len(self.num_cols), k=1)
+        r = corr[i, j]
+        cat_a, cat_b, v = self._categorical.cramers_v() if len(self.cat_cols) > 1 else ([], [], np.empty(0))
+
+        strength = np.concatenate([np.abs(r), v])
+        strength = np.where(np.isnan(strength), -1.0, strength)
+        if len(strength) > k:
+            best = np.argpartition(-strength, k)[:k]
+        else:
+            best = np.arange(len(strength))
+        best = best[np.argsort(-strength[best], kind='stable')]
+
+        result = []
+        for idx in best:
+            if strength[idx] < 0:
+                continue
+            if idx < len(r):
+                result.append({'columns': [self.num_cols[i[idx]], self.num_cols[j[idx]]],
+                               'method': 'pearson', 'value': float(r[idx])})
+            else:
+                idx -= len(r)
+                result.append({'columns': [self.cat_cols[cat_a[idx]], self.cat_cols[cat_b[idx]]],
+                               'method': 'cramers_v', 'value': float(v[idx])})
+        return result
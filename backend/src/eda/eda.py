@@ -1,26 +1,47 @@
 import pandas as pd
 import numpy as np
-# import matplotlib.pyplot as plt
-# import seaborn as sns
+import json
 import logging
-import uuid
-# from ydata_profiling import ProfileReport
 from pathlib import Path
 from datetime import datetime
-from utils.config import OUTPUT_FOLDER
+from utils.config import (
+    OUTPUT_FOLDER,
+    EDA_SAMPLE_ROWS,
+    EDA_HISTOGRAM_BINS,
+    EDA_TOP_VALUES,
+    EDA_MAX_BOX_PAIRS,
+    EDA_MAX_HEATMAP_COLUMNS,
+    ASSOC_TOP_K
+)
+from profiling import profile_dataframe
+from dedup import RowHashIndex
+from eda.associations import AssociationAccumulator
 
 # =========================================
 #  3. Data Overview
 # =========================================
 
-def data_overview(df):
+def data_overview(df, profile=None, row_index=None):
+    """
+    Summarize shape, dtypes, missing values, duplicates and memory usage.
+    Column statistics are read from `profile` (see profiling.profile_dataframe)
+    when given, so callers that already profiled the frame don't rescan it.
+    Duplicates are counted from `row_index` (a dedup.RowHashIndex), whose
+    column hashes remove_duplicates can reuse afterwards.
+    """
     try:
+        if profile is None:
+            profile = profile_dataframe(df)
+        if row_index is None:
+            row_index = RowHashIndex()
+        summary = profile.overview()
+
         overview = {
-            "shape": {"rows": df.shape[0], "columns": df.shape[1]},
-            "dtypes": df.dtypes.astype(str).to_dict(),
-            "missing_values": df.isnull().sum().to_dict(),
-            "duplicates": int(df.duplicated().sum()),
-            "memory_usage": df.memory_usage(deep=True).to_dict(),
+            "shape": summary["shape"],
+            "dtypes": summary["dtypes"],
+            "missing_values": summary["missing_values"],
+            "duplicates": int(row_index.duplicated(df).sum()),
+            "memory_usage": summary["memory_usage"],
         }
 
         return overview
@@ -30,149 +51,288 @@ def data_overview(df):
         raise
 
 
+def _split_columns(df):
+    """Numeric (non-boolean), datetime and categorical (everything else) columns."""
+    num_cols, date_cols, cat_cols = [], [], []
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_bool_dtype(s):
+            cat_cols.append(col)
+        elif pd.api.types.is_datetime64_any_dtype(s):
+            date_cols.append(col)
+        elif pd.api.types.is_numeric_dtype(s):
+            num_cols.append(col)
+        else:
+            cat_cols.append(col)
+    return num_cols, date_cols, cat_cols
+
+
+def _numeric_matrix(df, cols):
+    """float64 matrix of `cols` with NaN for missing values."""
+    if not cols:
+        return np.empty((len(df), 0))
+    return np.column_stack([df[col].to_numpy(dtype='float64', na_value=np.nan) for col in cols])
+
+
+def _sample(df, sample_rows):
+    if sample_rows is None or len(df) <= sample_rows:
+        return df
+    return df.sample(n=sample_rows, random_state=0)
+
 # =========================================
 #  4. Univariate Analysis
 # =========================================
 
-# def univariate_analysis(df, num_cols, cat_cols, output_dir):
-#     output_dir = Path(output_dir)
-#     output_dir.mkdir(parents=True, exist_ok=True)
-
-#     result = {
-#         "histograms": [],
-#         "countplots": []
-#     }
-
-#     try:
-#         # Histograms for numerical columns
-#         hist_path = output_dir / f"histogram_{uuid.uuid4().hex}.png"
-#         df[num_cols].hist(figsize=(15, 10), bins=20)
-#         plt.title("Histograms for numerical columns")
-#         plt.tight_layout()
-#         plt.savefig(hist_path)
-#         plt.close()
-#         result['histograms'].append(hist_path.name)
-#     except Exception as e:
-#         logging.error(f"Failed to create histogram: {e}")
-
-#     # Countplots for categorical columns
-#     for col in cat_cols:
-#         try:
-#             countplot_path = output_dir / f"countplot_{col}_{uuid.uuid4().hex}.png"
-#             plt.figure(figsize=(8, 4))
-#             sns.countplot(x=df[col], order=df[col].value_counts().index)
-#             plt.xticks(rotation=45)
-#             plt.title(f"Count Plot of {col}")
-#             plt.tight_layout()
-#             plt.savefig(countplot_path)
-#             plt.close()
-#             result['countplots'].append(countplot_path.name)
-#         except Exception as e:
-#             logging.error(f"Failed to create countplot for {col}: {e}")
-
-#     return result
-
-
-# def bivariate_analysis(df, num_cols, cat_cols, output_dir):
-#     output_dir = Path(output_dir)
-#     output_dir.mkdir(parents=True, exist_ok=True)
-
-#     result = {
-#         "correlation_matrix": None,
-#         "correlation_heatmap": None,
-#         "pairplot": None,
-#         "boxplots": []
-#     }
-
-#     # Correlation heatmap
-#     if len(num_cols) > 1:
-#         try:
-#             corr_matrix = df[num_cols].corr().round(2).to_dict()
-#             result["correlation_matrix"] = corr_matrix
-
-#             heatmap_path = output_dir / f"correlation_heatmap_{uuid.uuid4().hex}.png"
-#             plt.figure(figsize=(10, 6))
-#             sns.heatmap(df[num_cols].corr(), annot=True, cmap="coolwarm")
-#             plt.title("Correlation Matrix")
-#             plt.tight_layout()
-#             plt.savefig(heatmap_path)
-#             plt.close()
-#             result["correlation_heatmap"] = heatmap_path.name
-#         except Exception as e:
-#             logging.error(f"Failed to create correlation heatmap: {e}")
-
-#     # Pairplot
-#     if df.shape[0] <= 1000 and len(num_cols) <= 5:
-#         try:
-#             pairplot_path = output_dir / f"pairplot_{uuid.uuid4().hex}.png"
-#             sns.pairplot(df[num_cols])
-#             plt.tight_layout()
-#             plt.savefig(pairplot_path)
-#             plt.close()
-#             result["pairplot"] = pairplot_path.name
-#         except Exception as e:
-#             logging.error(f"Failed to create pairplot: {e}")
-
-#     # Boxplots (numerical vs categorical)
-#     for num_col in num_cols:
-#         for cat_col in cat_cols:
-#             try:
-#                 boxplot_path = output_dir / f"boxplot_{num_col}_vs_{cat_col}_{uuid.uuid4().hex}.png"
-#                 plt.figure(figsize=(8, 4))
-#                 sns.boxplot(x=df[cat_col], y=df[num_col])
-#                 plt.xticks(rotation=45)
-#                 plt.title(f"{num_col} vs {cat_col}")
-#                 plt.tight_layout()
-#                 plt.savefig(boxplot_path)
-#                 plt.close()
-#                 result["boxplots"].append(boxplot_path.name)
-#             except Exception as e:
-#                 logging.error(f"Failed to create boxplot for {num_col} vs {cat_col}: {e}")
-
-#     return result
-
-
-# # =========================================
-# #  6. Data Quality Warnings
-# # =========================================
-
-# def data_quality_warnings(df, num_cols, cat_cols):
-#     warnings = {
-#         "high_cardinality": [],
-#         "skewed_columns": {},
-#         "too_many_missing": [],
-#         "low_variance": []
-#     }
-
-#     try:
-#         # High cardinality
-#         warnings["high_cardinality"] = [col for col in cat_cols if df[col].nunique() > 50]
-
-#         # Skewed numerical columns
-#         skewed = df[num_cols].skew()
-#         warnings["skewed_columns"] = skewed[abs(skewed) > 1].round(2).to_dict()
-
-#         # Too many missing values (>40%)
-#         warnings["too_many_missing"] = [col for col in df.columns if df[col].isnull().mean() > 0.4]
-
-#         # Low variance
-#         warnings["low_variance"] = [col for col in df.columns if df[col].nunique() <= 1]
-
-#     except Exception as e:
-#         logging.error(f"Error in data quality checks: {e}")
-
-#     return warnings
-
-
-
-# # =========================================
-# #  8. Generate HTML Report
-# # =========================================
-# def generate_report(df):
-#     report_filename = f'eda_report.html'
-#     report_path = OUTPUT_FOLDER / report_filename
-#     profile = ProfileReport(df, title=f"EDA Report", explorative=True)
-#     profile.to_file(str(report_path))
-#     logging.info(f"EDA Report generated - {report_filename}")
-#     return report_filename
+def _histogram(values, bins):
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return {"counts": [], "edges": []}
+    counts, edges = np.histogram(values, bins=bins)
+    return {"counts": counts.tolist(), "edges": edges.tolist()}
+
+
+def _value_counts(s, top):
+    """Top `top` values and their counts from a single factorize pass."""
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    order = np.argsort(-counts, kind='stable')[:top]
+    return {
+        "values": [str(uniques[i]) for i in order],
+        "counts": counts[order].tolist(),
+        "distinct": int(len(uniques)),
+        "other": int(counts.sum() - counts[order].sum()),
+    }
+
+
+def box_summaries(X, cols):
+    """
+    Box-plot summary (quartiles, 1.5*IQR whiskers, outlier count) of every
+    column of the float matrix `X` at once.
+    """
+    present = ~np.isnan(X).all(axis=0)
+    X = X[:, present]
+    cols = [col for col, keep in zip(cols, present) if keep]
+    # No column with values, e.g. an append-mode batch whose rows were all seen before
+    if X.shape[1] == 0:
+        return {}
+
+    q0, q1, q2, q3, q4 = np.nanquantile(X, [0, 0.25, 0.5, 0.75, 1], axis=0)
+    low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    with np.errstate(invalid='ignore'):
+        whisker_low = np.nanmin(np.where(X >= low, X, np.nan), axis=0)
+        whisker_high = np.nanmax(np.where(X <= high, X, np.nan), axis=0)
+        outliers = ((X < low) | (X > high)).sum(axis=0)
+
+    return {
+        col: {"min": q0[i], "q1": q1[i], "median": q2[i], "q3": q3[i], "max": q4[i],
+              "whisker_low": whisker_low[i], "whisker_high": whisker_high[i], "outliers": int(outliers[i])}
+        for i, col in enumerate(cols)
+    }
+
+
+def univariate_analysis(df, num_cols, cat_cols, date_cols=(), bins=EDA_HISTOGRAM_BINS, top=EDA_TOP_VALUES):
+    """
+    Per-column distributions: histograms and summary statistics for numeric
+    and datetime columns, top value counts for categorical ones.
+    """
+    result = {"numerical": {}, "categorical": {}, "datetime": {}}
+
+    X = _numeric_matrix(df, num_cols)
+    if num_cols:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.nanmean(X, axis=0)
+            std = np.nanstd(X, axis=0, ddof=1)
+            centered = X - mean
+            skew = np.nanmean(centered ** 3, axis=0) / np.nanstd(X, axis=0) ** 3
+        missing = np.isnan(X).sum(axis=0)
+        boxes = box_summaries(X, num_cols)
+
+        for i, col in enumerate(num_cols):
+            result["numerical"][col] = {
+                "missing": int(missing[i]),
+                "mean": mean[i],
+                "std": std[i],
+                "skew": skew[i],
+                "box": boxes.get(col),
+                "histogram": _histogram(X[:, i], bins),
+            }
+
+    for col in date_cols:
+        values = df[col].dropna().to_numpy(dtype='datetime64[ns]').astype('int64')
+        hist = _histogram(values.astype('float64'), bins)
+        hist["edges"] = [str(pd.Timestamp(int(edge))) for edge in hist["edges"]]
+        result["datetime"][col] = {
+            "missing": int(df[col].isna().sum()),
+            "min": str(df[col].min()),
+            "max": str(df[col].max()),
+            "histogram": hist,
+        }
+
+    for col in cat_cols:
+        result["categorical"][col] = dict(_value_counts(df[col], top), missing=int(df[col].isna().sum()))
+
+    return result
+
+# =========================================
+#  5. Bivariate Analysis
+# =========================================
+
+def bivariate_analysis(df, num_cols, cat_cols, max_groups=EDA_TOP_VALUES, max_pairs=EDA_MAX_BOX_PAIRS,
+                       associations=None):
+    """
+    Strongest associations (Pearson for numeric pairs, Cramér's V for
+    categorical pairs), a correlation heatmap of the first numeric columns,
+    and box-plot summaries of the first numeric columns split by the most
+    frequent values of the first low-cardinality categorical columns.
+
+    `associations` is an eda.associations.AssociationAccumulator already fed
+    with the data (e.g. every chunk in streaming mode); otherwise one is
+    built from `df`.
+    """
+    result = {"correlation": None, "top_associations": [], "boxplots": []}
+
+    if associations is None:
+        associations = AssociationAccumulator(num_cols, cat_cols)
+        associations.update(df)
+    result["top_associations"] = associations.top(ASSOC_TOP_K)
+
+    heatmap_cols = associations.num_cols[:EDA_MAX_HEATMAP_COLUMNS]
+    if len(heatmap_cols) > 1:
+        corr = associations.correlation()[:len(heatmap_cols), :len(heatmap_cols)]
+        result["correlation"] = {"columns": list(heatmap_cols), "matrix": np.round(corr, 3).tolist()}
+
+    X = _numeric_matrix(df, num_cols)
+
+    group_cols = [col for col in cat_cols if df[col].nunique() <= max(max_groups * 5, 50)]
+    pairs = [(num_col, cat_col) for cat_col in group_cols for num_col in num_cols][:max_pairs]
+    for num_col, cat_col in pairs:
+        codes, uniques = pd.factorize(df[cat_col], use_na_sentinel=True)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        top = np.argsort(-counts, kind='stable')[:max_groups]
+        values = X[:, num_cols.index(num_col)]
+
+        # One column per group, padded with NaN, so all groups are summarized in one call
+        groups = [values[codes == code] for code in top]
+        width = max((len(g) for g in groups), default=0)
+        G = np.full((width, len(groups)), np.nan)
+        for j, g in enumerate(groups):
+            G[:len(g), j] = g
+        labels = [str(uniques[code]) for code in top]
+        boxes = box_summaries(G, labels)
+        result["boxplots"].append({
+            "numeric": num_col,
+            "category": cat_col,
+            "groups": [dict(boxes[label], label=label) for label in labels if label in boxes],
+        })
+
+    return result
+
+# =========================================
+#  6. Data Quality Warnings
+# =========================================
+
+def data_quality_warnings(df, num_cols, cat_cols, univariate=None):
+    warnings = {
+        "high_cardinality": [],
+        "skewed_columns": {},
+        "too_many_missing": [],
+        "low_variance": []
+    }
+
+    try:
+        if univariate is None:
+            univariate = univariate_analysis(df, num_cols, cat_cols)
+
+        # High cardinality
+        warnings["high_cardinality"] = [col for col, st in univariate["categorical"].items() if st["distinct"] > 50]
+
+        # Skewed numerical columns
+        warnings["skewed_columns"] = {col: round(float(st["skew"]), 2) for col, st in univariate["numerical"].items()
+                                      if np.isfinite(st["skew"]) and abs(st["skew"]) > 1}
+
+        # Too many missing values (>40%)
+        missing = df.isna().mean()
+        warnings["too_many_missing"] = missing[missing > 0.4].index.tolist()
+
+        # Low variance
+        warnings["low_variance"] = [col for col in df.columns if df[col].nunique() <= 1]
+
+    except Exception as e:
+        logging.error(f"Error in data quality checks: {e}")
+
+    return warnings
+
+# =========================================
+#  8. Generate HTML Report
+# =========================================
 
+def _json_safe(value):
+    """Replace NaN/inf and NumPy scalars so the report data is valid JSON."""
+    if isinstance(value, dict):
+        return {str(k): _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+def build_report(df, sample_rows=EDA_SAMPLE_ROWS, associations=None, totals=None):
+    """
+    Compute everything the HTML report shows. Distributions and correlations
+    are computed on a random sample of at most `sample_rows` rows (None for
+    all rows), unless `associations` were accumulated elsewhere; shape and
+    missing counts use the whole frame.
+
+    `totals` ({'rows', 'missing_values'}, e.g. the 'cleaned' counts of
+    streaming.clean_csv_in_chunks) describe the whole dataset when `df`
+    holds only its first rows: shape, missing counts and the missing-value
+    warning then come from them, and the sections computed from `df` are
+    reported as covering its first rows ('sample' is 'head').
+    """
+    sample = _sample(df, sample_rows)
+    num_cols, date_cols, cat_cols = _split_columns(df)
+
+    univariate = univariate_analysis(sample, num_cols, cat_cols, date_cols)
+    warnings = data_quality_warnings(sample, num_cols, cat_cols, univariate)
+    rows, missing = len(df), df.isna().sum().to_dict()
+    if totals is not None:
+        rows, missing = totals['rows'], totals['missing_values']
+        warnings['too_many_missing'] = [col for col, n in missing.items() if rows and n / rows > 0.4]
+
+    report = {
+        "title": "EDA Report",
+        "generated_at": datetime.now().isoformat(timespec='seconds'),
+        "rows": rows,
+        "columns": len(df.columns),
+        "sampled_rows": len(sample),
+        "sample": "head" if totals is not None else "random",
+        # Associations accumulated elsewhere cover every row
+        "associations_sampled": associations is None,
+        "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
+        "missing": {col: int(n) for col, n in missing.items()},
+        "univariate": univariate,
+        "bivariate": bivariate_analysis(sample, num_cols, cat_cols, associations=associations),
+        "warnings": warnings,
+    }
+    return _json_safe(report)
+
+
+def generate_report(df, filename='eda_report.html', sample_rows=EDA_SAMPLE_ROWS, associations=None,
+                    output_dir=OUTPUT_FOLDER, totals=None):
+    """
+    Write a self-contained HTML EDA report (data inlined as JSON, charts
+    drawn client-side as SVG) to `output_dir` and return its file name.
+    See build_report for `sample_rows`, `associations` and `totals`.
+    """
+    report = build_report(df, sample_rows=sample_rows, associations=associations, totals=totals)
+
+    template = (Path(__file__).parent / 'report_template.html').read_text(encoding='utf-8')
+    data = json.dumps(report).replace('</', '<\\/')
+    report_path = Path(output_dir) / filename
+    report_path.write_text(template.replace('/*REPORT_DATA*/null', data), encoding='utf-8')
+
+    logging.info(f"EDA Report generated - {filename} ({report['sampled_rows']} of {report['rows']} rows sampled)")
+    return filename
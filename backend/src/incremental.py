@@ -0,0 +1,206 @@
+import json
+import logging
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.config import APPEND_STATE_FOLDER, OUTLIER_METHOD
+from dedup import RowHashIndex
+from streaming import _ColumnAccumulator, plan_cleaning, convert_chunk, impute_chunk, conversion_log
+
+STATE_VERSION = 1
+
+
+def _as_text(df):
+    """Values as strings, as the streaming passes read them; missing values stay missing."""
+    return pd.DataFrame({col: df[col].astype(str).where(df[col].notna()).astype(object) for col in df.columns},
+                        index=df.index)
+
+
+class CleaningState:
+    """
+    Everything learnt from the batches of a dataset cleaned so far, so the
+    next batch is cleaned in time proportional to its own size:
+    - per column: the type decided by the first batch holding values (then
+      kept, so every batch is converted the same way), null counts, a
+      reservoir sample of numbers / dates (medians and outlier bounds) and
+      value counts (modes), all updated with each batch
+    - the columns dropped for missing values, decided when they first appear
+    - the row hashes of every row kept so far (after type conversion, before
+      imputation), so rows repeating an earlier batch are removed
+
+    Saved as a single .npz file: the statistics as JSON plus the reservoir
+    and row-hash arrays.
+
+        state = CleaningState.load(path) if path.exists() else CleaningState()
+        cleaned, overview, log_report = state.update(batch)
+        state.save(path)
+    """
+
+    def __init__(self, col_drop_thresh=0.5, outlier_method=OUTLIER_METHOD):
+        self.col_drop_thresh = col_drop_thresh
+        self.outlier_method = outlier_method
+        self.columns = {}
+        self.drop = []
+        self.row_index = RowHashIndex()
+        self.batches = 0
+        self.rows_in = 0
+        self.rows_out = 0
+
+    def update(self, batch):
+        """
+        Add a batch (DataFrame, any dtypes) to the statistics and clean it
+        with them. Columns missing from the batch are treated as empty; new
+        columns are fitted on the batch they first appear in.
+
+        Returns:
+        - DataFrame: the cleaned batch, without rows seen in earlier batches
+        - dict: overview of the batch, shaped like data_overview, with the
+          rows removed as duplicates (of this or earlier batches) under
+          'duplicates_removed' and the dataset's running totals under 'append'
+        - list: log_report, one list of dicts per stage
+        """
+        new_columns = [col for col in batch.columns if col not in self.columns]
+        read_as = {col: batch[col].dtype for col in new_columns}
+        batch = _as_text(batch.reindex(columns=list(self.columns) + new_columns))
+
+        nulls = {}
+        for col in batch.columns:
+            acc = self.columns.setdefault(col, _ColumnAccumulator(col))
+            before = acc.null_count
+            acc.update(batch[col])
+            nulls[col] = acc.null_count - before
+
+        stats = {}
+        for col, acc in self.columns.items():
+            stats[col] = acc.finalize()
+            if acc.kind is None and acc.count > acc.null_count:
+                acc.fix_kind(stats[col])
+
+        # Dropped columns are decided once, so every cleaned batch has the same columns
+        self.drop += [col for col in new_columns if stats[col]['missing_ratio'] >= self.col_drop_thresh]
+        plan, missing_log = plan_cleaning(stats, outlier_method=self.outlier_method, drop=self.drop)
+        missing_log = [entry for entry in missing_log
+                       if entry['action'] != 'dropped' or entry['column'] in new_columns]
+
+        # Rows are compared before imputation, whose values change from batch to batch, and
+        # on the columns of the first batch, also when later ones add columns
+        converted = convert_chunk(batch, stats, plan['drop'])
+        key = self.row_index.key_columns
+        self.row_index.clear()
+        keep = ~self.row_index.duplicated(converted, subset=key)
+        converted = converted[keep]
+        self.row_index.take(keep)
+        self.row_index.remember(converted, subset=key)
+        cleaned = impute_chunk(converted, stats, plan)
+
+        self.batches += 1
+        self.rows_in += len(batch)
+        self.rows_out += len(cleaned)
+        duplicates_removed = len(batch) - len(cleaned)
+        logging.info(f"[CleaningState] Batch {self.batches}: kept {len(cleaned)} of {len(batch)} rows "
+                     f"({self.rows_out} of {self.rows_in} in total)")
+
+        type_log = conversion_log(stats, read_as)
+        dedup_log = []
+        if duplicates_removed != 0:
+            dedup_log.append({
+                'action': 'remove_duplicates',
+                'duplicates_removed': duplicates_removed,
+                'original_row_count': len(batch),
+                'new_row_count': len(cleaned),
+                'message': f"Removed {duplicates_removed} duplicate rows (including rows of earlier batches)."
+            })
+        outlier_log = [
+            {'column': col, 'method': self.outlier_method, 'lower_bound': lower, 'upper_bound': upper,
+             'action': f'Clipped to [{lower}, {upper}]'}
+            for col, (lower, upper) in plan['clip'].items()
+        ]
+
+        overview = {
+            "shape": {"rows": len(batch), "columns": batch.shape[1]},
+            "dtypes": {col: st['type'] for col, st in stats.items()},
+            "missing_values": nulls,
+            "duplicates_removed": int(duplicates_removed),
+            "append": {"batches": self.batches, "rows_in": self.rows_in, "rows_out": self.rows_out},
+        }
+        return cleaned, overview, [type_log, dedup_log, missing_log, outlier_log]
+
+    def save(self, path):
+        columns, arrays = [], {}
+        for i, acc in enumerate(self.columns.values()):
+            state, reservoirs = acc.state()
+            columns.append(state)
+            arrays.update({f'{name}_{i}': values for name, values in reservoirs.items()})
+        meta = {
+            'version': STATE_VERSION,
+            'col_drop_thresh': self.col_drop_thresh,
+            'outlier_method': self.outlier_method,
+            'columns': columns,
+            'drop': self.drop,
+            'key_columns': self.row_index.key_columns,
+            'batches': self.batches,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+        }
+        path = Path(path)
+        tmp = path.with_name(f'.{path.name}.tmp.npz')
+        np.savez(tmp, meta=np.array(json.dumps(meta)), seen=self.row_index.seen, **arrays)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(data['meta'].item())
+            if meta['version'] != STATE_VERSION:
+                raise ValueError(f"Unsupported cleaning state version {meta['version']} in {path}")
+            state = cls(meta['col_drop_thresh'], meta['outlier_method'])
+            for i, column in enumerate(meta['columns']):
+                acc = _ColumnAccumulator.from_state(column, {'numbers': data[f'numbers_{i}'],
+                                                             'dates': data[f'dates_{i}']})
+                state.columns[acc.name] = acc
+            state.row_index = RowHashIndex(seen=data['seen'], key_columns=meta['key_columns'])
+        state.drop = meta['drop']
+        state.batches, state.rows_in, state.rows_out = meta['batches'], meta['rows_in'], meta['rows_out']
+        return state
+
+
+_dataset_locks = {}
+_dataset_locks_guard = threading.Lock()
+
+
+def _dataset_lock(path):
+    with _dataset_locks_guard:
+        return _dataset_locks.setdefault(str(path), threading.Lock())
+
+
+def state_path(dataset, state_folder=APPEND_STATE_FOLDER):
+    """Where the cleaning state of `dataset` (a name such as 'sales', see secure_filename) is kept."""
+    if not dataset or Path(dataset).name != dataset or dataset.startswith('.'):
+        raise ValueError(f"Invalid dataset name: {dataset!r}")
+    return Path(state_folder) / f'{dataset}.npz'
+
+
+def clean_batch(raw, dataset, state_folder=APPEND_STATE_FOLDER, col_drop_thresh=0.5, outlier_method=OUTLIER_METHOD):
+    """
+    Append mode: clean `raw` as the next batch of `dataset`, with the
+    statistics of its earlier batches, then save the updated state. Batches
+    of the same dataset are processed one at a time.
+
+    `col_drop_thresh` and `outlier_method` only apply to a dataset's first
+    batch; later batches keep those of the saved state.
+
+    Returns the same as CleaningState.update.
+    """
+    path = state_path(dataset, state_folder)
+    with _dataset_lock(path):
+        if path.exists():
+            state = CleaningState.load(path)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            state = CleaningState(col_drop_thresh, outlier_method)
+        result = state.update(raw)
+        state.save(path)
+    return result
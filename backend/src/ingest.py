@@ -0,0 +1,326 @@
+import io
+import os
+import hashlib
+import logging
+
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import MultipartDecoder, NeedData, Field, File, Data, Epilogue
+
+from utils.config import (
+    MAX_CONTENT_LENGTH, MAX_STREAMED_CSV_BYTES, UPLOAD_CHUNK_SIZE, UPLOAD_INGESTION, STREAMING_THRESHOLD_BYTES,
+    PREVIEW_ROWS, PREVIEW_MAX_ROWS, PREVIEW_MAX_BYTES
+)
+from utils.helper import file_extension, split_extension
+from data_loader import load_sample
+from workspace import DiskQuotaExceeded
+
+# Largest accepted non-file form field (format, outputs, params, ...)
+MAX_FIELD_BYTES = 64 * 1024
+
+
+class UploadError(ValueError):
+    """A malformed or rejected upload; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class StreamingUpload:
+    """
+    Incremental reader of a multipart/form-data request body, so the uploaded
+    file can be consumed while it is still arriving instead of being spooled
+    to a temporary file by the form parser first.
+
+    `open_file()` reads up to the first file part, collecting the form fields
+    sent before it; `file` is then a binary stream of that part's bytes. Every
+    byte read through it is hashed, counted against `max_bytes` and, when
+    `tee` is set, copied to that file, after which `check_quota` (if set) is
+    called. `finish()` drains the rest of the body and collects the fields
+    sent after the file.
+
+        upload = StreamingUpload(request.stream, request.content_type)
+        upload.open_file()
+        df = pd.read_csv(upload.file)
+        upload.finish()
+        upload.fields, upload.digest, upload.size
+    """
+
+    def __init__(self, stream, content_type, max_bytes=MAX_CONTENT_LENGTH, chunk_size=UPLOAD_CHUNK_SIZE):
+        mimetype, options = parse_options_header(content_type or '')
+        if mimetype != 'multipart/form-data' or not options.get('boundary'):
+            raise UploadError('Expected a multipart/form-data upload')
+
+        self._decoder = MultipartDecoder(options['boundary'].encode('latin-1'))
+        self._stream = stream
+        self._eof = False
+        self._part = None      # (kind, name) of the part being read: kind is 'field', 'file' or 'skip'
+        self._value = bytearray()
+        self._pending = bytearray()
+        self._sha256 = hashlib.sha256()
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.tee = None
+        self.check_quota = None
+        self.fields = {}
+        self.filename = None
+        self.size = 0
+        self.file_done = False
+        self.complete = False
+        self.file = io.BufferedReader(_FilePartReader(self), buffer_size=chunk_size)
+
+    @property
+    def digest(self):
+        """Hex SHA-256 of the file bytes read so far."""
+        return self._sha256.hexdigest()
+
+    def _next_event(self):
+        while True:
+            try:
+                event = self._decoder.next_event()
+            except ValueError:
+                # The decoder refuses to go on after a body that ended mid-part
+                raise UploadError('Upload ended before the multipart body was complete' if self._eof
+                                  else 'Malformed multipart body') from None
+            if not isinstance(event, NeedData):
+                return event
+            if self._eof:
+                raise UploadError('Upload ended before the multipart body was complete')
+            chunk = self._stream.read(self.chunk_size)
+            if not chunk:
+                self._eof = True
+                self._decoder.receive_data(None)
+            else:
+                self._decoder.receive_data(chunk)
+
+    def _pump(self):
+        """Handle one event of the body; returns False once the body is complete."""
+        if self.complete:
+            return False
+        event = self._next_event()
+
+        if isinstance(event, Epilogue):
+            self.complete = True
+            self.file_done = True
+        elif isinstance(event, File):
+            # Only the first file part is read, any other one is skipped
+            if self.filename is None:
+                self.filename = event.filename or ''
+                self._part = ('file', event.name)
+            else:
+                self._part = ('skip', event.name)
+        elif isinstance(event, Field):
+            self._part = ('field', event.name)
+            self._value = bytearray()
+        elif isinstance(event, Data):
+            kind, name = self._part
+            if kind == 'file':
+                self._accept(event.data)
+                if not event.more_data:
+                    self.file_done = True
+            elif kind == 'field':
+                self._value.extend(event.data)
+                if len(self._value) > MAX_FIELD_BYTES:
+                    raise UploadError(f"Form field '{name}' is too large", 413)
+                if not event.more_data:
+                    self.fields[name] = self._value.decode('utf-8', errors='replace')
+        return not self.complete
+
+    def _accept(self, data):
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise UploadError(f'File exceeds the {self.max_bytes // (1024 * 1024)} MB upload limit', 413)
+        self._sha256.update(data)
+        if self.tee is not None:
+            self.tee.write(data)
+            if self.check_quota is not None:
+                self.tee.flush()
+                try:
+                    self.check_quota()
+                except DiskQuotaExceeded as e:
+                    raise UploadError(str(e), 507) from None
+        self._pending.extend(data)
+
+    def open_file(self):
+        """Read the body up to the first file part. Returns its file name, or None if there is none."""
+        while self.filename is None and self._pump():
+            pass
+        if self.filename is None:
+            self.file_done = True
+        return self.filename
+
+    def read_file(self, size):
+        """Up to `size` bytes of the file part, b'' at its end."""
+        while len(self._pending) < size and not self.file_done:
+            self._pump()
+        data = bytes(self._pending[:size])
+        del self._pending[:size]
+        return data
+
+    def finish(self):
+        """Read (and hash) whatever is left of the file, then the trailing fields."""
+        while not self.file_done:
+            self._pump()
+            self._pending.clear()
+        while self._pump():
+            pass
+        self._pending.clear()
+
+
+class _FilePartReader(io.RawIOBase):
+    def __init__(self, upload):
+        self._upload = upload
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._upload.read_file(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _flag(value):
+    return value is True or str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _open_upload(stream, content_type, allowed, max_bytes=MAX_CONTENT_LENGTH):
+    """StreamingUpload of a request, read up to its file part; raises UploadError if there is no allowed file."""
+    upload = StreamingUpload(stream, content_type, max_bytes=max_bytes)
+    filename = upload.open_file()
+    if filename is None:
+        raise UploadError('No file part')
+    if filename == '':
+        raise UploadError('No selected file')
+    if not allowed(filename):
+        raise UploadError('File type not allowed')
+    return upload
+
+
+def receive_upload(stream, content_type, upload_folder, job_id, allowed, keep_raw=False,
+                   content_length=None, mode=UPLOAD_INGESTION, check_quota=None):
+    """
+    Read an upload request in a single pass: the file's bytes are only
+    hashed and size-checked as they arrive, never parsed, so the request
+    takes the upload's transfer time whatever the format, and parsing is left
+    to the job (after its result cache lookup, within the job pool's limits).
+
+    In 'stream' mode (the default), the file is kept in memory for the job
+    and never written to disk; the raw file is persisted in `upload_folder`
+    only when `keep_raw` is set, either as an argument or as a form field
+    sent before the file.
+
+    'disk' mode, and CSVs announced larger than STREAMING_THRESHOLD_BYTES
+    (which are cleaned chunk by chunk from a file), write the upload to
+    `upload_folder` for the job to load. Those CSVs may be up to
+    MAX_STREAMED_CSV_BYTES; any other upload up to MAX_CONTENT_LENGTH.
+    `check_quota` (e.g. Workspace.check_quota) is called as the file is
+    written, so a persisted upload stops once it outgrows the job's disk
+    quota.
+
+    Raises UploadError for missing, disallowed, oversized or truncated
+    uploads, with status 507 when the job's disk quota is exceeded.
+
+    Returns:
+    - dict: 'fields', 'filename', 'file_ext', 'digest', 'size', 'data' (a
+      BytesIO of the file in 'stream' mode, else None) and 'raw_path' (the
+      persisted file, or None)
+    """
+    upload = _open_upload(stream, content_type, allowed)
+    filename = upload.filename
+    file_ext = file_extension(filename)
+    fmt, _ = split_extension(file_ext)
+    keep_raw = _flag(keep_raw) or _flag(upload.fields.get('keep_raw'))
+    streamed = fmt == '.csv' and content_length is not None and content_length > STREAMING_THRESHOLD_BYTES
+    if streamed:
+        upload.max_bytes = MAX_STREAMED_CSV_BYTES
+    in_memory = mode == 'stream' and not streamed
+    raw_path = None
+    if keep_raw or not in_memory:
+        raw_path = os.path.join(upload_folder, f"raw_dataset_{job_id}{file_ext}")
+        upload.tee = open(raw_path, 'wb')
+        upload.check_quota = check_quota
+
+    data = None
+    try:
+        if in_memory:
+            data = io.BytesIO(upload.file.read())
+        upload.finish()
+    except Exception:
+        if raw_path is not None:
+            upload.tee.close()
+            os.remove(raw_path)
+        raise
+    if raw_path is not None:
+        upload.tee.close()
+
+    logging.info(f"Received {filename} ({upload.size} bytes, sha256 {upload.digest[:12]}, "
+                 f"{'kept in memory' if raw_path is None else 'saved to ' + raw_path})")
+    return {
+        'fields': upload.fields,
+        'filename': filename,
+        'file_ext': file_ext,
+        'digest': upload.digest,
+        'size': upload.size,
+        'data': data,
+        'raw_path': raw_path,
+    }
+
+
+def receive_sample(stream, content_type, allowed):
+    """
+    Read a preview request: parse a bounded sample of the uploaded file (see
+    data_loader.load_sample), never the whole of it, and nothing is written
+    to disk. Form fields, sent before the file:
+    - sample: 'head' (first rows, the default) or 'sample' (random rows read
+      within PREVIEW_TIME_BUDGET_SECONDS)
+    - rows: sample size, at most PREVIEW_MAX_ROWS (default PREVIEW_ROWS)
+    - sheet: workbook sheet, by name or position
+    - truncated: the file part is only the beginning of a CSV or JSON Lines
+      file (clients send a prefix of large files)
+
+    The rest of the body is still drained, so the response never races the
+    upload; files are limited to PREVIEW_MAX_BYTES so that takes bounded
+    time whatever the format (workbooks and Parquet files are read whole).
+    Raises UploadError for missing, disallowed, oversized or unreadable
+    files and invalid fields.
+
+    Returns:
+    - dict: 'fields', 'filename', 'file_ext', 'size' (bytes received), 'raw'
+      (the sampled DataFrame) and 'sample' (see load_sample)
+    """
+    upload = _open_upload(stream, content_type, allowed, max_bytes=PREVIEW_MAX_BYTES)
+    file_ext = file_extension(upload.filename)
+    fmt, _ = split_extension(file_ext)
+    fields = upload.fields
+    try:
+        rows = int(fields.get('rows') or PREVIEW_ROWS)
+    except ValueError:
+        raise UploadError(f"Invalid sample size: {fields['rows']}") from None
+    if not 0 < rows <= PREVIEW_MAX_ROWS:
+        raise UploadError(f"Sample size must be between 1 and {PREVIEW_MAX_ROWS}")
+
+    # Workbooks and Parquet files need random access, so they are buffered first
+    source = upload.file if fmt in ('.csv', '.jsonl') else io.BytesIO(upload.file.read())
+    try:
+        raw, sample = load_sample(source, rows=rows, method=fields.get('sample') or 'head',
+                                  sheet=fields.get('sheet') or None, file_ext=file_ext,
+                                  truncated=_flag(fields.get('truncated')))
+        upload.finish()
+    except UploadError:
+        raise
+    except ValueError as e:
+        if isinstance(e.__context__, UploadError):
+            raise e.__context__ from None
+        raise UploadError(str(e)) from e
+
+    logging.info(f"Previewed {upload.filename}: {sample['rows']} rows sampled ({sample['method']}) "
+                 f"from {upload.size} bytes received")
+    return {
+        'fields': upload.fields,
+        'filename': upload.filename,
+        'file_ext': file_ext,
+        'size': upload.size,
+        'raw': raw,
+        'sample': sample,
+    }
@@ -0,0 +1,119 @@
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.config import JOB_WORKERS, MAX_PENDING_JOBS, JOB_RETENTION_SECONDS
+
+class JobQueueFull(Exception):
+    """Raised when the number of queued and running jobs reaches MAX_PENDING_JOBS."""
+
+
+class JobManager:
+    """
+    Runs pipeline jobs on a bounded background thread pool and keeps their
+    status, per-stage progress and result payload for polling.
+
+    Job functions are called as `func(*args, progress=callback)`; calling
+    `callback(stage_name)` marks the previous stage done and the new one running.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, max_pending=MAX_PENDING_JOBS, retention=JOB_RETENTION_SECONDS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pipeline-job')
+        self._max_pending = max_pending
+        self._retention = retention
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_job_id():
+        return uuid.uuid4().hex
+
+    def active_count(self):
+        with self._lock:
+            return sum(job['status'] in ('queued', 'running') for job in self._jobs.values())
+
+    def is_active(self, job_id):
+        """True while the job is queued or running."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job is not None and job['status'] in ('queued', 'running')
+
+    def submit(self, func, *args, job_id=None):
+        job_id = job_id or self.new_job_id()
+
+        with self._lock:
+            self._prune()
+            active = sum(job['status'] in ('queued', 'running') for job in self._jobs.values())
+            if active >= self._max_pending:
+                raise JobQueueFull(f"Too many jobs in progress ({active}), try again later")
+
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'status': 'queued',
+                'stages': [],
+                'current_stage': None,
+                'result': None,
+                'error': None,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+            }
+
+        self._executor.submit(self._run, job_id, func, args)
+        logging.info(f"[jobs] Queued job {job_id}")
+        return job_id
+
+    def get(self, job_id):
+        """Snapshot of a job's state, or None if the id is unknown or expired."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job)
+            snapshot['stages'] = [dict(stage) for stage in job['stages']]
+            return snapshot
+
+    def _run(self, job_id, func, args):
+        self._update(job_id, status='running', started_at=time.time())
+
+        def progress(stage_name):
+            with self._lock:
+                job = self._jobs[job_id]
+                now = time.time()
+                if job['stages']:
+                    job['stages'][-1].update({'status': 'done', 'finished_at': now})
+                job['stages'].append({'name': stage_name, 'status': 'running', 'started_at': now, 'finished_at': None})
+                job['current_stage'] = stage_name
+
+        try:
+            result = func(*args, progress=progress)
+        except Exception as e:
+            logging.exception(f"[jobs] Job {job_id} failed: {e}")
+            self._finish(job_id, status='failed', error=str(e))
+        else:
+            self._finish(job_id, status='done', result=result)
+            logging.info(f"[jobs] Job {job_id} finished")
+
+    def _finish(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            now = time.time()
+            if job['stages'] and job['stages'][-1]['status'] == 'running':
+                job['stages'][-1].update({
+                    'status': 'done' if fields['status'] == 'done' else 'failed',
+                    'finished_at': now
+                })
+            job.update(fields, current_stage=None, finished_at=now)
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _prune(self):
+        cutoff = time.time() - self._retention
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['finished_at'] is not None and job['finished_at'] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
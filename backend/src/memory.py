@@ -0,0 +1,98 @@
+import logging
+import numpy as np
+import pandas as pd
+
+from utils.config import STRING_CATEGORY_RATIO
+from utils.helper import working_copy
+
+try:
+    import pyarrow  # noqa: F401  (enables the 'string[pyarrow]' dtype)
+    TEXT_DTYPE = pd.StringDtype('pyarrow')
+except ImportError:
+    TEXT_DTYPE = None
+
+
+def _downcast_integer(s):
+    return pd.to_numeric(s, downcast='integer')
+
+
+def _downcast_float(s):
+    """float64 -> float32, only if every value survives the round trip exactly."""
+    if s.dtype != 'float64':
+        return s
+    values = s.to_numpy()
+    narrow = values.astype('float32')
+    with np.errstate(over='ignore', invalid='ignore'):
+        lossless = (narrow.astype('float64') == values) | np.isnan(values)
+    return pd.Series(narrow, index=s.index, name=s.name) if lossless.all() else s
+
+
+def _encode_text(s, category_ratio):
+    """
+    Dictionary-encode repetitive text as 'category'; store the rest as Arrow
+    strings when pyarrow is available. Columns holding non-string values are
+    left as object.
+    """
+    codes, uniques = pd.factorize(s)
+    if not all(isinstance(u, str) for u in uniques):
+        return s
+    if len(s) and len(uniques) / len(s) < category_ratio:
+        return s.astype('category')
+    if TEXT_DTYPE is not None:
+        return s.astype(TEXT_DTYPE)
+    return s
+
+
+def optimize_memory(df, text_cols=None, category_ratio=STRING_CATEGORY_RATIO):
+    """
+    Shrink the in-memory footprint of `df` before the heavy cleaning stages:
+    - integer columns are downcast to the smallest width holding their range
+    - float64 columns become float32 when no value loses precision
+    - text columns in `text_cols` (default: all object columns) are
+      dictionary-encoded as 'category' when fewer than `category_ratio` of
+      their values are distinct, and stored as Arrow strings otherwise
+
+    Values are never changed, only their representation.
+
+    Returns:
+    - pd.DataFrame: DataFrame with optimized dtypes
+    - Log: list of dict (one entry per changed column, with bytes before/after)
+    """
+    df = working_copy(df)
+    log = []
+
+    if text_cols is None:
+        text_cols = [col for col in df.columns if df[col].dtype == 'object']
+
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_bool_dtype(s):
+            continue
+        if pd.api.types.is_integer_dtype(s):
+            optimized = _downcast_integer(s)
+        elif pd.api.types.is_float_dtype(s):
+            optimized = _downcast_float(s)
+        elif col in text_cols and s.dtype == 'object':
+            optimized = _encode_text(s, category_ratio)
+        else:
+            continue
+
+        if optimized.dtype == s.dtype:
+            continue
+
+        bytes_before = int(s.memory_usage(index=False, deep=True))
+        bytes_after = int(optimized.memory_usage(index=False, deep=True))
+        df[col] = optimized
+        log.append({
+            'column': col,
+            'from': str(s.dtype),
+            'to': str(optimized.dtype),
+            'bytes_before': bytes_before,
+            'bytes_after': bytes_after,
+            'action': f'stored as {optimized.dtype}'
+        })
+
+    saved = sum(entry['bytes_before'] - entry['bytes_after'] for entry in log)
+    logging.info(f"[optimize_memory] Optimized {len(log)} columns, saved {saved / 1024 ** 2:.1f} MiB")
+
+    return df, log
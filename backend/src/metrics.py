@@ -0,0 +1,168 @@
+import sys
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+from utils.config import STAGE_LATENCY_BUCKETS
+
+try:
+    import resource
+except ImportError:  # not available on Windows: RSS deltas are reported as None
+    resource = None
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _max_rss():
+    """Peak resident set size of the process so far, in bytes."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _shape(df):
+    return (None, None) if df is None else (int(df.shape[0]), int(df.shape[1]))
+
+
+class _StageRecord:
+    def __init__(self, name, df=None):
+        self.name = name
+        self.rows_in, self.columns_in = _shape(df)
+        self.rows_out = self.columns_out = None
+        self.failed = False
+
+    def output(self, df):
+        """Record the shape of the stage's result."""
+        self.rows_out, self.columns_out = _shape(df)
+
+
+class MetricsRegistry:
+    """
+    Process-wide aggregates of stage metrics, exposed in the Prometheus text
+    format: a latency histogram, CPU time and row counters per stage, and
+    the largest peak-RSS increase seen for each stage.
+    """
+
+    def __init__(self, buckets=STAGE_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._stages = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def observe(self, record):
+        with self._lock:
+            st = self._stages.setdefault(record['stage'], {
+                'buckets': [0] * len(self.buckets), 'count': 0, 'sum': 0.0,
+                'cpu': 0.0, 'rows': 0, 'failures': 0, 'rss': 0,
+            })
+            wall = record['wall_seconds']
+            for i, bound in enumerate(self.buckets):
+                if wall <= bound:
+                    st['buckets'][i] += 1
+            st['count'] += 1
+            st['sum'] += wall
+            st['cpu'] += record['cpu_seconds']
+            st['rows'] += record['rows_in'] or 0
+            st['failures'] += record['failed']
+            st['rss'] = max(st['rss'], record['peak_rss_delta_bytes'] or 0)
+
+    def set_gauge(self, name, value, help_text=''):
+        with self._lock:
+            self._gauges[name] = (value, help_text)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            stages = {name: dict(st, buckets=list(st['buckets'])) for name, st in self._stages.items()}
+            gauges = dict(self._gauges)
+
+        lines = [
+            '# HELP pipeline_stage_duration_seconds Wall time of pipeline stages.',
+            '# TYPE pipeline_stage_duration_seconds histogram',
+        ]
+        for name, st in stages.items():
+            for bound, count in zip(self.buckets, st['buckets']):
+                lines.append(f'pipeline_stage_duration_seconds_bucket{{stage="{name}",le="{bound:g}"}} {count}')
+            lines.append(f'pipeline_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {st["count"]}')
+            lines.append(f'pipeline_stage_duration_seconds_sum{{stage="{name}"}} {st["sum"]:.6f}')
+            lines.append(f'pipeline_stage_duration_seconds_count{{stage="{name}"}} {st["count"]}')
+
+        series = [
+            ('pipeline_stage_cpu_seconds_total', 'counter', 'CPU time of the process during pipeline stages.', 'cpu'),
+            ('pipeline_stage_rows_total', 'counter', 'Rows fed into pipeline stages.', 'rows'),
+            ('pipeline_stage_failures_total', 'counter', 'Pipeline stages that raised an error.', 'failures'),
+            ('pipeline_stage_peak_rss_delta_bytes', 'gauge', 'Largest increase of peak RSS during a stage.', 'rss'),
+        ]
+        for metric, kind, help_text, key in series:
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} {kind}')
+            for name, st in stages.items():
+                value = f'{st[key]:.6f}' if isinstance(st[key], float) else st[key]
+                lines.append(f'{metric}{{stage="{name}"}} {value}')
+
+        for metric, (value, help_text) in gauges.items():
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+class StageMetrics:
+    """
+    Per-job stage instrumentation: wall time, CPU time, peak-RSS increase and
+    rows/columns in and out for each stage. Finished stages are also added to
+    the process-wide `registry` for /metrics.
+
+    CPU time is the whole process's (so it includes the thread pool workers of
+    parallel.map_columns, but not process pool workers), and peak RSS is the
+    process high-water mark (getrusage): jobs running concurrently share both,
+    and a stage only shows an RSS delta when it pushes the process above its
+    previous peak.
+
+        with metrics.stage('fix_data_types', df) as st:
+            df, log = fix_data_types(df)
+            st.output(df)
+    """
+
+    def __init__(self, registry=REGISTRY):
+        self.registry = registry
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name, df=None, progress=None):
+        if progress is not None:
+            progress(name)
+        record = _StageRecord(name, df)
+        rss_before = _max_rss()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        except Exception:
+            record.failed = True
+            raise
+        finally:
+            rss_after = _max_rss()
+            entry = {
+                'stage': name,
+                'wall_seconds': time.perf_counter() - wall_start,
+                'cpu_seconds': time.process_time() - cpu_start,
+                'peak_rss_delta_bytes': None if rss_before is None else rss_after - rss_before,
+                'rows_in': record.rows_in,
+                'columns_in': record.columns_in,
+                'rows_out': record.rows_out,
+                'columns_out': record.columns_out,
+                'failed': record.failed,
+            }
+            self.stages.append(entry)
+            if self.registry is not None:
+                self.registry.observe(entry)
+            logging.info(f"[{name}] {entry['wall_seconds']:.3f}s wall, {entry['cpu_seconds']:.3f}s CPU")
+
+    def report(self):
+        return [dict(entry) for entry in self.stages]
@@ -0,0 +1,173 @@
+import inspect
+import logging
+import numpy as np
+import pandas as pd
+
+from utils.config import OUTLIER_METHOD, OUTLIER_PARAMS
+
+def iqr_bounds(block, k=1.5):
+    """Tukey fences: [Q1 - k*IQR, Q3 + k*IQR], all quartiles from one quantile call."""
+    q1, q3 = block.quantile([0.25, 0.75]).to_numpy()
+    iqr = q3 - q1
+    return q1 - k * iqr, q3 + k * iqr
+
+
+def zscore_bounds(block, threshold=3.0):
+    """Mean +/- `threshold` standard deviations."""
+    mean, std = block.mean().to_numpy(), block.std().to_numpy()
+    return mean - threshold * std, mean + threshold * std
+
+
+def mad_bounds(block, threshold=3.5):
+    """
+    Median +/- `threshold` scaled median absolute deviations (robust z-score).
+    Columns where more than half the values are equal have a MAD of 0 and get
+    (-inf, inf): any other value would count as an outlier.
+    """
+    median = block.median()
+    mad = (block - median).abs().median().to_numpy(dtype='float64', na_value=np.nan) * 1.4826
+    median = median.to_numpy(dtype='float64', na_value=np.nan)
+    lower, upper = median - threshold * mad, median + threshold * mad
+    degenerate = mad == 0
+    return np.where(degenerate, -np.inf, lower), np.where(degenerate, np.inf, upper)
+
+
+def percentile_bounds(block, lower=0.01, upper=0.99):
+    """Cap values to the `lower` and `upper` percentiles."""
+    low, high = block.quantile([lower, upper]).to_numpy()
+    return low, high
+
+
+# Available detectors: method -> function(block, **params) -> (lower, upper)
+DETECTORS = {
+    'iqr': iqr_bounds,
+    'zscore': zscore_bounds,
+    'mad': mad_bounds,
+    'percentile': percentile_bounds,
+}
+
+
+def check_detector(method=OUTLIER_METHOD, **params):
+    """Raise ValueError unless `method` is a detector and `params` are numbers it accepts."""
+    if method not in DETECTORS:
+        raise ValueError(f"Unknown outlier method '{method}', expected one of {sorted(DETECTORS)}")
+    accepted = list(inspect.signature(DETECTORS[method]).parameters)[1:]
+    if set(params) - set(accepted):
+        raise ValueError(f"Outlier method '{method}' accepts parameters {accepted}, got {sorted(params)}")
+    invalid = [name for name, value in params.items()
+               if isinstance(value, bool) or not isinstance(value, (int, float))]
+    if invalid:
+        raise ValueError(f"Outlier parameters {invalid} must be numbers")
+
+
+def numeric_columns(df):
+    """All numeric columns, whatever their width or nullability (booleans excluded)."""
+    return [col for col in df.columns
+            if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])]
+
+
+def outlier_bounds(block, method=OUTLIER_METHOD, **params):
+    """
+    Lower and upper outlier bounds for every column of the numeric frame `block`.
+
+    Parameters:
+    - method (str): 'iqr', 'zscore', 'mad' or 'percentile'.
+    - params: detector parameters, defaulting to OUTLIER_PARAMS[method].
+
+    Returns:
+    - pd.DataFrame: one row per column, with 'lower' and 'upper'
+    """
+    check_detector(method)
+
+    params = {**OUTLIER_PARAMS.get(method, {}), **params}
+    lower, upper = DETECTORS[method](block, **params)
+    # Nullable columns give object results; bounds are always plain floats
+    return pd.DataFrame({'lower': _as_float(lower), 'upper': _as_float(upper)}, index=block.columns)
+
+
+def sample_bounds(samples, method=OUTLIER_METHOD, **params):
+    """
+    Outlier bounds estimated from per-column samples (e.g. streaming
+    reservoirs), which may differ in length. Returns a dict col -> (lower, upper),
+    without the columns whose bounds aren't finite (nothing to clip).
+    """
+    block = pd.DataFrame({col: pd.Series(values, dtype='float64') for col, values in samples.items()})
+    if block.empty:
+        return {}
+    bounds = outlier_bounds(block, method, **params)
+    return {col: (float(row.lower), float(row.upper)) for col, row in bounds.iterrows()
+            if np.isfinite(row.lower) and np.isfinite(row.upper)}
+
+
+def _as_float(values):
+    return np.array([np.nan if pd.isna(v) else float(v) for v in values], dtype='float64')
+
+
+def _clip_dtype(dtype):
+    """Integer columns are clipped as floats, since the bounds usually aren't whole numbers."""
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'Float64' if pd.api.types.is_extension_array_dtype(dtype) else 'float64'
+    return dtype
+
+
+def _clip_block(block, lower, upper):
+    """Clip a single-dtype block column-wise; NumPy-backed blocks skip pandas' alignment."""
+    if pd.api.types.is_extension_array_dtype(block.dtypes.iloc[0]):
+        return block.clip(lower, upper, axis=1)
+    values = np.clip(block.to_numpy(), lower.to_numpy(), upper.to_numpy()).astype(block.dtypes.iloc[0], copy=False)
+    return pd.DataFrame(values, index=block.index, columns=block.columns)
+
+
+def clip_outliers(df, columns, method=OUTLIER_METHOD, bounds=None, **params):
+    """
+    Detect and clip outliers in `columns` of `df` as one numeric block: the
+    bounds and the outlier counts are each a single vectorized operation over
+    the block, and the clip one per dtype. Columns without outliers are left
+    untouched. `bounds` (column -> (lower, upper), for every column) replaces
+    detection with bounds fitted earlier.
+
+    Returns:
+    - pd.DataFrame: clipped columns (only those that had outliers)
+    - Log: list of dict
+    """
+    if not columns:
+        return df.iloc[:, :0], []
+
+    block = df[columns]
+    if bounds is not None:
+        bounds = pd.DataFrame([bounds[col] for col in columns], index=columns, columns=['lower', 'upper'],
+                              dtype='float64')
+    else:
+        bounds = outlier_bounds(block, method, **params)
+    lower, upper = bounds['lower'], bounds['upper']
+
+    below = block.lt(lower, axis=1).sum()
+    above = block.gt(upper, axis=1).sum()
+    flagged = [col for col in columns if below[col] + above[col] > 0]
+    if not flagged:
+        return df.iloc[:, :0], []
+
+    # Clip each dtype group as one 2-D block (mixed-dtype frames would go through object)
+    groups = {}
+    for col in flagged:
+        groups.setdefault(_clip_dtype(block[col].dtype), []).append(col)
+    clipped = pd.concat(
+        [_clip_block(block[cols].astype(dtype), lower[cols], upper[cols]) for dtype, cols in groups.items()],
+        axis=1
+    )
+
+    log = []
+    for col in flagged:
+        log.append({
+            'column': col,
+            'method': method,
+            'outliers_below': int(below[col]),
+            'outliers_above': int(above[col]),
+            'total_outliers': int(below[col] + above[col]),
+            'lower_bound': lower[col],
+            'upper_bound': upper[col],
+            'action': f'Clipped to [{lower[col]}, {upper[col]}]'
+        })
+    logging.info(f"[clip_outliers] Clipped {len(flagged)} of {len(columns)} numeric columns ({method})")
+
+    return clipped, log
@@ -0,0 +1,24 @@
+import logging
+from joblib import Parallel, delayed
+
+from utils.config import PARALLEL_WORKERS, PARALLEL_BACKEND, PARALLEL_MIN_CELLS
+
+def map_columns(func, df, columns, *args, n_jobs=PARALLEL_WORKERS, backend=PARALLEL_BACKEND):
+    """
+    Call `func(col, df[col], *args)` for every column in `columns` and return
+    the results in the same order as `columns`, so stages can merge results
+    and logs deterministically whatever the number of workers.
+
+    Columns are sharded across a joblib thread or process pool ('threads' /
+    'processes'); small frames (fewer than PARALLEL_MIN_CELLS cells), a single
+    column or n_jobs=1 run serially to avoid the pool overhead.
+    """
+    columns = list(columns)
+
+    if n_jobs == 1 or len(columns) < 2 or len(df) * len(columns) < PARALLEL_MIN_CELLS:
+        return [func(col, df[col], *args) for col in columns]
+
+    logging.info(f"[map_columns] Running {func.__name__} on {len(columns)} columns with n_jobs={n_jobs} ({backend})")
+    return Parallel(n_jobs=n_jobs, prefer=backend)(
+        delayed(func)(col, df[col], *args) for col in columns
+    )
@@ -0,0 +1,542 @@
+import json
+import hashlib
+import inspect
+import logging
+import os
+import threading
+import tracemalloc
+import pandas as pd
+from contextlib import contextmanager, nullcontext, ExitStack
+from pathlib import Path
+
+from utils.config import (
+    MEMORY_BUDGET_BYTES,
+    OUTPUT_FOLDER,
+    APPEND_STATE_FOLDER,
+    EXCEL_CACHE_FOLDER,
+    OUTLIER_METHOD,
+    CHUNK_SIZE,
+    STREAMING_THRESHOLD_BYTES,
+    STRING_CATEGORY_RATIO,
+    EDA_SAMPLE_ROWS
+)
+from utils.helper import split_extension
+from data_loader import load_data, load_data_in_chunks
+from data_types import fix_data_types, identify_columns
+from data_cleaning import normalize_text_columns, remove_duplicates, handle_missing_values, handle_outliers
+from memory import optimize_memory
+from metrics import StageMetrics
+from profiling import profile_dataframe
+from dedup import RowHashIndex
+from outliers import check_detector
+from reporting import save_cleaned_data, with_format
+from streaming import clean_csv_in_chunks
+from incremental import clean_batch
+from eda.eda import data_overview, generate_report
+from eda.associations import AssociationAccumulator
+
+class MemoryBudgetExceeded(MemoryError):
+    """Raised when a pipeline stage pushes the job's peak memory over its budget."""
+
+
+class MemoryTracker:
+    """
+    Tracks the peak memory allocated by each pipeline stage with tracemalloc
+    (NumPy and Python allocations, i.e. pandas column data) and enforces an
+    optional budget. The budget is checked when a stage finishes, so a stage
+    that exceeds it is reported and the job stopped before the next one.
+
+    tracemalloc's peak is process-wide, so tracked stages of concurrent jobs
+    run one at a time, and a job is charged only for what it allocated during
+    its own stages. Untracked work running meanwhile (uploads being parsed,
+    reports being written) is still counted in the peak of the stage it
+    overlaps.
+    """
+
+    # tracemalloc is process-wide: keep it running while any job is tracked
+    _active = 0
+    _lock = threading.Lock()
+    # Held for the duration of each tracked stage, so peaks don't mix between jobs
+    _stage_lock = threading.Lock()
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.stages = {}
+        # Bytes this job's tracked stages allocated and kept so far
+        self._held = 0
+
+    def __enter__(self):
+        with MemoryTracker._lock:
+            if MemoryTracker._active == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            MemoryTracker._active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with MemoryTracker._lock:
+            MemoryTracker._active -= 1
+            if MemoryTracker._active == 0:
+                tracemalloc.stop()
+        return False
+
+    @contextmanager
+    def stage(self, name, progress=None):
+        if progress is not None:
+            progress(name)
+        with MemoryTracker._stage_lock:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            yield
+            current, peak = tracemalloc.get_traced_memory()
+        peak = max(self._held + peak - baseline, 0)
+        self._held += current - baseline
+        self.stages[name] = peak
+        logging.info(f"[{name}] peak memory {peak / 1024 ** 2:.1f} MiB")
+
+        if self.budget is not None and peak > self.budget:
+            msg = (f"Stage '{name}' used {peak / 1024 ** 2:.1f} MiB, "
+                   f"over the memory budget of {self.budget / 1024 ** 2:.1f} MiB")
+            logging.error(msg)
+            raise MemoryBudgetExceeded(msg)
+
+    def report(self):
+        return {
+            'budget_bytes': self.budget,
+            'peak_bytes': max(self.stages.values(), default=0),
+            'stages': dict(self.stages),
+        }
+
+
+# =========================================
+#  Pipeline engine
+# =========================================
+
+class Stage:
+    """
+    One pipeline step. `func` is called with the artifacts named in `reads`
+    (all required), those named in `uses` that are already available (never
+    computed just for this stage) and the stage's per-request parameters. It
+    returns a dict with the artifacts named in `writes`, and optionally:
+    - 'log': list of dicts appended to the job's log_report
+    - 'columns': DataFrame columns it rewrote; their cached row hashes are
+      dropped from the 'row_index' artifact
+
+    `optional` stages may be skipped per request; `tracked` stages run under
+    the MemoryTracker when a memory budget is set. `check(**params)`, if
+    given, validates the values of a request's parameters, raising ValueError.
+    """
+
+    def __init__(self, name, func, reads=(), writes=(), uses=(), optional=False, tracked=False, check=None):
+        self.name = name
+        self.func = func
+        self.reads = tuple(reads)
+        self.writes = tuple(writes)
+        self.uses = tuple(uses)
+        self.optional = optional
+        self.tracked = tracked
+        self.check = check
+
+    def parameters(self):
+        """Names of the per-request parameters `func` accepts (None if any)."""
+        params = inspect.signature(self.func).parameters.values()
+        if any(p.kind == p.VAR_KEYWORD for p in params):
+            return None
+        return {p.name for p in params if p.name not in self.reads + self.uses}
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, reads={self.reads}, writes={self.writes})"
+
+
+class Pipeline:
+    """
+    An ordered list of stages connected by the artifacts they read and write.
+
+    `run` plans before executing: walking the stages backwards from the
+    requested outputs, a stage is kept only if something downstream needs
+    one of its writes, so asking for just the overview never cleans the data.
+    Stages that read and write the same artifact (e.g. 'df') form a chain;
+    skipping one passes its input through unchanged. Intermediate artifacts
+    are released as soon as no remaining stage reads them.
+    """
+
+    def __init__(self, name, stages):
+        self.name = name
+        self.stages = list(stages)
+
+    def __contains__(self, stage_name):
+        return any(stage.name == stage_name for stage in self.stages)
+
+    @property
+    def outputs(self):
+        return {artifact for stage in self.stages for artifact in stage.writes}
+
+    def plan(self, outputs, available=(), skip=()):
+        """
+        Stages needed to produce `outputs` from the `available` artifacts, in
+        pipeline order; stages whose artifacts are all available (e.g. 'raw'
+        for a DataFrame cleaned in memory) are left out. Names in `skip` that
+        this pipeline doesn't have are ignored; skipping a required stage is
+        an error.
+        """
+        required = [stage.name for stage in self.stages if stage.name in skip and not stage.optional]
+        if required:
+            raise ValueError(f"Stages {required} cannot be skipped")
+
+        needed = set(outputs)
+        unknown = needed - self.outputs - set(available)
+        if unknown:
+            raise ValueError(f"Pipeline '{self.name}' cannot produce {sorted(unknown)}")
+
+        available = set(available)
+        needed -= available
+        plan = []
+        for stage in reversed(self.stages):
+            if stage.name in skip or not needed & set(stage.writes):
+                continue
+            plan.append(stage)
+            needed = (needed - set(stage.writes)) | (set(stage.reads) - available)
+
+        missing = needed
+        if missing:
+            raise ValueError(f"No stage left to produce {sorted(missing)}")
+        return plan[::-1]
+
+    def run(self, context, outputs, skip=(), params=None, progress=None, metrics=None,
+            memory_budget=MEMORY_BUDGET_BYTES):
+        """
+        Run the stages needed for `outputs` on `context` (dict of initial
+        artifacts, updated in place). Stages copy frames shallowly when pandas
+        copy-on-write is on (see utils.helper.enable_copy_on_write), deeply
+        otherwise.
+
+        Parameters:
+        - skip (list): optional stages not to run.
+        - params (dict): stage name -> keyword arguments for that stage.
+        - progress (callable): called with each stage name as it starts.
+        - metrics (metrics.StageMetrics): records every stage.
+        - memory_budget (int): peak bytes allowed per tracked stage (None =
+          unlimited). Tracked stages are traced only when a budget is set, as
+          tracemalloc slows them down several times.
+
+        Returns:
+        - dict: the context, with 'log_report' and, if a tracked stage ran
+          under a budget, 'memory_report' ('budget_bytes', 'peak_bytes', 'stages')
+        """
+        params = params or {}
+        metrics = metrics if metrics is not None else StageMetrics()
+        plan = self.plan(outputs, context, skip)
+        logging.info(f"[{self.name}] Running {[stage.name for stage in plan]}")
+
+        # Position of the last stage reading each artifact, to release it afterwards
+        last_read = {}
+        for i, stage in enumerate(plan):
+            for artifact in stage.reads + stage.uses:
+                last_read[artifact] = i
+        produced = set()
+        context.setdefault('log_report', [])
+        last_tracked = None
+        if memory_budget is not None:
+            last_tracked = max((i for i, stage in enumerate(plan) if stage.tracked), default=None)
+
+        with ExitStack() as tracking:
+            tracker = None
+            for i, stage in enumerate(plan):
+                traced = last_tracked is not None and stage.tracked
+                if traced and tracker is None:
+                    tracker = tracking.enter_context(MemoryTracker(memory_budget))
+
+                inputs = {artifact: context[artifact] for artifact in stage.reads}
+                inputs.update({artifact: context[artifact] for artifact in stage.uses if artifact in context})
+                frame = next((v for v in inputs.values() if isinstance(v, pd.DataFrame)), None)
+
+                with tracker.stage(stage.name) if traced else nullcontext(), \
+                        metrics.stage(stage.name, frame, progress=progress) as st:
+                    result = stage.func(**inputs, **params.get(stage.name, {}))
+                    st.output(next((v for v in result.values() if isinstance(v, pd.DataFrame)), None))
+
+                if 'log' in result:
+                    context['log_report'].append(result.pop('log'))
+                row_index = context.get('row_index')
+                for col in result.pop('columns', ()):
+                    if row_index is not None:
+                        row_index.discard(col)
+                context.update(result)
+                produced.update(result)
+
+                if i == last_tracked:
+                    context['memory_report'] = tracker.report()
+                    tracking.close()
+                for artifact, last in last_read.items():
+                    if last == i and artifact in produced and artifact not in outputs:
+                        context.pop(artifact, None)
+
+        return context
+
+
+# =========================================
+#  Stages
+# =========================================
+
+# pandas dtypes of the streaming column types when the cleaned file is read back
+# (numeric columns are inferred, datetime columns parsed)
+PREVIEW_DTYPES = {'bool': 'boolean', 'category': 'category', 'text': str}
+
+
+def _load_data(filepath, file_ext=None, digest=None, excel_cache_folder=EXCEL_CACHE_FOLDER, sheet=None):
+    return {'raw': load_data(filepath, sheet, file_ext=file_ext, digest=digest, excel_cache_folder=excel_cache_folder)}
+
+
+def _data_overview(raw):
+    profile = profile_dataframe(raw)
+    row_index = RowHashIndex()
+    return {'profile': profile, 'row_index': row_index, 'overview': data_overview(raw, profile, row_index)}
+
+
+def _fix_data_types(raw, profile=None, conversions=None):
+    df, log = fix_data_types(raw, profile, conversions=conversions)
+    return {'df': df, 'columns_dtype': identify_columns(df), 'log': log,
+            'columns': [entry['column'] for entry in log]}
+
+
+def _normalize_text_columns(df, columns_dtype, category_ratio=STRING_CATEGORY_RATIO):
+    return {'df': normalize_text_columns(df, columns_dtype['others'], category_ratio),
+            'columns': columns_dtype['others']}
+
+
+def _optimize_memory(df, columns_dtype, category_ratio=STRING_CATEGORY_RATIO):
+    df, log = optimize_memory(df, columns_dtype['others'], category_ratio)
+    return {'df': df, 'log': log, 'columns': [entry['column'] for entry in log]}
+
+
+def _remove_duplicates(df, row_index=None, subset=None, keep='first', timestamp_col=None):
+    df, log = remove_duplicates(df, subset=subset, keep=keep, timestamp_col=timestamp_col, row_index=row_index)
+    return {'df': df, 'log': log}
+
+
+def _handle_missing_values(df, columns_dtype, profile=None, col_drop_thresh=0.5, drop=None, fill_values=None):
+    df, log = handle_missing_values(df, columns_dtype['numerical'], columns_dtype['categorical'],
+                                    columns_dtype['datetime'], col_drop_thresh=col_drop_thresh, profile=profile,
+                                    drop=drop, fill_values=fill_values)
+    return {'df': df, 'log': log}
+
+
+def _handle_outliers(df, method=OUTLIER_METHOD, bounds=None, k=None, threshold=None, lower=None, upper=None):
+    # Detector parameters left out fall back to OUTLIER_PARAMS
+    params = {name: value for name, value in {'k': k, 'threshold': threshold, 'lower': lower, 'upper': upper}.items()
+              if value is not None}
+    df, log = handle_outliers(df, method=method, bounds=bounds, **params)
+    return {'df': df, 'log': log, 'columns': [entry['column'] for entry in log]}
+
+
+def _check_outliers(method=OUTLIER_METHOD, bounds=None, **params):
+    check_detector(method, **params)
+    if bounds is not None and not (
+            isinstance(bounds, dict)
+            and all(isinstance(pair, list) and len(pair) == 2
+                    and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in pair)
+                    for pair in bounds.values())):
+        raise ValueError("bounds must map column names to [lower, upper] numbers")
+
+
+def _save_cleaned_data(df, cleaned_name, output_dir=OUTPUT_FOLDER, check_quota=None, compression=None):
+    return {'cleaned_file': save_cleaned_data(df, filename=cleaned_name, compression=compression,
+                                              output_dir=output_dir, check_quota=check_quota)}
+
+
+def _generate_report(df, report_name, associations=None, totals=None, output_dir=OUTPUT_FOLDER,
+                     sample_rows=EDA_SAMPLE_ROWS):
+    return {'eda_report': generate_report(df, filename=report_name, sample_rows=sample_rows,
+                                          associations=associations, totals=totals, output_dir=output_dir)}
+
+
+def _clean_csv_in_chunks(filepath, cleaned_name, output_dir=OUTPUT_FOLDER, check_quota=None, chunksize=CHUNK_SIZE,
+                         col_drop_thresh=0.5, outlier_method=OUTLIER_METHOD):
+    # Streaming mode appends CSV chunks, whatever output format was requested
+    associations = AssociationAccumulator()
+    cleaned_file, overview, log_list = clean_csv_in_chunks(filepath, filename=with_format(cleaned_name, 'csv'),
+                                                           chunksize=chunksize, col_drop_thresh=col_drop_thresh,
+                                                           outlier_method=outlier_method, associations=associations,
+                                                           output_dir=output_dir, check_quota=check_quota)
+    return {'cleaned_file': cleaned_file, 'overview': overview, 'log_report': log_list,
+            'associations': associations, 'totals': overview['cleaned']}
+
+
+def _clean_batch(raw, dataset, state_folder=APPEND_STATE_FOLDER, col_drop_thresh=0.5, outlier_method=OUTLIER_METHOD):
+    df, overview, log_list = clean_batch(raw, dataset, state_folder=state_folder, col_drop_thresh=col_drop_thresh,
+                                         outlier_method=outlier_method)
+    return {'df': df, 'overview': overview, 'log_report': log_list}
+
+
+def _check_outlier_method(outlier_method=OUTLIER_METHOD, **params):
+    check_detector(outlier_method)
+
+
+def _load_preview(cleaned_file, overview, output_dir=OUTPUT_FOLDER, sample_rows=EDA_SAMPLE_ROWS):
+    # Read the first rows back with the types the streaming pass gave them
+    types = {col: kind for col, kind in overview['dtypes'].items() if col in overview['cleaned']['missing_values']}
+    dtype = {col: PREVIEW_DTYPES[kind] for col, kind in types.items() if kind in PREVIEW_DTYPES}
+    dates = [col for col, kind in types.items() if kind == 'datetime']
+    return {'df': next(load_data_in_chunks(Path(output_dir) / cleaned_file, chunksize=sample_rows, dtype=dtype,
+                                           parse_dates=dates))}
+
+
+CLEANING_STAGES = [
+    Stage('fix_data_types', _fix_data_types, reads=['raw'], writes=['df', 'columns_dtype'], uses=['profile'],
+          tracked=True),
+    Stage('normalize_text_columns', _normalize_text_columns, reads=['df', 'columns_dtype'], writes=['df'],
+          optional=True, tracked=True),
+    Stage('optimize_memory', _optimize_memory, reads=['df', 'columns_dtype'], writes=['df'],
+          optional=True, tracked=True),
+    Stage('remove_duplicates', _remove_duplicates, reads=['df'], writes=['df'], uses=['row_index'],
+          optional=True, tracked=True),
+    Stage('handle_missing_values', _handle_missing_values, reads=['df', 'columns_dtype'], writes=['df'],
+          uses=['profile'], optional=True, tracked=True),
+    Stage('handle_outliers', _handle_outliers, reads=['df'], writes=['df'], optional=True, tracked=True,
+          check=_check_outliers),
+]
+
+IN_MEMORY_PIPELINE = Pipeline('in_memory', [
+    Stage('load_data', _load_data, reads=['filepath'], writes=['raw'],
+          uses=['file_ext', 'digest', 'excel_cache_folder']),
+    Stage('data_overview', _data_overview, reads=['raw'], writes=['profile', 'row_index', 'overview']),
+    *CLEANING_STAGES,
+    Stage('save_cleaned_data', _save_cleaned_data, reads=['df', 'cleaned_name'], writes=['cleaned_file'],
+          uses=['output_dir', 'check_quota']),
+    Stage('generate_report', _generate_report, reads=['df', 'report_name'], writes=['eda_report'],
+          uses=['associations', 'output_dir']),
+])
+
+STREAMING_PIPELINE = Pipeline('streaming', [
+    Stage('clean_csv_in_chunks', _clean_csv_in_chunks, reads=['filepath', 'cleaned_name'],
+          writes=['cleaned_file', 'overview', 'log_report', 'associations', 'totals'],
+          uses=['output_dir', 'check_quota'], check=_check_outlier_method),
+    Stage('load_preview', _load_preview, reads=['cleaned_file', 'overview'], writes=['df'], uses=['output_dir']),
+    Stage('generate_report', _generate_report, reads=['df', 'report_name'], writes=['eda_report'],
+          uses=['associations', 'totals', 'output_dir']),
+])
+
+APPEND_PIPELINE = Pipeline('append', [
+    Stage('load_data', _load_data, reads=['filepath'], writes=['raw'],
+          uses=['file_ext', 'digest', 'excel_cache_folder']),
+    Stage('clean_batch', _clean_batch, reads=['raw', 'dataset'], writes=['df', 'overview', 'log_report'],
+          uses=['state_folder'], tracked=True, check=_check_outlier_method),
+    Stage('save_cleaned_data', _save_cleaned_data, reads=['df', 'cleaned_name'], writes=['cleaned_file'],
+          uses=['output_dir', 'check_quota']),
+    Stage('generate_report', _generate_report, reads=['df', 'report_name'], writes=['eda_report'],
+          uses=['output_dir']),
+])
+
+# /preview: the overview of a sample and the type conversions fix_data_types proposes for it
+PREVIEW_PIPELINE = Pipeline('preview', [
+    Stage('data_overview', _data_overview, reads=['raw'], writes=['profile', 'row_index', 'overview']),
+    Stage('fix_data_types', _fix_data_types, reads=['raw'], writes=['df', 'columns_dtype'], uses=['profile']),
+])
+
+# Outputs a client can ask for
+REQUESTABLE_OUTPUTS = ('overview', 'cleaned_file', 'eda_report')
+
+
+def select_pipeline(source, file_ext):
+    """
+    Append mode for uploads naming a 'dataset' (cleaned as its next batch),
+    else streaming for CSV files over STREAMING_THRESHOLD_BYTES, in-memory
+    otherwise. `source` holds the initial artifacts: 'filepath', a path or
+    (for an upload kept in memory) a binary file object, or 'raw'.
+    """
+    if source.get('dataset'):
+        return APPEND_PIPELINE
+    filepath = source.get('filepath')
+    fmt, _ = split_extension(file_ext.lower())
+    on_disk = isinstance(filepath, (str, os.PathLike))
+    if on_disk and fmt == '.csv' and os.path.getsize(filepath) > STREAMING_THRESHOLD_BYTES:
+        logging.info(f"File exceeds {STREAMING_THRESHOLD_BYTES} bytes, cleaning in streaming mode")
+        return STREAMING_PIPELINE
+    return IN_MEMORY_PIPELINE
+
+
+def parse_options(outputs=None, skip=None, params=None):
+    """
+    Validate per-request pipeline options, as sent in the upload form:
+    - outputs: comma-separated subset of REQUESTABLE_OUTPUTS (default: all)
+    - skip: comma-separated optional stages not to run
+    - params: JSON object {stage name: {parameter: value}}
+
+    Raises ValueError on unknown outputs, stages or parameters, and on
+    parameter values a stage's `check` rejects.
+
+    Returns:
+    - dict: 'outputs', 'skip' and 'params'
+    """
+    stages = {stage.name: stage for pipeline in (IN_MEMORY_PIPELINE, STREAMING_PIPELINE, APPEND_PIPELINE)
+              for stage in pipeline.stages}
+
+    outputs = [name.strip() for name in outputs.split(',') if name.strip()] if outputs else list(REQUESTABLE_OUTPUTS)
+    unknown = [name for name in outputs if name not in REQUESTABLE_OUTPUTS]
+    if unknown:
+        raise ValueError(f"Unknown outputs {unknown}, expected some of {list(REQUESTABLE_OUTPUTS)}")
+
+    skip = [name.strip() for name in skip.split(',') if name.strip()] if skip else []
+    not_optional = [name for name in skip if name not in stages or not stages[name].optional]
+    if not_optional:
+        optional = [name for name, stage in stages.items() if stage.optional]
+        raise ValueError(f"Cannot skip {not_optional}, optional stages are {optional}")
+
+    try:
+        params = json.loads(params) if params else {}
+    except ValueError:
+        raise ValueError("params must be a JSON object")
+    if not isinstance(params, dict) or not all(isinstance(v, dict) for v in params.values()):
+        raise ValueError("params must map stage names to objects of parameters")
+    for name, values in params.items():
+        if name not in stages:
+            raise ValueError(f"Unknown stage '{name}' in params")
+        accepted = stages[name].parameters()
+        if accepted is not None and set(values) - accepted:
+            raise ValueError(f"Stage '{name}' accepts parameters {sorted(accepted)}, got {sorted(values)}")
+        if stages[name].check is not None:
+            stages[name].check(**values)
+
+    return {'outputs': outputs, 'skip': skip, 'params': params}
+
+
+def options_key(options):
+    """Short digest of the options, to keep results of different requests apart in the cache."""
+    encoded = json.dumps(options, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:12]
+
+
+def run_cleaning_pipeline(df, profile=None, memory_budget=MEMORY_BUDGET_BYTES, progress=None, row_index=None,
+                          metrics=None, skip=(), params=None):
+    """
+    Run the cleaning stages on `df` without copying the whole dataset per stage:
+    - with pandas copy-on-write enabled (see utils.helper.enable_copy_on_write),
+      each stage starts from a shallow copy and only the columns it reassigns
+      are materialized
+    - `df` itself is never modified
+    - after type fixing and text normalization, columns are downcast and
+      text is dictionary/Arrow-encoded (see memory.optimize_memory) so the
+      remaining stages work on a smaller frame
+    - with a `memory_budget` (bytes), peak memory is measured per stage and
+      checked against it
+    - `progress(stage_name)`, if given, is called as each stage starts
+    - `row_index` (a dedup.RowHashIndex, e.g. the one data_overview counted
+      duplicates with) lets remove_duplicates reuse the hashes of columns the
+      earlier stages left untouched
+    - `metrics` (a metrics.StageMetrics) records wall/CPU time, peak RSS and
+      rows/columns in and out of every stage
+    - `skip` and `params` are passed to Pipeline.run
+
+    Returns:
+    - pd.DataFrame: cleaned data
+    - list: log_report, one list of dicts per stage
+    - dict: memory report ('budget_bytes', 'peak_bytes', 'stages'), None without a budget
+    """
+    context = {'raw': df}
+    if profile is not None:
+        context['profile'] = profile
+    if row_index is not None:
+        context['row_index'] = row_index
+
+    context = Pipeline('cleaning', CLEANING_STAGES).run(context, ['df'], skip=skip, params=params, progress=progress,
+                                                        metrics=metrics, memory_budget=memory_budget)
+    return context['df'], context['log_report'], context.get('memory_report')
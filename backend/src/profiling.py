@@ -0,0 +1,171 @@
+import sys
+import logging
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+
+from data_types import BOOL_MAP
+
+@dataclass
+class ColumnProfile:
+    name: str
+    dtype: str
+    count: int
+    null_count: int
+    blank_count: int
+    distinct: int
+    min: object
+    max: object
+    memory_bytes: int
+    bool_like: bool
+    hint: str
+    mode: object = None
+
+
+@dataclass
+class DataProfile:
+    """
+    Per-column profile of a DataFrame, computed once and shared between the
+    overview and the cleaning stages so they don't rescan the same columns.
+
+    A profile describes the frame it was built from. Stages that rewrite a
+    column call `discard(col)` so later stages fall back to scanning it.
+    """
+    rows: int
+    index_memory_bytes: int
+    columns: dict = field(default_factory=dict)
+
+    def __contains__(self, col):
+        return col in self.columns
+
+    def __getitem__(self, col):
+        return self.columns[col]
+
+    def discard(self, col):
+        self.columns.pop(col, None)
+
+    def overview(self):
+        """Summary in the shape returned by eda.data_overview (minus duplicates)."""
+        memory_usage = {'Index': self.index_memory_bytes}
+        memory_usage.update({col: p.memory_bytes for col, p in self.columns.items()})
+        return {
+            "shape": {"rows": self.rows, "columns": len(self.columns)},
+            "dtypes": {col: p.dtype for col, p in self.columns.items()},
+            "missing_values": {col: p.null_count for col, p in self.columns.items()},
+            "memory_usage": memory_usage,
+        }
+
+
+def _scalar(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _profile_object_column(name, s):
+    """
+    Profile an object/string column from a single factorize pass: the codes
+    give null count, distinct count and per-value frequencies, so blank
+    detection, bool detection, mode, min/max and deep memory only have to
+    look at the unique values.
+    """
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    uniques = np.asarray(uniques, dtype=object)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    null_count = len(s) - int(counts.sum())
+
+    is_str = np.fromiter((isinstance(u, str) for u in uniques), dtype=bool, count=len(uniques))
+    blank = np.zeros(len(uniques), dtype=bool)
+    blank[is_str] = [u.strip() == '' for u in uniques[is_str]]
+    blank_count = int(counts[blank].sum())
+
+    # Deep memory the way pandas counts it: one pointer per row plus the size
+    # of every element object (missing values are float NaN objects)
+    if pd.api.types.is_object_dtype(s):
+        sizes = np.fromiter((sys.getsizeof(u) for u in uniques), dtype='int64', count=len(uniques))
+        memory_bytes = int(s.memory_usage(index=False, deep=False) + (counts * sizes).sum()
+                           + null_count * sys.getsizeof(np.nan))
+    else:
+        memory_bytes = int(s.memory_usage(index=False, deep=True))
+
+    bool_like = bool(is_str.all()) and {u.lower() for u in uniques}.issubset(BOOL_MAP)
+    try:
+        lo, hi = (_scalar(uniques.min()), _scalar(uniques.max())) if len(uniques) else (None, None)
+    except TypeError:
+        lo, hi = None, None
+    if len(uniques):
+        top = counts.max()
+        mode = _scalar(min(uniques[counts == top], key=str))
+    else:
+        mode = None
+
+    return dict(null_count=null_count, blank_count=blank_count, distinct=len(uniques),
+                min=lo, max=hi, memory_bytes=memory_bytes, bool_like=bool_like, mode=mode)
+
+
+def _profile_numeric_column(name, s):
+    values = s.to_numpy(dtype='float64', na_value=np.nan)
+    missing = np.isnan(values)
+    present = values[~missing]
+    uniques = pd.unique(present)
+
+    return dict(
+        null_count=int(missing.sum()),
+        blank_count=0,
+        distinct=len(uniques),
+        min=_scalar(present.min()) if len(present) else None,
+        max=_scalar(present.max()) if len(present) else None,
+        memory_bytes=int(s.memory_usage(index=False, deep=False)),
+        bool_like=set(uniques).issubset({0, 1}),
+    )
+
+
+def _profile_other_column(name, s):
+    missing = s.isna().to_numpy()
+    present = s[~missing]
+    return dict(
+        null_count=int(missing.sum()),
+        blank_count=0,
+        distinct=int(present.nunique()),
+        min=str(present.min()) if len(present) else None,
+        max=str(present.max()) if len(present) else None,
+        memory_bytes=int(s.memory_usage(index=False, deep=True)),
+        bool_like=False,
+    )
+
+
+def _hint(s, stats):
+    if stats['null_count'] == len(s):
+        return 'empty'
+    if pd.api.types.is_bool_dtype(s) or stats['bool_like']:
+        return 'bool'
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return 'datetime'
+    if pd.api.types.is_numeric_dtype(s):
+        return 'numeric'
+    if isinstance(s.dtype, pd.CategoricalDtype) or stats['distinct'] / len(s) < 0.1:
+        return 'category'
+    return 'text'
+
+
+def profile_column(name, s):
+    """Profile a single column in one vectorized pass."""
+    if pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s) or isinstance(s.dtype, pd.CategoricalDtype):
+        stats = _profile_object_column(name, s)
+    elif pd.api.types.is_numeric_dtype(s):
+        stats = _profile_numeric_column(name, s)
+    else:
+        stats = _profile_other_column(name, s)
+
+    return ColumnProfile(name=name, dtype=str(s.dtype), count=len(s), hint=_hint(s, stats), **stats)
+
+
+def profile_dataframe(df):
+    """
+    Build a DataProfile with null counts, distinct counts, min/max, memory
+    footprint and dtype hints for every column of `df`.
+    """
+    profile = DataProfile(rows=len(df), index_memory_bytes=int(df.index.memory_usage()))
+    for col in df.columns:
+        profile.columns[col] = profile_column(col, df[col])
+
+    logging.info(f"[profile_dataframe] Profiled {len(df)} rows x {len(df.columns)} columns")
+    return profile
@@ -0,0 +1,121 @@
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.config import OUTLIER_METHOD, STRING_CATEGORY_RATIO
+from data_types import fix_data_types, identify_columns, column_conversion
+from data_cleaning import normalize_text_columns, remove_duplicates, handle_missing_values
+from memory import optimize_memory
+from outliers import outlier_bounds, numeric_columns
+
+RECIPE_VERSION = 1
+
+
+def _plain(value):
+    """JSON-friendly scalar: NumPy scalars as Python ones, timestamps as ISO strings."""
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class Recipe:
+    """
+    The decisions the cleaning stages infer from a dataset, fitted once so
+    other files with the same schema are cleaned in transform-only mode:
+    - conversions: column -> target type (and datetime formats) chosen by fix_data_types
+    - drop: columns handle_missing_values dropped for missing values
+    - fill_values: column -> value imputed into numeric (median),
+      categorical (mode) and datetime (median) columns
+    - bounds: column -> [lower, upper] handle_outliers clips numeric columns to
+
+    Applied through the regular pipeline as stage parameters, so transform
+    mode runs the same stages, minus inference:
+
+        recipe = Recipe.fit(load_data('sample.csv'))
+        recipe.save('recipe.json')
+        IN_MEMORY_PIPELINE.run(context, ['cleaned_file'], params=Recipe.load('recipe.json').stage_params())
+    """
+
+    def __init__(self, conversions=None, drop=None, fill_values=None, outlier_method=OUTLIER_METHOD, bounds=None):
+        self.conversions = conversions or {}
+        self.drop = drop or []
+        self.fill_values = fill_values or {}
+        self.outlier_method = outlier_method
+        self.bounds = bounds or {}
+
+    @classmethod
+    def fit(cls, df, col_drop_thresh=0.5, outlier_method=OUTLIER_METHOD, category_ratio=STRING_CATEGORY_RATIO,
+            **outlier_params):
+        """
+        Run the cleaning stages on `df` (raw data, as load_data returns it)
+        up to outlier detection, recording their decisions. Fill values and
+        outlier bounds are computed for every column, not only the ones that
+        needed them in `df`, since other files may.
+        """
+        df_typed, type_log = fix_data_types(df)
+        conversions = {entry['column']: column_conversion(entry['column'], df[entry['column']], entry)
+                       for entry in type_log}
+        columns_dtype = identify_columns(df_typed)
+        # Columns read as numbers stay numeric in files where some values are not
+        conversions.update({col: {'to': 'numeric'} for col in columns_dtype['numerical'] if col not in conversions})
+        cleaned = normalize_text_columns(df_typed, columns_dtype['others'], category_ratio)
+        cleaned, _ = optimize_memory(cleaned, columns_dtype['others'], category_ratio)
+        cleaned, _ = remove_duplicates(cleaned)
+        cleaned, missing_log = handle_missing_values(cleaned, columns_dtype['numerical'],
+                                                     columns_dtype['categorical'], columns_dtype['datetime'],
+                                                     col_drop_thresh=col_drop_thresh)
+
+        drop = [entry['column'] for entry in missing_log if entry['action'] == 'dropped']
+        fill_values = {}
+        for col in columns_dtype['numerical'] + columns_dtype['datetime']:
+            if col in cleaned.columns and cleaned[col].notna().any():
+                fill_values[col] = _plain(cleaned[col].median())
+        for col in columns_dtype['categorical']:
+            if col in cleaned.columns:
+                mode = cleaned[col].mode()
+                fill_values[col] = _plain(mode.iloc[0]) if len(mode) else 'Unknown'
+
+        columns = numeric_columns(cleaned)
+        bounds = {}
+        if columns:
+            fitted = outlier_bounds(cleaned[columns], outlier_method, **outlier_params)
+            bounds = {col: [float(row.lower), float(row.upper)] for col, row in fitted.iterrows()
+                      if np.isfinite(row.lower) and np.isfinite(row.upper)}
+
+        logging.info(f"[recipe] Fitted {len(conversions)} conversions, {len(drop)} dropped columns, "
+                     f"{len(fill_values)} fill values and {len(bounds)} outlier bounds")
+        return cls(conversions, drop, fill_values, outlier_method, bounds)
+
+    def stage_params(self):
+        """Per-stage parameters (see Pipeline.run) applying the recipe."""
+        return {
+            'fix_data_types': {'conversions': self.conversions},
+            'handle_missing_values': {'drop': self.drop, 'fill_values': self.fill_values},
+            'handle_outliers': {'method': self.outlier_method, 'bounds': self.bounds},
+        }
+
+    def to_dict(self):
+        return {
+            'version': RECIPE_VERSION,
+            'conversions': self.conversions,
+            'drop': self.drop,
+            'fill_values': self.fill_values,
+            'outlier_method': self.outlier_method,
+            'bounds': self.bounds,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != RECIPE_VERSION:
+            raise ValueError(f"Unsupported recipe version {data.get('version')}")
+        return cls(data['conversions'], data['drop'], data['fill_values'], data['outlier_method'], data['bounds'])
+
+    def save(self, path):
+        Path(path).write_text(json.dumps(self.to_dict(), indent=2), encoding='utf-8')
+
+    @classmethod
+    def load(cls, path):
+        return cls.from_dict(json.loads(Path(path).read_text(encoding='utf-8')))
@@ -1,9 +1,187 @@
-from utils.config import OUTPUT_FOLDER
+from utils.config import OUTPUT_FOLDER, CLEANED_DATA_FORMAT, OUTPUT_CHUNK_ROWS
+from pathlib import Path
+import pandas as pd
 import logging
 
-def save_cleaned_data(df, filename='cleaned_data.csv'):
-    cleaned_path = OUTPUT_FOLDER / filename
-    df.to_csv(cleaned_path, index=False)
-    logging.info(f"Saved cleaned dataset to {cleaned_path}")
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # columnar outputs are optional
+    pa = pq = None
 
-    return filename
\ No newline at end of file
+# Output format -> (file extension, default compression)
+OUTPUT_FORMATS = {
+    'csv': ('.csv', None),
+    'parquet': ('.parquet', 'snappy'),
+    'feather': ('.feather', 'lz4'),
+    'arrow': ('.arrow', None),
+}
+
+# Codecs each output format can be written with ('uncompressed' for none)
+COMPRESSIONS = {
+    'csv': set(),
+    'parquet': {'snappy', 'gzip', 'brotli', 'zstd', 'lz4', 'uncompressed'},
+    'feather': {'lz4', 'zstd', 'uncompressed'},
+    'arrow': {'lz4', 'zstd', 'uncompressed'},
+}
+
+def output_format(filename):
+    """Output format of a cleaned file, from its extension (None if unknown)."""
+    suffix = Path(filename).suffix.lower()
+    for fmt, (ext, _) in OUTPUT_FORMATS.items():
+        if ext == suffix:
+            return fmt
+    return None
+
+def with_format(filename, fmt):
+    """`filename` with the extension of output format `fmt`."""
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {fmt}")
+    return Path(filename).stem + OUTPUT_FORMATS[fmt][0]
+
+# pandas.api.types.infer_dtype results of object columns Arrow cannot fit into one type
+MIXED_DTYPES = {'mixed', 'mixed-integer'}
+
+def _uniform_object_columns(df):
+    """
+    `df` with object columns mixing value types (e.g. [1, 'a', None], as left
+    when normalize_text_columns is skipped) converted to strings, keeping
+    missing values missing, so every column has a single Arrow type.
+    """
+    mixed = [col for col in df.columns
+             if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) in MIXED_DTYPES]
+    if not mixed:
+        return df
+    logging.info(f"Writing mixed-type columns {mixed} as text")
+    df = df.copy(deep=False)
+    for col in mixed:
+        df[col] = df[col].astype(str).where(df[col].notna())
+    return df
+
+def _to_arrow_batches(df, chunk_rows):
+    df = _uniform_object_columns(df)
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield pa.RecordBatch.from_pandas(df.iloc[start:start + chunk_rows], schema=schema, preserve_index=False)
+
+def save_cleaned_data(df, filename='cleaned_data.csv', fmt=None, compression=None, chunk_rows=OUTPUT_CHUNK_ROWS,
+                      output_dir=OUTPUT_FOLDER, check_quota=None):
+    """
+    Save the cleaned DataFrame to `output_dir` (a job's workspace, OUTPUT_FOLDER by default).
+
+    Parameters:
+    - filename (str): Output file name; its extension is replaced to match `fmt`.
+    - fmt (str): 'csv', 'parquet', 'feather' or 'arrow' (Arrow IPC file).
+      Defaults to the format of `filename`, then CLEANED_DATA_FORMAT.
+    - compression (str): Codec for columnar formats ('snappy', 'zstd', 'lz4',
+      'gzip', 'uncompressed'); each format has a sensible default.
+    - chunk_rows (int): Rows written per batch / row group, so large frames are
+      converted piece by piece instead of all at once.
+    - check_quota (callable): called after each chunk is written (e.g.
+      Workspace.check_quota); if it raises, the partial file is removed and
+      the error propagates.
+
+    Returns:
+    - str: name of the written file
+    """
+    fmt = fmt or output_format(filename) or CLEANED_DATA_FORMAT
+    filename = with_format(filename, fmt)
+    cleaned_path = Path(output_dir) / filename
+    compression = compression or OUTPUT_FORMATS[fmt][1]
+
+    try:
+        if fmt == 'csv':
+            with open(cleaned_path, 'w', encoding='utf-8', newline='') as f:
+                for start in range(0, max(len(df), 1), chunk_rows):
+                    df.iloc[start:start + chunk_rows].to_csv(f, index=False, header=start == 0)
+                    if check_quota is not None:
+                        f.flush()
+                        check_quota()
+        else:
+            _save_columnar(df, cleaned_path, fmt, compression, chunk_rows, check_quota)
+    except Exception:
+        cleaned_path.unlink(missing_ok=True)
+        raise
+
+    logging.info(f"Saved cleaned dataset to {cleaned_path} ({fmt}, compression={compression})")
+
+    return filename
+
+def _save_columnar(df, cleaned_path, fmt, compression, chunk_rows, check_quota):
+    if pa is None:
+        msg = f"pyarrow is required to write {fmt} files"
+        logging.error(msg)
+        raise ValueError(msg)
+    if compression == 'uncompressed':
+        compression = None
+
+    try:
+        batches = _to_arrow_batches(df, chunk_rows)
+        first = next(batches)
+        if fmt == 'parquet':
+            writer = pq.ParquetWriter(cleaned_path, first.schema, compression=compression or 'none')
+        else:
+            # Feather V2 is the Arrow IPC file format
+            writer = pa.ipc.new_file(cleaned_path, first.schema,
+                                     options=pa.ipc.IpcWriteOptions(compression=compression))
+        with writer:
+            for batch in (first, *batches):
+                writer.write_batch(batch)
+                if check_quota is not None:
+                    check_quota()
+    except (pa.ArrowException, ValueError, TypeError) as e:
+        logging.error(f"Could not write {fmt} file {cleaned_path}: {e}")
+        raise ValueError(f"Could not write {fmt} file: {e}")
+
+def load_cleaned_data(path):
+    """Read back a file written by save_cleaned_data."""
+    fmt = output_format(path)
+    if fmt == 'csv':
+        return pd.read_csv(path)
+    if fmt is None:
+        raise ValueError(f"Unknown cleaned data format: {path}")
+    if pa is None:
+        raise ValueError(f"pyarrow is required to read {fmt} files")
+    if fmt == 'parquet':
+        return pd.read_parquet(path)
+    if fmt == 'feather':
+        return pd.read_feather(path)
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).read_pandas()
+
+def converted_name(filename, fmt, compression=None):
+    """
+    Name of `filename` converted to output format `fmt` with `compression`:
+    a codec other than the format's default is part of the name
+    ('cleaned.zstd.parquet'), so each codec gets its own file. Raises
+    ValueError for codecs the format can't be written with.
+    """
+    name = with_format(filename, fmt)
+    default = OUTPUT_FORMATS[fmt][1] or 'uncompressed'
+    if compression is None or compression == default:
+        return name
+    if compression not in COMPRESSIONS[fmt]:
+        raise ValueError(f"Unsupported compression for {fmt}: {compression}, "
+                         f"expected one of {sorted(COMPRESSIONS[fmt])}")
+    return f"{Path(name).stem}.{compression}{Path(name).suffix}"
+
+def convert_cleaned_data(filename, fmt, compression=None, output_dir=OUTPUT_FOLDER, check_quota=None):
+    """
+    Return the name of `filename` (in `output_dir`) in output format `fmt`
+    and `compression` (see converted_name), converting it once if needed;
+    later requests reuse the converted file while it is newer than the
+    source. `check_quota` is passed to save_cleaned_data.
+    """
+    source = Path(output_dir) / filename
+    target_name = converted_name(filename, fmt, compression)
+    target = Path(output_dir) / target_name
+
+    if target_name == filename:
+        return filename
+    if target.exists() and target.stat().st_mtime >= source.stat().st_mtime:
+        return target_name
+
+    df = load_cleaned_data(source)
+    save_cleaned_data(df, target_name, fmt=fmt, compression=compression, output_dir=output_dir,
+                      check_quota=check_quota)
+    return target_name
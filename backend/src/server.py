@@ -0,0 +1,315 @@
+import os
+import logging
+from functools import partial
+from flask import Flask, Response, request, jsonify, send_from_directory, render_template, send_file
+from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
+from flask_cors import CORS
+
+from utils.config import (
+    OUTPUT_FOLDER,
+    FRONTEND_DIR,
+    WORKSPACE_FOLDER,
+    APPEND_STATE_FOLDER,
+    EXCEL_CACHE_FOLDER,
+    MAX_REQUEST_BYTES,
+    CLEANED_DATA_FORMAT
+)
+from utils.helper import allowed_file, enable_copy_on_write
+from pipeline import select_pipeline, parse_options, options_key, PREVIEW_PIPELINE
+from jobs import JobManager, JobQueueFull
+from cache import ResultCache
+from workspace import WorkspaceManager, DiskQuotaExceeded
+from ingest import receive_upload, receive_sample, UploadError
+from reporting import convert_cleaned_data, with_format, OUTPUT_FORMATS
+from metrics import StageMetrics, REGISTRY, PROMETHEUS_CONTENT_TYPE
+
+def process_upload(source, file_ext, workspace, digest, output_format, options, metrics, progress, result_cache,
+                   state_folder=APPEND_STATE_FOLDER, excel_cache_folder=EXCEL_CACHE_FOLDER):
+    """
+    Run the pipeline engine on an upload and return the result payload.
+    `source` holds the upload as its initial 'filepath' artifact: the file
+    saved to the workspace, or a BytesIO of an upload kept in memory. It is
+    parsed here, after the cache lookup, so a repeated upload is never parsed.
+    Every artifact is written to the job's `workspace`, whose disk quota is
+    checked before each stage, by the writers of the cleaned file after each
+    chunk, and once the pipeline is done. Results are
+    stored in `result_cache`; append-mode states are kept in `state_folder`
+    and parsed workbook sheets in `excel_cache_folder`.
+    """
+    job_id = workspace.job_id
+    cleaned_name = with_format(f"cleaned_data_{job_id}", output_format)
+    report_name = f"eda_report_{job_id}.html"
+    cache_key = f"{digest}-{output_format}-{options_key(options)}"
+    # An append-mode result depends on the dataset's earlier batches, so it is never cached
+    use_cache = 'dataset' not in source
+
+    if use_cache:
+        with metrics.stage('cache_lookup', progress=progress):
+            cached = result_cache.get(cache_key, workspace.path,
+                                      {'cleaned_file': cleaned_name, 'eda_report': report_name})
+        if cached is not None:
+            workspace.check_quota()
+            return dict(cached, cached=True, stage_metrics=metrics.report())
+
+    def checked_progress(stage_name):
+        workspace.check_quota()
+        progress(stage_name)
+
+    pipeline = select_pipeline(source, file_ext)
+    try:
+        context = pipeline.run(dict(source, cleaned_name=cleaned_name, report_name=report_name,
+                                    file_ext=file_ext, digest=digest, output_dir=workspace.path,
+                                    state_folder=state_folder, excel_cache_folder=excel_cache_folder,
+                                    check_quota=workspace.check_quota),
+                               options['outputs'], skip=options['skip'], params=options['params'],
+                               progress=checked_progress, metrics=metrics)
+        workspace.check_quota()
+    except DiskQuotaExceeded:
+        # Nothing of a job over its quota is kept
+        workspace.remove()
+        raise
+
+    logging.info(f"Pipeline '{pipeline.name}' completed.")
+
+    result = {
+        'message': 'File processed successfully',
+        'overview': context.get('overview'),
+        'log_report': context['log_report'],
+        'stage_metrics': metrics.report(),
+        'memory_report': context.get('memory_report'),
+        'cleaned_file': context.get('cleaned_file'),
+        'eda_report': context.get('eda_report')
+    }
+    if use_cache:
+        result_cache.put(cache_key, result, {
+            field: workspace.path / result[field] for field in ('cleaned_file', 'eda_report') if result[field]
+        })
+    return result
+
+
+def create_app(workspace_root=WORKSPACE_FOLDER, cache_folder=OUTPUT_FOLDER / 'cache',
+               state_folder=APPEND_STATE_FOLDER, excel_cache_folder=EXCEL_CACHE_FOLDER, frontend_dir=FRONTEND_DIR):
+    """
+    The Flask app with every route, shared by the entry points (main.py for
+    a local server, api/index.py for Vercel), which only choose where jobs
+    write: `workspace_root` holds the per-job workspaces, `cache_folder` the
+    result cache, `state_folder` the append-mode states and
+    `excel_cache_folder` the parsed workbook sheets.
+    """
+    enable_copy_on_write()
+    app = Flask(
+        __name__,
+        template_folder=str(frontend_dir / 'templates'),
+        static_folder=str(frontend_dir / 'static')
+    )
+    CORS(app)
+    # Per-file limits are enforced while the upload is read (see ingest.receive_upload)
+    app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
+
+    jobs = JobManager()
+    workspaces = WorkspaceManager(workspace_root, is_active=jobs.is_active)
+    workspaces.start()
+    result_cache = ResultCache(cache_folder)
+    run_upload = partial(process_upload, result_cache=result_cache, state_folder=state_folder,
+                         excel_cache_folder=excel_cache_folder)
+
+    @app.route('/')
+    def index():
+        return render_template('index.html')
+
+    @app.route('/upload', methods=['POST'])
+    def upload_file():
+        # Each job gets its own workspace directory for its upload and outputs
+        workspace = workspaces.create(jobs.new_job_id())
+        job_id = workspace.job_id
+        try:
+            # The body is read straight from the request stream (not request.files) and
+            # only hashed while it arrives; the job parses it (see ingest.receive_upload).
+            # `?keep_raw=1` also keeps the uploaded file in the job's workspace.
+            metrics = StageMetrics()
+            try:
+                with metrics.stage('receive_upload'):
+                    upload = receive_upload(request.stream, request.content_type, workspace.path, job_id,
+                                            allowed_file, keep_raw=request.args.get('keep_raw'),
+                                            content_length=request.content_length,
+                                            check_quota=workspace.check_quota)
+            except UploadError as e:
+                workspace.remove()
+                logging.error(f"Upload rejected: {e}")
+                return jsonify({'error': str(e)}), e.status
+
+            form = upload['fields']
+            output_format = form.get('format', CLEANED_DATA_FORMAT).lower()
+            if output_format not in OUTPUT_FORMATS:
+                workspace.remove()
+                logging.error(f"Output format not supported: {output_format}")
+                return jsonify({'error': f'Output format not supported: {output_format}'}), 400
+            try:
+                options = parse_options(form.get('outputs'), form.get('skip'), form.get('params'))
+            except ValueError as e:
+                workspace.remove()
+                logging.error(f"Invalid pipeline options: {e}")
+                return jsonify({'error': str(e)}), 400
+            if form.get('sheet'):
+                # Workbook sheet to load, by name or position (also part of the cache key)
+                options['params'].setdefault('load_data', {})['sheet'] = form['sheet']
+
+            source = {'filepath': upload['data'] if upload['data'] is not None else upload['raw_path']}
+            if form.get('dataset'):
+                # Append mode: the upload is cleaned as the next batch of this dataset
+                source['dataset'] = secure_filename(form['dataset'])
+                if not source['dataset']:
+                    workspace.remove()
+                    logging.error(f"Invalid dataset name: {form['dataset']}")
+                    return jsonify({'error': f"Invalid dataset name: {form['dataset']}"}), 400
+            jobs.submit(run_upload, source, upload['file_ext'], workspace, upload['digest'], output_format, options,
+                        metrics, job_id=job_id)
+
+            response = {
+                'message': 'File queued for processing',
+                'job_id': job_id,
+                'status_url': f'/jobs/{job_id}'
+            }
+            if upload['raw_path'] is not None:
+                response['raw_file'] = os.path.basename(upload['raw_path'])
+            return jsonify(response), 202
+
+        except RequestEntityTooLarge as e:
+            workspace.remove()
+            logging.error(f"Upload rejected: {e}")
+            return jsonify({'error': 'File too large'}), 413
+        except JobQueueFull as e:
+            workspace.remove()
+            logging.error(str(e))
+            return jsonify({'error': str(e)}), 503
+        except Exception as e:
+            workspace.remove()
+            logging.exception(f"An error occurred during file upload: {e}")
+            return jsonify({'error': 'An unexpected error occurred'}), 500
+
+    @app.route('/preview', methods=['POST'])
+    def preview_file():
+        """
+        Instant preview of an upload, answered before (and without) any job: the
+        overview of a bounded sample (the first rows, or `sample=sample` for
+        random rows; see ingest.receive_sample) and the type conversions the
+        pipeline would make, in time independent of the file's size (files over
+        PREVIEW_MAX_BYTES are rejected; clients send a prefix of large CSVs).
+        """
+        metrics = StageMetrics()
+        try:
+            with metrics.stage('receive_sample') as st:
+                upload = receive_sample(request.stream, request.content_type, allowed_file)
+                st.output(upload['raw'])
+            context = PREVIEW_PIPELINE.run({'raw': upload['raw']}, ['overview', 'columns_dtype'], metrics=metrics)
+        except UploadError as e:
+            logging.error(f"Preview rejected: {e}")
+            return jsonify({'error': str(e)}), e.status
+        except RequestEntityTooLarge as e:
+            logging.error(f"Preview rejected: {e}")
+            return jsonify({'error': 'File too large'}), 413
+        except Exception as e:
+            logging.exception(f"An error occurred during preview: {e}")
+            return jsonify({'error': 'An unexpected error occurred'}), 500
+
+        return jsonify({
+            'filename': upload['filename'],
+            'sample': upload['sample'],
+            'overview': context['overview'],
+            'conversions': context['log_report'][0],
+            'stage_metrics': metrics.report()
+        }), 200
+
+    @app.route('/jobs/<job_id>', methods=['GET'])
+    def job_status(job_id):
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+
+        return jsonify({
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'current_stage': job['current_stage'],
+            'stages': job['stages'],
+            'error': job['error'],
+            'result_url': f'/jobs/{job_id}/result'
+        }), 200
+
+    @app.route('/jobs/<job_id>/result', methods=['GET'])
+    def job_result(job_id):
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        if job['status'] == 'failed':
+            return jsonify({'error': job['error']}), 500
+        if job['status'] != 'done':
+            return jsonify({'status': job['status'], 'current_stage': job['current_stage']}), 202
+
+        return jsonify(job['result']), 200
+
+    @app.route('/metrics', methods=['GET'])
+    def prometheus_metrics():
+        REGISTRY.set_gauge('pipeline_jobs_active', jobs.active_count(), 'Queued and running pipeline jobs.')
+        return Response(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    @app.route('/cache/stats', methods=['GET'])
+    def cache_stats():
+        return jsonify(result_cache.stats()), 200
+
+    @app.route('/workspaces/stats', methods=['GET'])
+    def workspace_stats():
+        return jsonify(workspaces.stats()), 200
+
+    @app.route('/download/<job_id>/<filename>', methods=['GET'])
+    def download_file(job_id, filename):
+        """
+        Download a job's cleaned file. `?format=csv|parquet|feather|arrow` (and
+        optional `&compression=`) serves it in another format, converted on first
+        request into the job's workspace; each codec gets its own converted file.
+        """
+        workspace = workspaces.get(job_id)
+        if workspace is None:
+            logging.error(f"Workspace not found for download: {job_id}")
+            return jsonify({'error': 'File not found'}), 404
+        try:
+            filename = secure_filename(filename)
+            requested_format = request.args.get('format')
+            if requested_format:
+                if requested_format not in OUTPUT_FORMATS:
+                    return jsonify({'error': f'Output format not supported: {requested_format}'}), 400
+                # A conversion outgrowing the quota is stopped and removed by save_cleaned_data
+                filename = convert_cleaned_data(filename, requested_format, request.args.get('compression'),
+                                                output_dir=workspace.path, check_quota=workspace.check_quota)
+            workspace.touch()
+            return send_from_directory(workspace.path, filename, as_attachment=True)
+        except DiskQuotaExceeded as e:
+            logging.error(f"Could not convert {filename}: {e}")
+            return jsonify({'error': str(e)}), 507
+        except ValueError as e:
+            logging.error(f"Could not convert {filename}: {e}")
+            return jsonify({'error': str(e)}), 400
+        except FileNotFoundError:
+            logging.error(f"File not found for download: {filename}")
+            return jsonify({'error': 'File not found'}), 404
+
+
+    @app.route('/eda/<job_id>/<filename>', methods=['GET'])
+    def serve_eda_report(job_id, filename):
+        try:
+            safe_filename = secure_filename(filename)
+            workspace = workspaces.get(job_id)
+            file_path = workspace.file(safe_filename) if workspace is not None else None
+
+            if file_path is None:
+                logging.error(f"EDA report not found: {job_id}/{safe_filename}")
+                return jsonify({'error': 'Report not found'}), 404
+
+            workspace.touch()
+            return send_file(file_path, mimetype='text/html')
+
+        except Exception as e:
+            logging.exception(f"Error serving EDA report: {e}")
+            return jsonify({'error': 'Internal server error'}), 500
+
+    return app
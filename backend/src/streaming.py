@@ -0,0 +1,525 @@
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from utils.config import (
+    OUTPUT_FOLDER,
+    CHUNK_SIZE,
+    QUANTILE_SAMPLE_SIZE,
+    MAX_TRACKED_CATEGORIES,
+    OUTLIER_METHOD,
+    TYPE_INFERENCE_SAMPLE_SIZE
+)
+from data_loader import load_data_in_chunks
+from data_types import BOOL_MAP
+from data_cleaning import normalize_text
+from datetime_inference import infer_datetime_formats, infer_epoch_unit, parse_datetimes
+from dedup import RowHashIndex
+from outliers import sample_bounds
+
+# =========================================
+#  Pass 1: per-column statistics
+# =========================================
+
+class _Reservoir:
+    """
+    Fixed-size uniform random sample of a stream of numbers (Algorithm R,
+    vectorized per batch). Used to estimate medians and quartiles without
+    holding the whole column in memory; exact while the column fits.
+    """
+
+    def __init__(self, size=QUANTILE_SAMPLE_SIZE, seed=0):
+        self.size = size
+        self.seen = 0
+        self.values = np.empty(0, dtype='float64')
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        free = self.size - len(self.values)
+        if free > 0:
+            self.values = np.concatenate([self.values, values[:free]])
+            self.seen += min(free, len(values))
+            values = values[free:]
+        if len(values) == 0:
+            return
+
+        positions = self.seen + np.arange(1, len(values) + 1)
+        accepted = self._rng.random(len(values)) < self.size / positions
+        slots = self._rng.integers(0, self.size, size=int(accepted.sum()))
+        self.values[slots] = values[accepted]
+        self.seen += len(values)
+
+    def quantile(self, q):
+        if len(self.values) == 0:
+            return np.nan
+        return float(np.quantile(self.values, q))
+
+    def state(self):
+        """JSON-serializable state, without `values` (kept as an array by the caller)."""
+        return {'size': self.size, 'seen': self.seen, 'rng': self._rng.bit_generator.state}
+
+    @classmethod
+    def from_state(cls, state, values):
+        reservoir = cls(state['size'])
+        reservoir.seen = state['seen']
+        reservoir.values = np.asarray(values, dtype='float64')
+        reservoir._rng.bit_generator.state = state['rng']
+        return reservoir
+
+
+def _blank_mask(s):
+    """Rows of a text column that are empty or whitespace only, checked once per distinct value."""
+    codes, uniques = pd.factorize(s)
+    blank = np.flatnonzero(pd.Series(uniques, dtype=object).str.strip().eq('').to_numpy())
+    return np.isin(codes, blank) if len(blank) else np.zeros(len(s), dtype=bool)
+
+
+class _ColumnAccumulator:
+    """
+    Collects the statistics of one column, chunk by chunk (values read as strings).
+
+    Once `kind` is set (append mode fixes it after the first batch with
+    values, see incremental.CleaningState), the column's type is no longer
+    inferred: only the statistics that type needs are updated, from the
+    values that convert to it.
+    """
+
+    # Attributes saved by `state()`, besides the two reservoirs
+    _STATE = ('name', 'kind', 'count', 'null_count', 'bool_like', 'true_false', 'numeric', 'numeric_01', 'integer',
+              'low', 'high', 'iso_date', 'any_date', 'date_checked', 'date_formats', 'value_counts', 'too_many_values')
+
+    def __init__(self, name=None, kind=None):
+        self.name = name
+        self.kind = kind
+        self.count = 0
+        self.null_count = 0
+        self.bool_like = True
+        self.true_false = True
+        self.numeric = True
+        self.numeric_01 = True
+        self.integer = True
+        self.low = None
+        self.high = None
+        self.iso_date = True
+        self.any_date = False
+        self.date_checked = False
+        self.date_formats = None
+        self.value_counts = {}
+        self.too_many_values = False
+        self.numbers = _Reservoir()
+        self.dates = _Reservoir()
+
+    def update(self, s):
+        self.count += len(s)
+        values = s.dropna()
+        blank = _blank_mask(values)
+        self.null_count += int(s.isna().sum() + blank.sum())
+        values = values[~blank]
+        if values.empty:
+            return
+        if self.kind is not None:
+            self._update_fitted(values)
+            return
+
+        self._count_values(values)
+
+        if self.bool_like:
+            lowered = set(values.str.lower().unique())
+            self.bool_like = lowered.issubset(BOOL_MAP)
+            self.true_false = self.true_false and lowered.issubset({'true', 'false'})
+
+        if self.numeric:
+            numbers = pd.to_numeric(values, errors='coerce')
+            self.numeric = bool(numbers.notna().all())
+            if self.numeric:
+                self.numbers.update(numbers.to_numpy())
+                self.numeric_01 = self.numeric_01 and bool(numbers.isin([0, 1]).all())
+                # Range and integrality, to recognize epoch timestamps (see infer_epoch_unit)
+                self.integer = self.integer and bool((numbers % 1 == 0).all())
+                low, high = float(numbers.min()), float(numbers.max())
+                self.low = low if self.low is None else min(self.low, low)
+                self.high = high if self.high is None else max(self.high, high)
+
+        if self.iso_date:
+            dates = pd.to_datetime(values, errors='coerce', format='%Y-%m-%d')
+            self.iso_date = bool(dates.notna().all())
+            if self.iso_date:
+                self.dates.update(dates.to_numpy().astype('int64'))
+
+        # Formats are inferred once, on a sample of the first chunk that isn't
+        # ISO, so non-date text columns are rejected without parsing them
+        if not (self.bool_like or self.numeric or self.iso_date) and (self.any_date or not self.date_checked):
+            if not self.date_checked:
+                sample = values.sample(n=min(len(values), TYPE_INFERENCE_SAMPLE_SIZE), random_state=0)
+                self.date_formats = infer_datetime_formats(sample, self.name)
+                self.date_checked = True
+            if self.date_formats is not None:
+                dates = parse_datetimes(values, self.date_formats).dropna()
+                self.any_date = self.any_date or not dates.empty
+                self.dates.update(dates.to_numpy().astype('int64'))
+
+    def _count_values(self, values):
+        if self.too_many_values:
+            return
+        for value, n in values.value_counts().items():
+            self.value_counts[value] = self.value_counts.get(value, 0) + int(n)
+        if len(self.value_counts) > MAX_TRACKED_CATEGORIES:
+            self.too_many_values = True
+            self.value_counts = {}
+
+    def _update_fitted(self, values):
+        if self.kind == 'numeric':
+            self.numbers.update(pd.to_numeric(values, errors='coerce').dropna().to_numpy())
+        elif self.kind == 'datetime':
+            dates = parse_datetimes(values, self.date_formats or ('%Y-%m-%d',)).dropna()
+            self.dates.update(dates.to_numpy().astype('int64'))
+        elif self.kind == 'category':
+            self._count_values(values)
+
+    def fix_kind(self, stats):
+        """Keep the type (and date formats) decided in `stats` for all later updates."""
+        self.kind = stats['type']
+        if self.kind == 'datetime':
+            self.date_formats = tuple(stats['format'])
+
+    def state(self):
+        """JSON-serializable state and the reservoir arrays ('numbers', 'dates')."""
+        state = {attr: getattr(self, attr) for attr in self._STATE}
+        state['numbers'], state['dates'] = self.numbers.state(), self.dates.state()
+        return state, {'numbers': self.numbers.values, 'dates': self.dates.values}
+
+    @classmethod
+    def from_state(cls, state, arrays):
+        acc = cls()
+        # States saved before an attribute was added keep its initial value
+        for attr in cls._STATE:
+            setattr(acc, attr, state.get(attr, getattr(acc, attr)))
+        if acc.date_formats is not None:
+            acc.date_formats = tuple(acc.date_formats)
+        acc.numbers = _Reservoir.from_state(state['numbers'], arrays['numbers'])
+        acc.dates = _Reservoir.from_state(state['dates'], arrays['dates'])
+        return acc
+
+    def _epoch_unit(self):
+        if not self.integer or self.low is None:
+            return None
+        return infer_epoch_unit(self.name, pd.Series([self.low, self.high]))
+
+    def _read_as(self):
+        """The dtype pandas' CSV reader gives the column, which its type is converted from."""
+        if self.count == self.null_count:
+            return 'float64'
+        if self.numeric:
+            return 'int64' if self.integer and self.null_count == 0 else 'float64'
+        if self.true_false and self.null_count == 0:
+            return 'bool'
+        return 'object'
+
+    def finalize(self):
+        """Decide the column type and the values the cleaning pass needs."""
+        epoch_unit = None
+        if self.kind is not None:
+            kind = self.kind
+        elif self.count == self.null_count:
+            kind = 'text'
+        elif self.bool_like:
+            kind = 'bool'
+        elif self.numeric:
+            # Integer timestamps become datetimes, as in data_types.fix_data_types
+            epoch_unit = None if self.numeric_01 else self._epoch_unit()
+            kind = 'bool' if self.numeric_01 else 'datetime' if epoch_unit else 'numeric'
+        elif self.iso_date or self.any_date:
+            kind = 'datetime'
+        elif not self.too_many_values and len(self.value_counts) / self.count < 0.1:
+            kind = 'category'
+        else:
+            kind = 'text'
+
+        stats = {
+            'type': kind,
+            'count': self.count,
+            'null_count': self.null_count,
+            'missing_ratio': self.null_count / self.count if self.count else 0.0,
+            'distinct': None if self.too_many_values else len(self.value_counts),
+            'read_as': self._read_as(),
+        }
+
+        if kind == 'numeric':
+            q1, median, q3 = (self.numbers.quantile(q) for q in (0.25, 0.5, 0.75))
+            stats.update({'median': median, 'q1': q1, 'q3': q3, 'sample': self.numbers.values})
+        elif kind == 'datetime' and epoch_unit is not None:
+            # Epoch timestamps were sampled as numbers
+            stats['median'] = pd.to_datetime(self.numbers.quantile(0.5), unit=epoch_unit[len('epoch_'):])
+            stats['format'] = (epoch_unit,)
+        elif kind == 'datetime':
+            median = self.dates.quantile(0.5)
+            stats['median'] = pd.Timestamp(int(median)) if not np.isnan(median) else pd.Timestamp('1970-01-01')
+            stats['format'] = ('%Y-%m-%d',) if self.iso_date else self.date_formats
+        elif kind == 'category':
+            if self.value_counts:
+                top = max(self.value_counts.values())
+                stats['mode'] = min(v for v, n in self.value_counts.items() if n == top)
+            else:
+                stats['mode'] = 'Unknown'
+
+        return stats
+
+
+def collect_column_stats(file_path, chunksize=CHUNK_SIZE):
+    """
+    First pass over a CSV file: infer each column's type and collect null counts,
+    medians/quartiles and modes, holding only one chunk in memory at a time.
+
+    Medians and quartiles are estimated from a bounded random sample of each
+    column (exact while the column has fewer than QUANTILE_SAMPLE_SIZE values),
+    and are computed on the raw rows, i.e. before deduplication.
+
+    Returns:
+    - dict: column name -> stats dict ('type', 'null_count', 'missing_ratio', ...)
+    """
+    accumulators = {}
+    rows = 0
+
+    for chunk in load_data_in_chunks(file_path, chunksize=chunksize, dtype=str):
+        rows += len(chunk)
+        for col in chunk.columns:
+            accumulators.setdefault(col, _ColumnAccumulator(col)).update(chunk[col])
+
+    stats = {col: acc.finalize() for col, acc in accumulators.items()}
+    logging.info(f"[collect_column_stats] Profiled {rows} rows x {len(stats)} columns from {file_path}")
+
+    return stats
+
+# =========================================
+#  Pass 2: chunk-wise cleaning
+# =========================================
+
+def plan_cleaning(stats, col_drop_thresh=0.5, outlier_method=OUTLIER_METHOD, drop=None):
+    """
+    Turn collected column statistics into the cleaning decisions applied to
+    every chunk, mirroring handle_missing_values / handle_outliers. Outlier
+    bounds come from the `outlier_method` detector run on each numeric
+    column's reservoir sample, an approximate quantile sketch of the column.
+    Columns with at least `col_drop_thresh` missing values are dropped,
+    unless the columns to drop are given as `drop`.
+
+    Returns:
+    - dict: 'drop' (list of columns), 'fill' (col -> value), 'clip' (col -> (lower, upper))
+    - Log: list of dict
+    """
+    plan = {'drop': [], 'fill': {}, 'clip': {}}
+    log = []
+
+    for col, st in stats.items():
+        if col in drop if drop is not None else st['missing_ratio'] >= col_drop_thresh:
+            plan['drop'].append(col)
+            logging.warning(f"Dropping column '{col}' with {st['missing_ratio']:.2%} missing values")
+            log.append({
+                'column': col,
+                'action': 'dropped',
+                'reason': f"{round(st['missing_ratio'] * 100, 2)}% missing"
+            })
+            continue
+
+        if st['type'] == 'numeric':
+            fill, method = st['median'], 'median'
+        elif st['type'] == 'datetime':
+            fill, method = st['median'], 'median'
+        elif st['type'] == 'category':
+            fill, method = st['mode'], 'mode'
+        else:
+            continue
+
+        if st['null_count'] > 0:
+            plan['fill'][col] = fill
+            log.append({
+                'column': col,
+                'action': 'imputed',
+                'method': method,
+                'value_used': str(fill) if st['type'] != 'numeric' else fill,
+                'missing_count': int(st['null_count'])
+            })
+
+    samples = {col: st['sample'] for col, st in stats.items()
+               if st['type'] == 'numeric' and col not in plan['drop']}
+    plan['clip'] = sample_bounds(samples, outlier_method)
+
+    return plan, log
+
+
+def convert_chunk(chunk, stats, drop=()):
+    """
+    Convert one chunk of raw (string) values to the column types in `stats`
+    and normalize text, dropping the columns in `drop`; missing values stay
+    missing.
+    """
+    chunk = chunk.drop(columns=[col for col in drop if col in chunk.columns])
+
+    for col in chunk.columns:
+        st = stats[col]
+        s = chunk[col].astype(object)
+        blank = _blank_mask(s)
+        if blank.any():
+            s = s.mask(blank)
+
+        if st['type'] == 'bool':
+            s = s.str.lower().map(BOOL_MAP).fillna(pd.to_numeric(s, errors='coerce').map({0: False, 1: True}))
+        elif st['type'] == 'numeric':
+            s = pd.to_numeric(s, errors='coerce')
+        elif st['type'] == 'datetime':
+            s = parse_datetimes(s, st['format'])
+        elif st['type'] == 'text':
+            s = normalize_text(s)
+
+        chunk[col] = s
+
+    return chunk
+
+
+def conversion_log(stats, read_as):
+    """
+    log_report entries of the columns whose type in `stats` differs from the
+    dtype they were read as (`read_as`: column -> dtype name), shaped like
+    those of data_types.fix_data_types. Category and text columns stay
+    strings, so they aren't converted.
+    """
+    log = []
+    for col, dtype in read_as.items():
+        kind, dtype = stats[col]['type'], pd.api.types.pandas_dtype(dtype)
+        numeric = pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+        if kind == 'bool' and not pd.api.types.is_bool_dtype(dtype):
+            action = 'converted numeric 0/1 to boolean' if numeric else 'converted to boolean'
+        elif kind == 'numeric' and not numeric:
+            action = 'converted from string to numeric'
+        elif kind == 'datetime' and numeric:
+            unit = 'milliseconds' if stats[col]['format'][0] == 'epoch_ms' else 'seconds'
+            action = f"converted from {unit} since epoch to datetime"
+        elif kind == 'datetime' and not pd.api.types.is_datetime64_any_dtype(dtype):
+            action = 'converted from string to datetime'
+        else:
+            continue
+        log.append({'column': col, 'from': str(dtype), 'to': kind, 'action': action})
+    return log
+
+
+def impute_chunk(chunk, stats, plan):
+    """Fill missing values and clip outliers of a converted chunk, as decided in `plan`."""
+    for col in chunk.columns:
+        s = chunk[col]
+        if col in plan['fill']:
+            s = s.fillna(plan['fill'][col])
+        if col in plan['clip']:
+            s = s.clip(*plan['clip'][col])
+        if stats[col]['type'] == 'text':
+            s = s.fillna('empty')
+        chunk[col] = s
+
+    return chunk
+
+
+def clean_chunk(chunk, stats, plan):
+    """
+    Apply the type conversions, text normalization, imputation and clipping
+    decided in `plan` to one chunk of raw (string) values.
+    """
+    return impute_chunk(convert_chunk(chunk, stats, plan['drop']), stats, plan)
+
+
+def _low_cardinality(st, max_levels):
+    """Whether a column is analysed as categorical: booleans, categories and text with few distinct values."""
+    if st['type'] in ('bool', 'category'):
+        return True
+    return st['type'] == 'text' and st['distinct'] is not None and 0 < st['distinct'] <= max_levels
+
+
+def clean_csv_in_chunks(file_path, filename='cleaned_data.csv', chunksize=CHUNK_SIZE, col_drop_thresh=0.5,
+                        outlier_method=OUTLIER_METHOD, associations=None, output_dir=OUTPUT_FOLDER, check_quota=None):
+    """
+    Out-of-core version of the cleaning pipeline for CSV files larger than RAM:
+    - Pass 1 collects per-column statistics (see collect_column_stats)
+    - Pass 2 converts types, normalizes text, removes duplicate rows, imputes
+      missing values and clips outliers chunk by chunk, appending each cleaned
+      chunk to the output file
+
+    Peak memory depends on `chunksize`, plus 8 bytes per distinct row for the
+    duplicate index. An optional `associations` accumulator (see
+    eda.associations) is updated with every cleaned chunk, so the report's
+    correlations cover the whole file. An optional `check_quota` callable
+    (e.g. Workspace.check_quota) is called after each chunk is appended, so
+    an output outgrowing the disk quota stops the pass at once.
+
+    Returns:
+    - str: cleaned file name (inside `output_dir`)
+    - dict: overview of the raw dataset, shaped like data_overview except
+      for 'duplicates_removed' (duplicate rows found after cleaning) in place
+      of 'duplicates' (raw duplicate rows), which would take another pass,
+      plus the 'rows' and 'missing_values' of the cleaned file under 'cleaned'
+    - list: log_report, one list of dicts per stage
+    """
+    stats = collect_column_stats(file_path, chunksize=chunksize)
+    plan, missing_log = plan_cleaning(stats, col_drop_thresh=col_drop_thresh, outlier_method=outlier_method)
+
+    cleaned_path = Path(output_dir) / filename
+    row_index = RowHashIndex()
+    rows_in = rows_out = 0
+    missing = None
+    if associations is not None:
+        # Cleaned text chunks are plain object columns whatever their cardinality,
+        # so the association columns come from the collected types
+        kept = [col for col in stats if col not in plan['drop']]
+        if associations.num_cols is None:
+            associations.num_cols = [col for col in kept if stats[col]['type'] == 'numeric']
+        if associations.cat_cols is None:
+            associations.cat_cols = [col for col in kept if _low_cardinality(stats[col], associations.max_levels)]
+
+    for i, chunk in enumerate(load_data_in_chunks(file_path, chunksize=chunksize, dtype=str)):
+        rows_in += len(chunk)
+        chunk = clean_chunk(chunk, stats, plan)
+
+        row_index.clear()
+        keep = ~row_index.duplicated(chunk)
+        chunk = chunk[keep]
+        row_index.take(keep)
+        row_index.remember(chunk)
+        rows_out += len(chunk)
+        missing = chunk.isna().sum() if missing is None else missing + chunk.isna().sum()
+        if associations is not None:
+            associations.update(chunk)
+
+        chunk.to_csv(cleaned_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        if check_quota is not None:
+            check_quota()
+
+    duplicates_removed = rows_in - rows_out
+    logging.info(f"[clean_csv_in_chunks] Wrote {rows_out} rows to {cleaned_path}, removed {duplicates_removed} duplicates")
+
+    type_log = conversion_log(stats, {col: st['read_as'] for col, st in stats.items()})
+    dedup_log = []
+    if duplicates_removed != 0:
+        dedup_log.append({
+            'action': 'remove_duplicates',
+            'duplicates_removed': duplicates_removed,
+            'original_row_count': rows_in,
+            'new_row_count': rows_out,
+            'message': f"Removed {duplicates_removed} duplicate rows."
+        })
+    outlier_log = [
+        {'column': col, 'method': outlier_method, 'lower_bound': lower, 'upper_bound': upper,
+         'action': f'Clipped to [{lower}, {upper}]'}
+        for col, (lower, upper) in plan['clip'].items()
+    ]
+
+    overview = {
+        "shape": {"rows": rows_in, "columns": len(stats)},
+        "dtypes": {col: st['type'] for col, st in stats.items()},
+        "missing_values": {col: st['null_count'] for col, st in stats.items()},
+        "duplicates_removed": int(duplicates_removed),
+        "cleaned": {
+            "rows": rows_out,
+            "missing_values": {} if missing is None else {col: int(n) for col, n in missing.items()},
+        },
+    }
+
+    return filename, overview, [type_log, dedup_log, missing_log, outlier_log]
@@ -12,7 +12,10 @@ UPLOAD_FOLDER = BACKEND_DIR / 'upload'
 OUTPUT_FOLDER = BACKEND_DIR / 'outputs'
 
 # Allowed dataset file types
-ALLOWED_EXTENSIONS = {".csv", ".xlsx", ".xls"}
+ALLOWED_EXTENSIONS = {".csv", ".xlsx", ".xls", ".jsonl", ".parquet"}
+TEXT_EXTENSIONS = {".csv", ".jsonl"}    # Formats that may also be uploaded compressed, e.g. data.csv.gz
+COMPRESSION_EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".zst": "zstd"}
+MAX_DECOMPRESSED_BYTES = 200 * 1024 * 1024  # Compressed uploads may not expand beyond this
 
 # Server settings
 APP_TITLE = "Automated Data Cleaning API"
@@ -20,6 +23,93 @@ APP_DESCRIPTION = "Backend service for uploading, cleaning, and analyzing datase
 APP_VERSION = "1.0.0"
 MAX_CONTENT_LENGTH = 20 * 1024 * 1024  # 20 MB
 
+# Streaming (out-of-core) cleaning
+STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024  # CSVs larger than this are cleaned chunk by chunk
+MAX_STREAMED_CSV_BYTES = 256 * 1024 * 1024    # Upload limit of those CSVs (other uploads: MAX_CONTENT_LENGTH)
+MAX_REQUEST_BYTES = MAX_STREAMED_CSV_BYTES + 1024 * 1024  # Whole request body, with form fields and multipart framing
+CHUNK_SIZE = 100_000                          # Rows per chunk in streaming mode
+QUANTILE_SAMPLE_SIZE = 100_000                # Reservoir size used to estimate medians/quartiles
+MAX_TRACKED_CATEGORIES = 100_000              # Distinct values tracked per column before giving up on modes
+
+# Append mode: cleaning state (types, medians, modes, bounds, row hashes) of datasets uploaded batch by batch
+APPEND_STATE_FOLDER = OUTPUT_FOLDER / 'states'
+
+# /preview: summary and proposed type conversions from a bounded sample of an upload
+PREVIEW_ROWS = 1_000                    # Rows in the sample (first rows, or a random sample)
+PREVIEW_MAX_ROWS = 10_000               # Largest sample a client may ask for
+PREVIEW_TIME_BUDGET_SECONDS = 0.3       # Reading a random sample stops after this long
+PREVIEW_MAX_BYTES = 8 * 1024 * 1024     # Largest file accepted (clients send a prefix of larger CSV / JSON Lines)
+
+# Type inference
+TYPE_INFERENCE_SAMPLE_SIZE = 1_000            # Values sampled per column to decide its target type
+DATETIME_MIN_SHARE = 0.5                      # Share of sampled values that must parse for a text column to become datetime
+DATETIME_MAX_FORMATS = 3                      # Formats combined for columns that mix several date formats
+# Inference parses values in Python and holds the GIL, so threads slow it down;
+# it stays serial until `run_benchmarks.py --parallel` shows processes gain
+TYPE_INFERENCE_WORKERS = 1                     # joblib n_jobs for fix_data_types
+TYPE_INFERENCE_BACKEND = 'processes'           # Pool used when TYPE_INFERENCE_WORKERS != 1
+DATETIME_FORMAT_CACHE_SIZE = 1_000            # Column names whose winning datetime formats are remembered
+
+# Outlier handling: detector ('iqr', 'zscore', 'mad' or 'percentile') and its parameters
+OUTLIER_METHOD = 'iqr'
+OUTLIER_PARAMS = {
+    'iqr': {'k': 1.5},
+    'zscore': {'threshold': 3.0},
+    'mad': {'threshold': 3.5},
+    'percentile': {'lower': 0.01, 'upper': 0.99},
+}
+
+# Memory optimization: text with fewer than this share of distinct values is stored as 'category'
+STRING_CATEGORY_RATIO = 0.5
+
+# EDA report
+EDA_SAMPLE_ROWS = 100_000    # Rows sampled for distributions and correlations (None = all rows)
+EDA_HISTOGRAM_BINS = 20
+EDA_TOP_VALUES = 10          # Values shown per categorical column / groups per box plot
+EDA_MAX_BOX_PAIRS = 12       # Numeric x categorical box-plot pairs in the report
+EDA_MAX_HEATMAP_COLUMNS = 30 # Numeric columns shown in the correlation heatmap
+
+# Association engine (Pearson for numeric pairs, Cramér's V for categorical pairs)
+ASSOC_TOP_K = 20                 # Strongest associations reported
+ASSOC_MAX_LEVELS = 50            # Categorical columns with more distinct values are skipped
+ASSOC_BATCH_CELLS = 5_000_000    # Cells combined at once when counting co-occurrences
+
+# Per-job peak memory budget for the cleaning pipeline (bytes, None = unlimited)
+MEMORY_BUDGET_BYTES = None
+
+# Upper bounds (seconds) of the per-stage latency histograms served at /metrics
+STAGE_LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Cleaned data output
+CLEANED_DATA_FORMAT = 'csv'    # Default output format: 'csv', 'parquet', 'feather' or 'arrow'
+OUTPUT_CHUNK_ROWS = 100_000    # Rows per write batch / Parquet row group
+
+# Excel ingestion: each parsed sheet is kept as a Feather file so re-runs skip the XML
+EXCEL_CACHE_FOLDER = OUTPUT_FOLDER / 'excel_cache'
+EXCEL_CACHE_MAX_BYTES = 1024 * 1024 * 1024   # Oldest converted sheets are deleted beyond this
+
+# Content-addressed result cache for repeated uploads
+UPLOAD_CHUNK_SIZE = 1024 * 1024          # Bytes read per chunk while saving and hashing an upload
+UPLOAD_INGESTION = 'stream'              # 'stream': keep uploads in memory for the job, 'disk': save them first
+CACHE_MAX_BYTES = 1024 * 1024 * 1024     # Cache size before least-recently-used entries are evicted
+CACHE_VERSION = '1'                      # Bump when pipeline output changes to invalidate old entries
+
+# Column-parallel execution of cleaning stages
+PARALLEL_WORKERS = -1             # joblib n_jobs: -1 = all cores, 1 = always serial
+PARALLEL_BACKEND = 'threads'      # 'threads' or 'processes'
+PARALLEL_MIN_CELLS = 1_000_000    # Frames with fewer rows x columns run serially
+
+# Background job queue for /upload
+JOB_WORKERS = 2                # Pipelines running at the same time
+MAX_PENDING_JOBS = 16          # Queued + running jobs before /upload answers 503
+JOB_RETENTION_SECONDS = 3600   # How long finished job results stay available for polling
+
+# Per-job workspaces: each job's upload and outputs live in WORKSPACE_FOLDER/<job_id>/
+WORKSPACE_FOLDER = OUTPUT_FOLDER / 'jobs'
+JOB_DISK_QUOTA_BYTES = 512 * 1024 * 1024        # Disk a job's workspace may use before the job fails
+WORKSPACE_TTL_SECONDS = JOB_RETENTION_SECONDS   # Unused workspaces are deleted after this long
+WORKSPACE_GC_INTERVAL_SECONDS = 300             # How often expired workspaces are looked for
+
 # CORS settings (for frontend integration)
 ALLOWED_ORIGINS = ["*"]  # Change to ["http://localhost:3000"] or your domain in production
 
@@ -1,7 +1,8 @@
 from pathlib import Path
-from utils.config import ALLOWED_EXTENSIONS
+from utils.config import ALLOWED_EXTENSIONS, TEXT_EXTENSIONS, COMPRESSION_EXTENSIONS
 import os
 import logging
+import pandas as pd
 
 def setup_logging(log_file_path='backend/outputs/pipeline.log'):
     os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
@@ -16,6 +17,42 @@ def setup_logging(log_file_path='backend/outputs/pipeline.log'):
     )
 
 
+def file_extension(filename):
+    """Lower-case extension of `filename`, keeping a compression suffix: 'sales.csv.gz' -> '.csv.gz'."""
+    suffixes = [suffix.lower() for suffix in Path(filename).suffixes]
+    if len(suffixes) > 1 and suffixes[-1] in COMPRESSION_EXTENSIONS:
+        return ''.join(suffixes[-2:])
+    return suffixes[-1] if suffixes else ''
+
+
+def split_extension(ext):
+    """File format and compression of an extension: '.csv.gz' -> ('.csv', 'gzip'), '.csv' -> ('.csv', None)."""
+    base, _, last = ext.rpartition('.')
+    if base and f'.{last}' in COMPRESSION_EXTENSIONS:
+        return base, COMPRESSION_EXTENSIONS[f'.{last}']
+    return ext, None
+
+
 def allowed_file(filename):
-    suffix = Path(filename).suffix.lower()
-    return suffix and suffix in ALLOWED_EXTENSIONS
+    fmt, compression = split_extension(file_extension(filename))
+    return fmt in ALLOWED_EXTENSIONS and (compression is None or fmt in TEXT_EXTENSIONS)
+
+
+def enable_copy_on_write():
+    """
+    Turn on pandas copy-on-write for the whole process (see working_copy).
+    Called once at startup by each entry point, never per job: pandas options
+    are global, so toggling them from job threads would race.
+    """
+    pd.set_option('mode.copy_on_write', True)
+
+
+def working_copy(df):
+    """
+    Copy of `df` for a cleaning stage to modify column by column.
+    Under pandas copy-on-write this is a shallow copy, so only the columns a
+    stage actually reassigns are materialized; otherwise a full deep copy.
+    """
+    if pd.options.mode.copy_on_write is True:
+        return df.copy(deep=False)
+    return df.copy()
@@ -0,0 +1,145 @@
+import os
+import re
+import time
+import shutil
+import logging
+import threading
+from pathlib import Path
+
+from utils.config import WORKSPACE_FOLDER, JOB_DISK_QUOTA_BYTES, WORKSPACE_TTL_SECONDS, WORKSPACE_GC_INTERVAL_SECONDS
+
+# Job ids are uuid4().hex (see JobManager.new_job_id); anything else never names a workspace
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class DiskQuotaExceeded(Exception):
+    """Raised when the files of a job's workspace outgrow JOB_DISK_QUOTA_BYTES."""
+
+
+class Workspace:
+    """
+    Scratch directory of one job, `<root>/<job_id>/`: its raw upload (when
+    kept), cleaned file, converted downloads and EDA report. Nothing outside
+    it is written on the job's behalf, so concurrent jobs never touch each
+    other's files.
+    """
+
+    def __init__(self, root, job_id, quota_bytes=JOB_DISK_QUOTA_BYTES):
+        self.job_id = job_id
+        self.path = Path(root) / job_id
+        self.quota_bytes = quota_bytes
+
+    def file(self, name):
+        """Path of the artifact `name`; None if it doesn't exist or would leave the workspace."""
+        if not name or Path(name).name != name:
+            return None
+        path = self.path / name
+        return path if path.is_file() else None
+
+    def usage(self):
+        """Bytes taken by the workspace's files."""
+        try:
+            return sum(entry.stat().st_size for entry in self.path.iterdir() if entry.is_file())
+        except FileNotFoundError:
+            return 0
+
+    def check_quota(self):
+        """Raise DiskQuotaExceeded if the workspace is over its quota."""
+        if self.quota_bytes is None:
+            return
+        used = self.usage()
+        if used > self.quota_bytes:
+            raise DiskQuotaExceeded(f"Job {self.job_id} uses {used} bytes of disk, "
+                                    f"over its {self.quota_bytes} byte quota")
+
+    def touch(self):
+        """Mark the workspace as used now, restarting its time to live."""
+        try:
+            os.utime(self.path)
+        except FileNotFoundError:
+            pass
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class WorkspaceManager:
+    """
+    Creates per-job workspaces under `root` and garbage-collects them: a
+    background thread deletes, every `interval` seconds, the workspaces not
+    used (created, written or downloaded from) for `ttl` seconds, except
+    those of jobs `is_active(job_id)` reports as queued or running.
+
+        workspaces = WorkspaceManager(is_active=jobs.is_active)
+        workspaces.start()
+        workspace = workspaces.create(job_id)
+    """
+
+    def __init__(self, root=WORKSPACE_FOLDER, ttl=WORKSPACE_TTL_SECONDS, quota_bytes=JOB_DISK_QUOTA_BYTES,
+                 interval=WORKSPACE_GC_INTERVAL_SECONDS, is_active=None):
+        self.root = Path(root)
+        self.ttl = ttl
+        self.quota_bytes = quota_bytes
+        self.interval = interval
+        self._is_active = is_active or (lambda job_id: False)
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def create(self, job_id):
+        workspace = Workspace(self.root, job_id, self.quota_bytes)
+        os.makedirs(workspace.path, exist_ok=True)
+        return workspace
+
+    def get(self, job_id):
+        """The workspace of `job_id`, or None if the id is malformed or its workspace is gone."""
+        if not JOB_ID_PATTERN.match(job_id or ''):
+            return None
+        workspace = Workspace(self.root, job_id, self.quota_bytes)
+        return workspace if workspace.path.is_dir() else None
+
+    def collect(self):
+        """Delete expired workspaces. Returns the number removed."""
+        with self._lock:
+            cutoff = time.time() - self.ttl
+            removed = 0
+            for entry in self.root.iterdir():
+                if not entry.is_dir() or not JOB_ID_PATTERN.match(entry.name) or self._is_active(entry.name):
+                    continue
+                try:
+                    last_used = max([entry.stat().st_mtime] + [f.stat().st_mtime for f in entry.iterdir()])
+                except FileNotFoundError:
+                    continue
+                if last_used < cutoff:
+                    shutil.rmtree(entry, ignore_errors=True)
+                    removed += 1
+            if removed:
+                logging.info(f"[workspace] Removed {removed} expired job workspaces")
+            return removed
+
+    def stats(self):
+        workspaces = [entry for entry in self.root.iterdir() if entry.is_dir() and JOB_ID_PATTERN.match(entry.name)]
+        return {
+            'workspaces': len(workspaces),
+            'bytes': sum(Workspace(self.root, entry.name).usage() for entry in workspaces),
+            'quota_bytes': self.quota_bytes,
+            'ttl_seconds': self.ttl,
+        }
+
+    def start(self):
+        """Start the background garbage collector (once)."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._collect_forever, name='workspace-gc', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _collect_forever(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.collect()
+            except Exception as e:
+                logging.exception(f"[workspace] Garbage collection failed: {e}")
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The backend modules import each other top-level, as when main.py is run from backend/src
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
@@ -0,0 +1,67 @@
+import io
+
+import pandas as pd
+import pytest
+
+from data_loader import load_data, load_sample
+
+pytest.importorskip('pyarrow')
+pytest.importorskip('openpyxl')
+
+
+@pytest.fixture
+def workbook():
+    buffer = io.BytesIO()
+    pd.DataFrame({'a': [1, 2, 3], 'b': ['x', 'y', 'z']}).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def test_sheets_are_cached_in_the_given_folder(tmp_path, workbook):
+    df = load_data(io.BytesIO(workbook), file_ext='.xlsx', excel_cache_folder=tmp_path / 'sheets')
+
+    assert df['a'].tolist() == [1, 2, 3]
+    assert len(list((tmp_path / 'sheets').glob('*.feather'))) == 1
+    pd.testing.assert_frame_equal(load_data(io.BytesIO(workbook), file_ext='.xlsx',
+                                            excel_cache_folder=tmp_path / 'sheets'), df)
+
+
+def test_unwritable_cache_folder_only_skips_the_cache(tmp_path, workbook):
+    (tmp_path / 'file').write_text('not a folder')
+
+    df = load_data(io.BytesIO(workbook), file_ext='.xlsx', excel_cache_folder=tmp_path / 'file' / 'sheets')
+
+    assert df['b'].tolist() == ['x', 'y', 'z']
+    assert list(tmp_path.iterdir()) == [tmp_path / 'file']
+
+
+@pytest.fixture
+def csv():
+    return pd.DataFrame({'n': range(100), 'tag': ['a', 'b'] * 50}).to_csv(index=False).encode()
+
+
+@pytest.mark.parametrize('method', ['head', 'sample'])
+@pytest.mark.parametrize('rows, complete', [(10, False), (99, False), (100, True), (500, True)])
+def test_samples_tell_whether_the_whole_file_was_read(csv, method, rows, complete):
+    sample, info = load_sample(io.BytesIO(csv), rows=rows, method=method, file_ext='.csv')
+
+    assert len(sample) == info['rows'] == min(rows, 100)
+    assert info['complete'] is (complete or method == 'sample')
+    assert info['rows_read'] == (min(rows, 100) if method == 'head' else 100)
+
+
+def test_random_samples_stopped_by_the_time_budget_are_incomplete(csv):
+    sample, info = load_sample(io.BytesIO(csv), rows=10, method='sample', time_budget=0, file_ext='.csv')
+
+    assert len(sample) == 10 and not info['complete']
+    assert sample['n'].is_monotonic_increasing
+
+
+@pytest.mark.parametrize('method', ['head', 'sample'])
+def test_truncated_files_drop_their_cut_line_and_are_never_complete(csv, method):
+    prefix = csv[:csv.index(b'\n50,') + 3]
+
+    sample, info = load_sample(io.BytesIO(prefix), rows=500, method=method, file_ext='.csv', truncated=True)
+
+    assert sample['n'].tolist() == list(range(50))
+    assert not info['complete']
+
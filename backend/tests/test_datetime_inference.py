@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from datetime_inference import FormatCache, infer_datetime_formats, infer_epoch_unit, parse_datetimes
+
+
+@pytest.mark.parametrize('values, formats', [
+    (['2024-01-31', '2024-02-01T10:30:00', '2024-03-05 08:00:00+02:00'], ('ISO8601',)),
+    (['31/01/2024', '01/02/2024', '15/03/2024'], ('%d/%m/%Y',)),
+    (['01/31/2024', '02/01/2024', '03/15/2024'], ('%m/%d/%Y',)),
+    (['31 Jan 2024', '1 Feb 2024'], ('%d %b %Y',)),
+])
+def test_formats_are_inferred_from_a_sample(values, formats):
+    assert infer_datetime_formats(pd.Series(values), cache=None) == formats
+
+
+def test_columns_mixing_formats_get_each_of_them():
+    s = pd.Series(['2024-01-31', '2024-02-01', '15/03/2024', '16/03/2024'])
+
+    formats = infer_datetime_formats(s, cache=None)
+    parsed = parse_datetimes(s, formats)
+
+    assert formats == ('ISO8601', '%d/%m/%Y')
+    assert parsed.tolist() == pd.to_datetime(['2024-01-31', '2024-02-01', '2024-03-15', '2024-03-16']).tolist()
+
+
+@pytest.mark.parametrize('values', [['north', 'south', 'east'], ['12', '7', '3.5'], [None, None]])
+def test_non_dates_are_rejected(values):
+    assert infer_datetime_formats(pd.Series(values, dtype=object), cache=None) is None
+
+
+def test_offsets_become_naive_utc_and_unparseable_values_nat():
+    parsed = parse_datetimes(pd.Series(['2024-01-01T12:00:00+02:00', 'soon', None]), ('ISO8601',))
+
+    assert parsed[0] == pd.Timestamp('2024-01-01 10:00:00')
+    assert parsed[1:].isna().all()
+
+
+def test_cached_formats_are_reused_only_while_they_parse_as_well():
+    cache = FormatCache()
+    infer_datetime_formats(pd.Series(['31/01/2024', '15/02/2024']), 'day', cache=cache)
+    assert cache.get('day') == ('%d/%m/%Y',)
+
+    # Same name, other format: a fresh search wins and replaces the cached formats
+    assert infer_datetime_formats(pd.Series(['2024-01-31', '2024-02-15']), 'day', cache=cache) == ('ISO8601',)
+    assert cache.get('day') == ('ISO8601',)
+
+
+def test_format_cache_drops_least_recently_used_columns():
+    cache = FormatCache(max_size=2)
+    cache.put('a', ('ISO8601',))
+    cache.put('b', ('ISO8601',))
+    cache.get('a')
+    cache.put('c', ('ISO8601',))
+
+    assert cache.get('b') is None and cache.get('a') is not None
+
+
+@pytest.mark.parametrize('col, values, unit', [
+    ('created_at', [1_700_000_000, 1_700_086_400], 'epoch_s'),
+    ('eventTime', [1_700_000_000_000, 1_700_086_400_000], 'epoch_ms'),
+    ('ts', [1_700_000_000.0, None], 'epoch_s'),
+    ('amount', [1_700_000_000, 1_700_086_400], None),
+    ('ts', [1_700_000_000.5, 1_700_086_400], None),
+    ('ts', [12, 13], None),
+    ('ts', [True, False], None),
+])
+def test_epoch_columns_need_a_timestamp_name_and_range(col, values, unit):
+    assert infer_epoch_unit(col, pd.Series(values)) == unit
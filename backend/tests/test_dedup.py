@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_cleaning import remove_duplicates
+from dedup import RowHashIndex
+from eda.eda import data_overview
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'a': [1, 2, 1, 3, 2, 1],
+        'b': ['x', 'y', 'x', 'z', 'y', 'w'],
+        'ts': pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04', '2024-01-01', '2024-01-06']),
+    })
+
+
+@pytest.mark.parametrize('keep', ['first', 'last', False])
+@pytest.mark.parametrize('subset', [None, ['a'], ['a', 'b']])
+def test_duplicated_matches_pandas(df, keep, subset):
+    expected = df.duplicated(subset=subset, keep=keep).to_numpy()
+
+    assert (RowHashIndex().duplicated(df, subset=subset, keep=keep) == expected).all()
+
+
+def test_overview_and_deduplication_share_the_index(df):
+    index = RowHashIndex()
+    overview = data_overview(df[['a', 'b']], row_index=index)
+
+    deduped, log = remove_duplicates(df[['a', 'b']], row_index=index)
+
+    assert overview['duplicates'] == 2
+    pd.testing.assert_frame_equal(deduped, df[['a', 'b']].drop_duplicates())
+    assert log[0]['duplicates_removed'] == 2
+    # The cached column hashes follow the rows that were kept
+    assert all(len(hashes) == len(deduped) for hashes in index._columns.values())
+
+
+def test_discarded_columns_are_rehashed(df):
+    index = RowHashIndex()
+    assert not index.duplicated(df[['b']]).all()
+
+    changed = df[['b']].assign(b='same')
+    index.discard('b')
+
+    assert index.duplicated(changed).sum() == len(df) - 1
+
+
+def test_keep_latest_ranks_rows_by_timestamp(df):
+    deduped, _ = remove_duplicates(df, subset=['a', 'b'], keep='latest', timestamp_col='ts')
+
+    expected = df.sort_values('ts', ascending=False).drop_duplicates(subset=['a', 'b'])
+    assert sorted(deduped['ts']) == sorted(expected['ts'])
+
+
+def test_remembered_rows_are_duplicates_of_later_batches(df, tmp_path):
+    index = RowHashIndex()
+    index.remember(df.iloc[:3], subset=['a', 'b'])
+    index.save(tmp_path / 'seen.npz')
+    loaded = RowHashIndex.load(tmp_path / 'seen.npz')
+
+    mask = loaded.duplicated(df.iloc[3:].reset_index(drop=True), subset=['a', 'b'])
+
+    # Row 4 repeats row 1 of the first batch; rows 3 and 5 are new
+    assert mask.tolist() == [False, True, False]
+    assert loaded.key_columns == ['a', 'b']
+    np.testing.assert_array_equal(loaded.seen, index.seen)
+
+
+def test_seen_rows_need_the_same_key_columns(df):
+    index = RowHashIndex()
+    index.remember(df)
+
+    with pytest.raises(ValueError, match='columns'):
+        index.duplicated(df, subset=['a'])
@@ -0,0 +1,75 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from incremental import CleaningState, clean_batch, state_path
+
+
+def batch(start, n=50):
+    rows = range(start, start + n)
+    return pd.DataFrame({
+        'id': list(rows),
+        'amount': [float(i % 10) if i % 7 else None for i in rows],
+        'city': [['north', 'south'][i % 2] for i in rows],
+        'day': [f'2024-01-{i % 28 + 1:02d}' for i in rows],
+    })
+
+
+def test_rows_of_earlier_batches_are_removed(tmp_path):
+    first, overview, _ = clean_batch(batch(0), 'sales', state_folder=tmp_path)
+    again = pd.concat([batch(40, 10), batch(50, 20)], ignore_index=True)
+
+    second, overview, log = clean_batch(again, 'sales', state_folder=tmp_path)
+
+    assert len(first) == 50 and second['id'].tolist() == list(range(50, 70))
+    assert overview['duplicates_removed'] == 10
+    assert overview['append'] == {'batches': 2, 'rows_in': 80, 'rows_out': 70}
+    assert log[1][0]['duplicates_removed'] == 10
+
+
+def test_later_batches_keep_the_first_types_and_statistics(tmp_path):
+    clean_batch(batch(0), 'sales', state_folder=tmp_path)
+    odd = batch(100, 10).assign(amount=['n/a'] + [5.0] * 9, day='not a date')
+
+    cleaned, overview, log = clean_batch(odd, 'sales', state_folder=tmp_path)
+
+    assert overview['dtypes']['amount'] == 'numeric' and overview['dtypes']['day'] == 'datetime'
+    assert pd.api.types.is_float_dtype(cleaned['amount']) and cleaned['amount'].notna().all()
+    assert pd.api.types.is_datetime64_any_dtype(cleaned['day'])
+    # Types were decided by the first batch, so none is converted again
+    assert log[0] == []
+
+
+def test_state_is_saved_per_dataset(tmp_path):
+    clean_batch(batch(0), 'sales', state_folder=tmp_path)
+
+    state = CleaningState.load(state_path('sales', tmp_path))
+
+    assert state.batches == 1 and state.rows_out == 50
+    assert state.columns['amount'].kind == 'numeric'
+    assert not state_path('other', tmp_path).exists()
+
+
+def test_states_saved_without_newer_statistics_still_load(tmp_path):
+    clean_batch(batch(0), 'sales', state_folder=tmp_path)
+    path = state_path('sales', tmp_path)
+    with np.load(path) as data:
+        arrays = dict(data)
+    meta = json.loads(arrays['meta'].item())
+    for column in meta['columns']:
+        for attr in ('true_false', 'integer', 'low', 'high'):
+            column.pop(attr)
+    arrays['meta'] = np.array(json.dumps(meta))
+    np.savez(path, **arrays)
+
+    cleaned, overview, _ = clean_batch(batch(50), 'sales', state_folder=tmp_path)
+
+    assert len(cleaned) == 50 and overview['append']['batches'] == 2
+
+
+@pytest.mark.parametrize('name', ['', '../sales', '.hidden', 'a/b'])
+def test_invalid_dataset_names_are_rejected(tmp_path, name):
+    with pytest.raises(ValueError, match='dataset name'):
+        state_path(name, tmp_path)
@@ -0,0 +1,104 @@
+import io
+
+import pandas as pd
+import pytest
+
+from ingest import UploadError, receive_sample, receive_upload
+
+BOUNDARY = 'test-boundary'
+CONTENT_TYPE = f'multipart/form-data; boundary={BOUNDARY}'
+CSV = b'a,b\n1,x\n2,y\n'
+
+
+def multipart(*parts, close=True):
+    body = b''
+    for name, value, filename in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename is not None else '')
+        body += f'--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n'.encode() + value + b'\r\n'
+    if close:
+        body += f'--{BOUNDARY}--\r\n'.encode()
+    return io.BytesIO(body)
+
+
+def receive(body, tmp_path, **kwargs):
+    return receive_upload(body, CONTENT_TYPE, tmp_path, 'job', lambda name: name.endswith('.csv'), **kwargs)
+
+
+def test_upload_is_kept_in_memory_and_not_parsed(tmp_path):
+    upload = receive(multipart(('format', b'parquet', None), ('file', CSV, 'data.csv')), tmp_path)
+
+    assert upload['fields'] == {'format': 'parquet'}
+    assert upload['file_ext'] == '.csv' and upload['size'] == len(CSV)
+    assert upload['raw_path'] is None and list(tmp_path.iterdir()) == []
+    assert pd.read_csv(upload['data'])['a'].tolist() == [1, 2]
+
+
+def test_keep_raw_field_persists_the_upload(tmp_path):
+    upload = receive(multipart(('keep_raw', b'1', None), ('file', CSV, 'data.csv')), tmp_path)
+
+    assert open(upload['raw_path'], 'rb').read() == CSV
+
+
+def test_disk_mode_saves_the_upload(tmp_path):
+    upload = receive(multipart(('file', CSV, 'data.csv')), tmp_path, mode='disk')
+
+    assert upload['data'] is None
+    assert open(upload['raw_path'], 'rb').read() == CSV
+
+
+@pytest.mark.parametrize('parts, message', [
+    ([('format', b'csv', None)], 'No file part'),
+    ([('file', CSV, '')], 'No selected file'),
+    ([('file', CSV, 'data.exe')], 'File type not allowed'),
+])
+def test_rejected_uploads(tmp_path, parts, message):
+    with pytest.raises(UploadError, match=message) as e:
+        receive(multipart(*parts), tmp_path)
+    assert e.value.status == 400
+
+
+@pytest.mark.parametrize('keep_raw', [False, True])
+def test_truncated_body_is_rejected(tmp_path, keep_raw):
+    with pytest.raises(UploadError, match='ended before') as e:
+        receive(multipart(('file', CSV, 'data.csv'), close=False), tmp_path, keep_raw=keep_raw)
+    assert e.value.status == 400
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_oversized_csv_is_rejected_and_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr('ingest.MAX_STREAMED_CSV_BYTES', 4)
+    monkeypatch.setattr('ingest.STREAMING_THRESHOLD_BYTES', 0)
+
+    with pytest.raises(UploadError) as e:
+        receive(multipart(('file', CSV, 'data.csv')), tmp_path, content_length=len(CSV))
+    assert e.value.status == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_non_multipart_request_is_rejected(tmp_path):
+    with pytest.raises(UploadError, match='multipart'):
+        receive_upload(io.BytesIO(CSV), 'text/csv', tmp_path, 'job', lambda name: True)
+
+
+def preview(*parts):
+    return receive_sample(multipart(*parts), CONTENT_TYPE, lambda name: name.endswith('.csv'))
+
+
+def test_preview_of_a_whole_file_is_complete():
+    upload = preview(('file', CSV, 'data.csv'))
+
+    assert upload['raw']['b'].tolist() == ['x', 'y']
+    assert upload['sample'] == {'method': 'head', 'rows': 2, 'rows_read': 2, 'complete': True}
+
+
+def test_preview_of_a_file_prefix_drops_the_cut_line():
+    upload = preview(('truncated', b'true', None), ('rows', b'10', None), ('file', CSV + b'3,z', 'data.csv'))
+
+    assert upload['raw']['a'].tolist() == [1, 2]
+    assert not upload['sample']['complete']
+
+
+@pytest.mark.parametrize('rows, message', [(b'many', 'Invalid sample size'), (b'0', 'between 1 and')])
+def test_preview_rejects_invalid_sample_sizes(rows, message):
+    with pytest.raises(UploadError, match=message):
+        preview(('rows', rows, None), ('file', CSV, 'data.csv'))
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from outliers import clip_outliers, outlier_bounds, sample_bounds
+
+
+def test_mad_leaves_columns_with_a_majority_value_untouched():
+    df = pd.DataFrame({'x': [0] * 60 + list(range(1, 41))})
+
+    clipped, log = clip_outliers(df, ['x'], method='mad')
+
+    assert clipped.empty and log == []
+    bounds = outlier_bounds(df[['x']], 'mad')
+    assert bounds.loc['x', 'lower'] == -np.inf and bounds.loc['x', 'upper'] == np.inf
+
+
+def test_mad_still_clips_spread_columns():
+    df = pd.DataFrame({'x': list(range(100)) + [10_000]})
+
+    clipped, log = clip_outliers(df, ['x'], method='mad')
+
+    assert log[0]['outliers_above'] == 1
+    assert clipped['x'].max() < 10_000
+
+
+def test_sample_bounds_skip_columns_without_finite_bounds():
+    bounds = sample_bounds({'flat': [5.0] * 10 + [1.0, 9.0], 'spread': list(range(20))}, 'mad')
+    assert list(bounds) == ['spread']
+
+
+@pytest.mark.parametrize('method', ['iqr', 'zscore', 'mad', 'percentile'])
+def test_detectors_handle_nullable_columns(method):
+    df = pd.DataFrame({'x': pd.array(list(range(50)) + [None, 1_000], dtype='Int64')})
+
+    clipped, log = clip_outliers(df, ['x'], method=method)
+
+    assert log and log[0]['outliers_above'] >= 1
+    assert clipped['x'].isna().sum() == 1
+
+
+@pytest.fixture
+def block():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({'a': rng.normal(0, 1, 500), 'b': rng.exponential(2, 500)})
+
+
+@pytest.mark.parametrize('method, expected', [
+    ('iqr', lambda s: (s.quantile(0.25) - 1.5 * (s.quantile(0.75) - s.quantile(0.25)),
+                       s.quantile(0.75) + 1.5 * (s.quantile(0.75) - s.quantile(0.25)))),
+    ('zscore', lambda s: (s.mean() - 3 * s.std(), s.mean() + 3 * s.std())),
+    ('mad', lambda s: (s.median() - 3.5 * 1.4826 * (s - s.median()).abs().median(),
+                       s.median() + 3.5 * 1.4826 * (s - s.median()).abs().median())),
+    ('percentile', lambda s: (s.quantile(0.01), s.quantile(0.99))),
+])
+def test_detectors_match_their_definition(block, method, expected):
+    bounds = outlier_bounds(block, method)
+
+    for col in block.columns:
+        assert bounds.loc[col].tolist() == pytest.approx(expected(block[col]))
+
+
+def test_detector_parameters_override_the_defaults(block):
+    narrow = outlier_bounds(block, 'iqr', k=0.5)
+    wide = outlier_bounds(block, 'iqr')
+
+    assert (narrow['upper'] < wide['upper']).all() and (narrow['lower'] > wide['lower']).all()
+
+
+def test_clipping_reports_counts_and_keeps_untouched_columns_out(block):
+    df = block.assign(flat=1.0)
+    df.loc[0, 'a'] = 100.0
+
+    clipped, log = clip_outliers(df, ['a', 'flat'], method='zscore')
+
+    assert list(clipped.columns) == ['a'] and clipped.loc[0, 'a'] == log[0]['upper_bound']
+    assert log[0]['outliers_above'] >= 1
+    assert log[0]['total_outliers'] == log[0]['outliers_below'] + log[0]['outliers_above']
+
+
+def test_fitted_bounds_replace_detection():
+    df = pd.DataFrame({'x': [1, 5, 10], 'y': [0.0, 0.5, 1.0]})
+
+    clipped, log = clip_outliers(df, ['x', 'y'], bounds={'x': (2, 8), 'y': (0.0, 1.0)})
+
+    assert clipped['x'].tolist() == [2.0, 5.0, 8.0] and 'y' not in clipped
+    assert log[0]['outliers_below'] == 1 and log[0]['outliers_above'] == 1
+
+
+def test_unknown_methods_are_rejected(block):
+    with pytest.raises(ValueError, match='Unknown outlier method'):
+        outlier_bounds(block, 'bogus')
@@ -0,0 +1,72 @@
+import io
+import json
+import re
+
+import pandas as pd
+import pytest
+
+from pipeline import STREAMING_PIPELINE, parse_options, run_cleaning_pipeline
+
+
+def params(**stages):
+    return json.dumps(stages)
+
+
+@pytest.mark.parametrize('stage_params', [
+    {'handle_outliers': {'method': 'bogus'}},
+    {'handle_outliers': {'method': 'zscore', 'k': 2}},
+    {'handle_outliers': {'method': 'iqr', 'k': 'wide'}},
+    {'handle_outliers': {'bogus': 1}},
+    {'handle_outliers': {'bounds': {'x': [0]}}},
+    {'clean_csv_in_chunks': {'outlier_method': 'bogus'}},
+    {'clean_csv_in_chunks': {'bogus': 1}},
+    {'clean_batch': {'outlier_method': 'bogus'}},
+])
+def test_invalid_stage_params_are_rejected(stage_params):
+    with pytest.raises(ValueError):
+        parse_options(params=params(**stage_params))
+
+
+def test_detector_params_reach_the_detector():
+    options = parse_options(params=params(handle_outliers={'method': 'percentile', 'lower': 0.1, 'upper': 0.9}))
+    df = pd.DataFrame({'x': [float(i) for i in range(100)]})
+
+    cleaned, _, _ = run_cleaning_pipeline(df, params=options['params'])
+
+    assert cleaned['x'].min() == pytest.approx(9.9) and cleaned['x'].max() == pytest.approx(89.1)
+
+
+def test_upload_with_invalid_params_is_a_bad_request(tmp_path):
+    from server import create_app
+
+    app = create_app(workspace_root=tmp_path / 'jobs', cache_folder=tmp_path / 'cache',
+                     state_folder=tmp_path / 'states', frontend_dir=tmp_path)
+    client = app.test_client()
+    data = {'params': params(handle_outliers={'method': 'bogus'}), 'file': (io.BytesIO(b'a\n1\n'), 'a.csv')}
+
+    response = client.post('/upload', data=data, content_type='multipart/form-data')
+
+    assert response.status_code == 400
+    assert 'bogus' in response.get_json()['error']
+    assert list((tmp_path / 'jobs').iterdir()) == []
+
+
+def test_streaming_report_covers_the_whole_file(tmp_path):
+    n = 1000
+    pd.DataFrame({
+        'day': pd.date_range('2020-01-01', periods=n, freq='h').strftime('%d/%m/%Y %H:%M'),
+        'flag': ['yes', 'no'] * (n // 2),
+        'amount': [float(i % 97) for i in range(n)],
+    }).to_csv(tmp_path / 'raw.csv', index=False)
+
+    context = STREAMING_PIPELINE.run(
+        {'filepath': tmp_path / 'raw.csv', 'cleaned_name': 'cleaned.csv', 'report_name': 'report.html',
+         'output_dir': tmp_path},
+        ['eda_report'], params={'load_preview': {'sample_rows': 100}})
+    html = (tmp_path / context['eda_report']).read_text(encoding='utf-8')
+    report = json.loads(re.search(r'const REPORT = (.*);', html).group(1))
+
+    assert report['rows'] == n and report['sampled_rows'] == 100 and report['sample'] == 'head'
+    assert not report['associations_sampled']
+    assert report['dtypes']['day'] == 'datetime64[ns]' and report['dtypes']['flag'] == 'boolean'
+    assert 'day' in report['univariate']['datetime']
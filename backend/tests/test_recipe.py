@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import batch
+from pipeline import IN_MEMORY_PIPELINE
+from recipe import Recipe
+from reporting import load_cleaned_data
+
+
+@pytest.fixture
+def sample():
+    rng = np.random.default_rng(0)
+    n = 200
+    return pd.DataFrame({
+        'day': pd.date_range('2021-03-01', periods=n, freq='D').strftime('%d/%m/%Y'),
+        'amount': rng.normal(100, 10, n).round(2),
+        'city': rng.choice(['Paris', 'Lyon', 'Nice'], n, p=[0.6, 0.3, 0.1]),
+        'notes': [None] * (n - 10) + ['x'] * 10,
+    })
+
+
+def _apply(recipe, df, tmp_path):
+    df.to_csv(tmp_path / 'incoming.csv', index=False)
+    context = IN_MEMORY_PIPELINE.run({'filepath': str(tmp_path / 'incoming.csv'), 'cleaned_name': 'cleaned.csv',
+                                      'output_dir': tmp_path}, ['cleaned_file'], params=recipe.stage_params())
+    return load_cleaned_data(tmp_path / context['cleaned_file'])
+
+
+def test_fit_records_the_stage_decisions(sample):
+    recipe = Recipe.fit(sample)
+
+    assert recipe.conversions['day']['to'] == 'datetime'
+    assert recipe.drop == ['notes']
+    assert recipe.fill_values['amount'] == pytest.approx(sample['amount'].median())
+    assert recipe.fill_values['city'] == 'Paris'
+    lower, upper = recipe.bounds['amount']
+    assert lower < sample['amount'].median() < upper
+
+
+def test_recipes_round_trip_through_json(sample, tmp_path):
+    recipe = Recipe.fit(sample)
+    recipe.save(tmp_path / 'recipe.json')
+
+    loaded = Recipe.load(tmp_path / 'recipe.json')
+
+    assert loaded.to_dict() == recipe.to_dict()
+
+
+def test_unknown_recipe_versions_are_rejected(sample):
+    data = dict(Recipe.fit(sample).to_dict(), version=99)
+
+    with pytest.raises(ValueError, match='Unsupported recipe version'):
+        Recipe.from_dict(data)
+
+
+def test_apply_reuses_the_fitted_decisions(sample, tmp_path):
+    recipe = Recipe.fit(sample)
+    incoming = pd.DataFrame({
+        'day': ['02/01/2022', '13/01/2022', None],
+        'amount': [1_000.0, None, 95.0],
+        'city': [None, 'Lyon', 'Lyon'],
+        'notes': ['a', 'b', 'c'],
+    })
+
+    cleaned = _apply(recipe, incoming, tmp_path)
+
+    assert 'notes' not in cleaned
+    # Day first, as fitted, even though '02/01/2022' alone reads either way
+    assert pd.Timestamp(cleaned['day'].iloc[0]) == pd.Timestamp('2022-01-02')
+    assert pd.Timestamp(cleaned['day'].iloc[2]) == pd.Timestamp(recipe.fill_values['day'])
+    # Fill values and bounds come from the sample, not from the incoming file
+    assert cleaned['amount'].iloc[0] == pytest.approx(recipe.bounds['amount'][1])
+    assert cleaned['amount'].iloc[1] == pytest.approx(recipe.fill_values['amount'])
+    assert cleaned['city'].iloc[0] == 'Paris'
+
+
+def test_batch_cli_fits_and_applies_a_recipe(sample, tmp_path):
+    incoming, out = tmp_path / 'incoming', tmp_path / 'cleaned'
+    incoming.mkdir()
+    sample.to_csv(tmp_path / 'sample.csv', index=False)
+    for i in range(2):
+        sample.iloc[i * 50:(i + 1) * 50].to_csv(incoming / f'part{i}.csv', index=False)
+
+    assert batch.main(['fit', str(tmp_path / 'sample.csv'), str(tmp_path / 'recipe.json')]) == 0
+    assert batch.main(['apply', str(tmp_path / 'recipe.json'), str(incoming), str(out), '--workers', '1',
+                       '--format', 'parquet']) == 0
+
+    assert sorted(path.name for path in out.iterdir()) == ['part0.parquet', 'part1.parquet']
+    assert 'notes' not in load_cleaned_data(out / 'part0.parquet')
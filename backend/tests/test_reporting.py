@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from reporting import save_cleaned_data, load_cleaned_data, convert_cleaned_data
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'feather', 'arrow'])
+def test_mixed_type_object_columns_are_written_as_text(tmp_path, fmt):
+    df = pd.DataFrame({
+        'mixed': [1, 'a', None, 2.5],
+        'flags': [True, 'no', np.nan, 'yes'],
+        'numbers': [1.0, 2.0, np.nan, 4.0],
+    })
+
+    filename = save_cleaned_data(df, 'cleaned.csv', fmt=fmt, chunk_rows=2, output_dir=tmp_path)
+    loaded = load_cleaned_data(tmp_path / filename)
+
+    assert loaded['mixed'].tolist()[:2] == ['1', 'a'] and loaded['mixed'].tolist()[3] == '2.5'
+    assert loaded['flags'].tolist()[:2] == ['True', 'no']
+    assert loaded[['mixed', 'flags']].iloc[2].isna().all()
+    pd.testing.assert_series_equal(loaded['numbers'], df['numbers'])
+    # The frame handed in is left as it was
+    assert df['mixed'].tolist()[:2] == [1, 'a']
+
+
+def test_conversions_with_different_codecs_are_kept_apart(tmp_path):
+    df = pd.DataFrame({'x': range(100), 'y': ['a', 'b'] * 50})
+    save_cleaned_data(df, 'cleaned.csv', output_dir=tmp_path)
+
+    default = convert_cleaned_data('cleaned.csv', 'parquet', output_dir=tmp_path)
+    zstd = convert_cleaned_data('cleaned.csv', 'parquet', 'zstd', output_dir=tmp_path)
+
+    assert default == 'cleaned.parquet' and zstd == 'cleaned.zstd.parquet'
+    assert pq.ParquetFile(tmp_path / default).metadata.row_group(0).column(0).compression == 'SNAPPY'
+    assert pq.ParquetFile(tmp_path / zstd).metadata.row_group(0).column(0).compression == 'ZSTD'
+    assert convert_cleaned_data('cleaned.csv', 'parquet', 'snappy', output_dir=tmp_path) == default
+    pd.testing.assert_frame_equal(load_cleaned_data(tmp_path / zstd), df)
+
+
+@pytest.mark.parametrize('fmt, compression', [('parquet', 'bogus'), ('feather', 'snappy'), ('csv', 'gzip'),
+                                              ('parquet', '../x')])
+def test_unsupported_codecs_are_rejected(tmp_path, fmt, compression):
+    save_cleaned_data(pd.DataFrame({'x': [1]}), 'cleaned.csv', output_dir=tmp_path)
+
+    with pytest.raises(ValueError, match='Unsupported compression'):
+        convert_cleaned_data('cleaned.csv', fmt, compression, output_dir=tmp_path)
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from data_types import fix_data_types
+from eda.associations import AssociationAccumulator
+from streaming import clean_csv_in_chunks, convert_chunk
+
+
+def mixed_frame(n=300):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'ts': 1_600_000_000 + rng.integers(0, 10**6, n),
+        'amount': rng.normal(100, 10, n).round(2),
+        'flag': rng.choice(['yes', 'no'], n),
+        'count01': rng.choice([0, 1], n),
+        'day': pd.date_range('2020-01-01', periods=n).strftime('%d/%m/%Y'),
+        'id': [f'x{i}' for i in range(n)],
+    })
+
+
+def test_streaming_types_match_in_memory(tmp_path):
+    mixed_frame().to_csv(tmp_path / 'raw.csv', index=False)
+
+    name, overview, log = clean_csv_in_chunks(tmp_path / 'raw.csv', filename='out.csv', chunksize=50,
+                                              output_dir=tmp_path)
+    fixed, fixed_log = fix_data_types(pd.read_csv(tmp_path / 'raw.csv'))
+
+    assert overview['dtypes'] == {'ts': 'datetime', 'amount': 'numeric', 'flag': 'bool', 'count01': 'bool',
+                                  'day': 'datetime', 'id': 'text'}
+    assert pd.api.types.is_datetime64_any_dtype(fixed['ts'])
+    # Only real conversions are logged, from the type the column is read as
+    assert log[0] == fixed_log
+    assert log[0][0] == {'column': 'ts', 'from': 'int64', 'to': 'datetime',
+                         'action': 'converted from seconds since epoch to datetime'}
+    cleaned = pd.read_csv(tmp_path / name, parse_dates=['ts'])
+    assert cleaned['ts'].min() >= pd.Timestamp('2020-09-13')
+    assert not any(entry['column'] == 'ts' for entry in log[3])
+
+
+def test_epoch_needs_a_timestamp_name(tmp_path):
+    frame = mixed_frame().rename(columns={'ts': 'reading'})
+    frame.to_csv(tmp_path / 'raw.csv', index=False)
+
+    _, overview, log = clean_csv_in_chunks(tmp_path / 'raw.csv', filename='out.csv', chunksize=50,
+                                           output_dir=tmp_path)
+
+    assert overview['dtypes']['reading'] == 'numeric'
+    assert 'reading' not in [entry['column'] for entry in log[0]]
+
+
+def test_associations_cover_low_cardinality_text(tmp_path):
+    n = 100
+    pd.DataFrame({
+        'city': [f'c{i % 30}' for i in range(n)],
+        'region': [f'r{i % 30 // 10}' for i in range(n)],
+        'amount': [float(i) for i in range(n)],
+    }).to_csv(tmp_path / 'raw.csv', index=False)
+    associations = AssociationAccumulator()
+
+    _, overview, _ = clean_csv_in_chunks(tmp_path / 'raw.csv', filename='out.csv', chunksize=25,
+                                         associations=associations, output_dir=tmp_path)
+
+    assert overview['dtypes']['city'] == 'text'
+    assert associations.cat_cols == ['city', 'region'] and associations.num_cols == ['amount']
+    top = associations.top()
+    assert top[0] == {'columns': ['city', 'region'], 'method': 'cramers_v', 'value': 1.0}
+
+
+def test_blank_strings_are_missing_values():
+    chunk = pd.DataFrame({'city': ['a', ' ', '', None, '\t'], 'amount': ['1', '  ', '3', '4', '5']}, dtype=object)
+    stats = {'city': {'type': 'text'}, 'amount': {'type': 'numeric'}}
+
+    converted = convert_chunk(chunk, stats)
+
+    assert converted['city'].isna().tolist() == [False, True, True, True, True]
+    assert converted['amount'].isna().tolist() == [False, True, False, False, False]
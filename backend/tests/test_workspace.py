@@ -0,0 +1,108 @@
+import os
+import time
+import uuid
+
+import pandas as pd
+import pytest
+
+from reporting import save_cleaned_data
+from workspace import DiskQuotaExceeded, Workspace, WorkspaceManager
+
+
+def _job_id():
+    return uuid.uuid4().hex
+
+
+def _age(path, seconds):
+    """Backdate `path` and its files by `seconds`."""
+    then = time.time() - seconds
+    for entry in [path, *path.iterdir()]:
+        os.utime(entry, (then, then))
+
+
+def test_quota_is_checked_against_the_workspace_files(tmp_path):
+    workspace = WorkspaceManager(tmp_path, quota_bytes=100).create(_job_id())
+    (workspace.path / 'a.csv').write_bytes(b'x' * 60)
+    workspace.check_quota()
+
+    (workspace.path / 'b.csv').write_bytes(b'x' * 60)
+
+    assert workspace.usage() == 120
+    with pytest.raises(DiskQuotaExceeded, match='over its 100 byte quota'):
+        workspace.check_quota()
+
+
+def test_no_quota_means_no_limit(tmp_path):
+    workspace = WorkspaceManager(tmp_path, quota_bytes=None).create(_job_id())
+    (workspace.path / 'a.csv').write_bytes(b'x' * 10_000)
+
+    workspace.check_quota()
+
+
+def test_writers_stop_and_remove_the_partial_file_past_the_quota(tmp_path):
+    workspace = WorkspaceManager(tmp_path, quota_bytes=1_000).create(_job_id())
+    df = pd.DataFrame({'x': range(10_000)})
+
+    with pytest.raises(DiskQuotaExceeded):
+        save_cleaned_data(df, 'cleaned.csv', chunk_rows=100, output_dir=workspace.path,
+                          check_quota=workspace.check_quota)
+
+    assert list(workspace.path.iterdir()) == []
+
+
+def test_expired_workspaces_are_collected(tmp_path):
+    manager = WorkspaceManager(tmp_path, ttl=60)
+    old, fresh = manager.create(_job_id()), manager.create(_job_id())
+    (old.path / 'cleaned.csv').write_text('x\n1\n')
+    _age(old.path, 120)
+
+    assert manager.collect() == 1
+    assert not old.path.exists() and fresh.path.is_dir()
+    assert manager.get(old.job_id) is None and manager.get(fresh.job_id) is not None
+
+
+def test_recently_written_files_keep_a_workspace_alive(tmp_path):
+    manager = WorkspaceManager(tmp_path, ttl=60)
+    workspace = manager.create(_job_id())
+    (workspace.path / 'cleaned.csv').write_text('x\n1\n')
+    _age(workspace.path, 120)
+    (workspace.path / 'report.html').write_text('<html></html>')
+
+    assert manager.collect() == 0
+
+
+def test_touch_restarts_the_time_to_live(tmp_path):
+    manager = WorkspaceManager(tmp_path, ttl=60)
+    workspace = manager.create(_job_id())
+    _age(workspace.path, 120)
+
+    workspace.touch()
+
+    assert manager.collect() == 0
+
+
+def test_active_jobs_and_foreign_directories_are_never_collected(tmp_path):
+    active = _job_id()
+    manager = WorkspaceManager(tmp_path, ttl=60, is_active=lambda job_id: job_id == active)
+    workspace = manager.create(active)
+    foreign = tmp_path / 'not-a-job'
+    foreign.mkdir()
+    _age(workspace.path, 120)
+    _age(foreign, 120)
+
+    assert manager.collect() == 0
+    assert workspace.path.is_dir() and foreign.is_dir()
+
+
+@pytest.mark.parametrize('job_id', ['', '../etc', 'A' * 32, None])
+def test_malformed_job_ids_have_no_workspace(tmp_path, job_id):
+    assert WorkspaceManager(tmp_path).get(job_id) is None
+
+
+@pytest.mark.parametrize('name', ['../secret.csv', 'sub/cleaned.csv', '', 'missing.csv'])
+def test_files_outside_the_workspace_are_not_served(tmp_path, name):
+    workspace = Workspace(tmp_path, _job_id())
+    workspace.path.mkdir()
+    (tmp_path / 'secret.csv').write_text('x\n')
+
+    assert workspace.file(name) is None
@@ -10,6 +10,7 @@ document.getElementById('uploadBtn').addEventListener('click', async () => {
     const missingStats = document.getElementById("missingStats").innerHTML = '';
     const dtypeStats = document.getElementById("dtypeStats").innerHTML = '';
     const logContent = document.getElementById('logContent');
+    const progressText = document.getElementById('progress');
 
     // Reset state
     errorDiv.classList.add('hidden');
@@ -48,8 +49,11 @@ document.getElementById('uploadBtn').addEventListener('click', async () => {
             throw new Error(errorData.error || "Server error during file processing.");
         }
 
-        const result = await response.json();
+        // The upload is processed in the background: poll the job until it finishes
+        const job = await response.json();
+        const result = await waitForJob(job.job_id, progressText);
         loading.classList.add('hidden');
+        progressText.classList.add('hidden');
 
         // ========================
         // ⬇️ Populate Overview Info
@@ -68,6 +72,9 @@ document.getElementById('uploadBtn').addEventListener('click', async () => {
             if (typeof ov.duplicates === 'number') {
                 basicHtml += `<tr><td>Duplicate Rows</td><td>${ov.duplicates}</td></tr>`;
             }
+            if (typeof ov.duplicates_removed === 'number') {
+                basicHtml += `<tr><td>Duplicate Rows Removed</td><td>${ov.duplicates_removed}</td></tr>`;
+            }
             if (ov.memory_usage?.total) {
                 basicHtml += `<tr><td>Memory Usage</td><td>${ov.memory_usage.total}</td></tr>`;
             }
@@ -154,13 +161,13 @@ document.getElementById('uploadBtn').addEventListener('click', async () => {
 
 
         // Show EDA
-        edaFrame.src = `/eda/${result.eda_report}`;
+        edaFrame.src = `/eda/${job.job_id}/${result.eda_report}`;
 
-        downloadReport.href = `/eda/${result.eda_report}`;
+        downloadReport.href = `/eda/${job.job_id}/${result.eda_report}`;
         downloadReport.download = result.eda_report;
 
         // Set download link
-        downloadLink.href = `/download/${result.cleaned_file}`;
+        downloadLink.href = `/download/${job.job_id}/${result.cleaned_file}`;
         downloadLink.download = result.cleaned_file;
         downloadLink.classList.remove("hidden");
 
@@ -169,7 +176,119 @@ document.getElementById('uploadBtn').addEventListener('click', async () => {
 
     } catch (err) {
         loading.classList.add('hidden');
+        progressText.classList.add('hidden');
         errorDiv.textContent = `❌ ${err.message}`;
         errorDiv.classList.remove('hidden');
     }
-});
\ No newline at end of file
+});
+
+const JOB_POLL_INTERVAL_MS = 1000;
+
+async function waitForJob(jobId, progressText) {
+    progressText.classList.remove('hidden');
+
+    while (true) {
+        const statusResponse = await fetch(`/jobs/${jobId}`);
+        const status = await statusResponse.json();
+
+        if (!statusResponse.ok) {
+            throw new Error(status.error || "Could not get the job status.");
+        }
+        if (status.status === 'failed') {
+            throw new Error(status.error || "Server error during file processing.");
+        }
+        if (status.status === 'done') {
+            const resultResponse = await fetch(`/jobs/${jobId}/result`);
+            return await resultResponse.json();
+        }
+
+        const finished = status.stages.filter(stage => stage.status === 'done').length;
+        progressText.textContent = status.current_stage
+            ? `Running ${status.current_stage} (${finished} steps done)...`
+            : 'Waiting in queue...';
+
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+}
+
+// Only the beginning of large CSV / JSON Lines files (compressed or not) is sent for the preview;
+// other files are previewed whole, up to the server's limit (PREVIEW_MAX_BYTES)
+const PREVIEW_BYTES = 2 * 1024 * 1024;
+const PREVIEW_MAX_BYTES = 8 * 1024 * 1024;
+const PREVIEW_PREFIX_FORMATS = /\.(csv|jsonl)(\.(gz|bz2|zst))?$/i;
+let previewRequest = 0;
+
+document.getElementById('fileInput').addEventListener('change', () => {
+    const fileInput = document.getElementById('fileInput');
+    if (fileInput.files.length) {
+        showPreview(fileInput.files[0]);
+    }
+});
+
+async function showPreview(file) {
+    const previewDiv = document.getElementById('preview');
+    const previewInfo = document.getElementById('previewInfo');
+    const previewContent = document.getElementById('previewContent');
+    const request = ++previewRequest;
+
+    const truncated = PREVIEW_PREFIX_FORMATS.test(file.name) && file.size > PREVIEW_BYTES;
+    if (!truncated && file.size > PREVIEW_MAX_BYTES) {
+        previewInfo.textContent = "No preview for files of this type over 8 MB; the file can still be cleaned.";
+        previewContent.innerHTML = '';
+        previewDiv.classList.remove('hidden');
+        return;
+    }
+    const formData = new FormData();
+    // Fields go before the file: the server reads them before parsing it
+    if (truncated) {
+        formData.append("truncated", "1");
+    }
+    formData.append("file", truncated ? file.slice(0, PREVIEW_BYTES) : file, file.name);
+
+    previewInfo.textContent = "Reading a sample...";
+    previewContent.innerHTML = '';
+    previewDiv.classList.remove('hidden');
+
+    try {
+        const response = await fetch("/preview", {
+            method: "POST",
+            body: formData
+        });
+        const preview = await response.json();
+        if (request !== previewRequest) {
+            return;  // Another file was chosen meanwhile
+        }
+        if (!response.ok) {
+            throw new Error(preview.error || "Could not preview this file.");
+        }
+
+        const ov = preview.overview;
+        const seconds = preview.stage_metrics.reduce((total, stage) => total + stage.wall_seconds, 0);
+        previewInfo.textContent = `${preview.sample.complete ? 'All' : 'First'} ${preview.sample.rows} rows, `
+            + `${ov.shape.columns} columns (${seconds.toFixed(2)}s). Types below are proposed from this sample.`;
+
+        const conversions = {};
+        preview.conversions.forEach(entry => { conversions[entry.column] = entry.to; });
+
+        const table = document.createElement('table');
+        table.classList.add('log-table');
+        const headerRow = table.createTHead().insertRow();
+        ['column', 'type', 'missing', 'proposed type'].forEach(name => {
+            const th = document.createElement('th');
+            th.textContent = name;
+            headerRow.appendChild(th);
+        });
+        const tbody = table.createTBody();
+        for (const [col, dtype] of Object.entries(ov.dtypes)) {
+            const row = tbody.insertRow();
+            [col, dtype, ov.missing_values[col] ?? 0, conversions[col] || 'unchanged'].forEach(value => {
+                row.insertCell().textContent = value;
+            });
+        }
+        previewContent.appendChild(table);
+    } catch (err) {
+        if (request === previewRequest) {
+            previewInfo.textContent = `⚠ ${err.message}`;
+        }
+    }
+}